@@ -0,0 +1,70 @@
+"""
+Run every benchmark and write the results as one JSON document, with enough
+about the environment to compare runs over time.
+
+    python -m benchmarks [--output results.json] [--ads 1000 10000 100000]
+        [--bevakningar 10 100] [--rows 100000 300000] [--number 2000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks import client, monitor, prices
+from benchmarks import codec as codec_benchmark
+from blocket_api import codec
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", help="write to this file instead of stdout")
+    parser.add_argument("--ads", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--bevakningar", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 300_000])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    active = codec.backend()
+    results = {
+        "client": client.run(args.number, args.repeat),
+        "monitor": monitor.run(args.ads, args.bevakningar),
+        "prices": prices.run(args.rows, args.repeat),
+    }
+    try:
+        results["codec"] = codec_benchmark.run(max(args.ads), args.repeat)
+    finally:
+        codec.use_backend(active)
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "codec": active,
+        "results": results,
+    }
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Per-call overhead of the client, against a mocked transport.
+
+    python -m benchmarks.client [--number 2000] [--repeat 5] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from collections.abc import Callable
+
+import httpx
+
+from benchmarks.codec import best_of
+from blocket_api.blocket import BlocketAPI, _make_request, _motor_search_url
+from blocket_api.qasa import HomeType, OrderBy, Qasa
+from blocket_api.singleflight import SingleFlight
+from blocket_api.throttle import RateLimiter, RetryPolicy
+
+LISTINGS_URL = "https://api.blocket.se/saved/v2/searches_content/1?lim=99"
+
+MOTOR_FILTERS: dict = {
+    "make": ["Audi", "Toyota", "Volvo"],
+    "fuel": ["Diesel", "El"],
+    "chassi": ["Kombi", "SUV"],
+    "price": (50_000, 250_000),
+    "modelYear": (2015, 2022),
+    "milage": (0, 15_000),
+    "gearbox": "Automat",
+}
+
+
+def mock_client(body: bytes = b'{"data": []}') -> httpx.Client:
+    return httpx.Client(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    )
+
+
+def mock_api(
+    rate_limiter: RateLimiter | None = None,
+    retry: RetryPolicy | None = None,
+    single_flight: SingleFlight | None = None,
+) -> BlocketAPI:
+    """
+    BlocketAPI with every request answered by a mocked transport.
+    """
+    api = BlocketAPI(
+        "token", rate_limiter=rate_limiter, retry=retry, single_flight=single_flight
+    )
+    api.client.close()
+    api.client = mock_client()
+    return api
+
+
+def per_call(repeat: int, number: int, func: Callable[[], object]) -> float:
+    def calls() -> None:
+        for _ in range(number):
+            func()
+
+    return best_of(repeat, calls) / number
+
+
+def cases() -> dict[str, Callable[[], object]]:
+    client = mock_client()
+    # Rates no benchmark gets close to, so only the bookkeeping is measured.
+    unlimited = RateLimiter(rates={"api.blocket.se": (1e9, 10**9)})
+    api = mock_api()
+    full_api = mock_api(unlimited, RetryPolicy(), SingleFlight())
+    qasa = Qasa("stockholm", HomeType.apartment, OrderBy.published_at, "descending", 0)
+    return {
+        "make_request": lambda: _make_request(
+            url=LISTINGS_URL, token="token", client=client
+        ),
+        "make_request_throttled": lambda: _make_request(
+            url=LISTINGS_URL,
+            token="token",
+            client=client,
+            rate_limiter=unlimited,
+            retry=RetryPolicy(),
+        ),
+        "get_listings": lambda: api.get_listings(search_id=1),
+        "get_listings_full_stack": lambda: full_api.get_listings(search_id=1),
+        "motor_search_url": lambda: _motor_search_url(1, **MOTOR_FILTERS),
+        "motor_search": lambda: api.motor_search(1, **MOTOR_FILTERS),
+        "qasa_construct_payload": qasa._construct_payload,
+    }
+
+
+def run(number: int, repeat: int) -> list[dict]:
+    return [
+        {
+            "benchmark": name,
+            "calls": number,
+            "per_call_us": per_call(repeat, number, func) * 1e6,
+        }
+        for name, func in cases().items()
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.number, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        print(f"{result['benchmark']:>24}: {result['per_call_us']:8.1f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
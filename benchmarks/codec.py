@@ -0,0 +1,102 @@
+"""
+Compare the JSON backends on listing-shaped data.
+
+    python -m benchmarks.codec [--ads 10000] [--repeat 5] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections.abc import Callable
+from functools import partial
+
+from blocket_api import codec
+
+
+def synthetic_listings(ads: int) -> dict[str, list[dict]]:
+    """
+    Listings shaped like bevakningar_listings.json, spread over 10 searches.
+    """
+    listings: dict[str, list[dict]] = {str(search): [] for search in range(10)}
+    for i in range(ads):
+        listings[str(i % 10)].append(
+            {
+                "ad": {
+                    "ad_id": str(1_200_000_000 + i),
+                    "zipcode": "11122",
+                    "ad_status": "active",
+                    "list_time": "2025-08-15T00:20:36+02:00",
+                    "subject": f"Cykel nummer {i}",
+                    "body": "Välskött cykel, nyligen servad. " * 8,
+                    "price": {"value": 1000 + i % 5000, "suffix": "kr"},
+                    "category": [
+                        {"id": "6000", "name": "Fritid & hobby"},
+                        {"id": "6060", "name": "Cyklar"},
+                    ],
+                    "advertiser": {"name": "säljare", "type": "private"},
+                    "images": [
+                        {"url": f"https://i.blocketcdn.se/{i}/{n}.jpg", "width": 768}
+                        for n in range(3)
+                    ],
+                },
+                "is_new": True,
+                "discovered_at": "2025-08-23T20:26:07.652283",
+            }
+        )
+    return listings
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(ads: int, repeat: int) -> list[dict]:
+    listings = synthetic_listings(ads)
+    results = []
+    for name in codec.BACKENDS:
+        codec.use_backend(name)
+        encoded = codec.dumps(listings)
+        results.append(
+            {
+                "backend": name,
+                "ads": ads,
+                "bytes": len(encoded),
+                "dumps_s": best_of(repeat, partial(codec.dumps, listings)),
+                "loads_s": best_of(repeat, partial(codec.loads, encoded)),
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ads", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    active = codec.backend()
+    try:
+        results = run(args.ads, args.repeat)
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return
+        for result in results:
+            print(
+                f"{result['backend']:>7}: dumps {result['dumps_s'] * 1000:8.1f} ms"
+                f"  loads {result['loads_s'] * 1000:8.1f} ms"
+                f"  {result['bytes'] / 1024:8.0f} KiB"
+            )
+    finally:
+        codec.use_backend(active)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Throughput of the bevakningar monitor on synthetic data, offline.
+
+Storing, saving and loading listings is measured for each storage mode, and
+whole check cycles against a mocked API: cold with every listing new, warm
+with every search unchanged since the last cycle.
+
+    python -m benchmarks.monitor [--ads 1000 10000 100000]
+        [--bevakningar 10 100] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import httpx
+
+from benchmarks.codec import synthetic_listings
+from blocket_api import codec
+from blocket_api.blocket import BlocketAPI
+from blocket_api.revalidation import ValidatorStore
+
+STORAGES = ("json", "journal", "sqlite")
+LISTINGS_PER_SEARCH = 99
+
+
+@contextmanager
+def in_temporary_directory() -> Iterator[str]:
+    """
+    The monitor keeps its files in the working directory.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(cwd)
+
+
+def monitor_class() -> Any:
+    """
+    Imported on first use, in a temporary working directory, as the module
+    sets up a log file in the working directory.
+    """
+    monitor_bevakningar = importlib.import_module("monitor_bevakningar")
+    # Keep per-request and per-bevakning logging out of the timings.
+    logging.getLogger().setLevel(logging.WARNING)
+    return monitor_bevakningar.BevakningarMonitor
+
+
+def timed(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def storage_run(storage: str, ads: int) -> dict:
+    listings = synthetic_listings(ads)
+    with in_temporary_directory():
+        monitor_type = monitor_class()
+        monitor = monitor_type(storage=storage)
+
+        def update() -> None:
+            for bevakning_id, bevakning_listings in listings.items():
+                monitor.update_listings_database(bevakning_id, bevakning_listings)
+
+        update_s = timed(update)
+        save_s = timed(monitor.save_listings)
+        fresh = monitor_type(storage=storage)
+        fresh.ads = {}
+        load_s = timed(fresh.load_listings)
+        for instance in (monitor, fresh):
+            if instance.store:
+                instance.store.close()
+            if instance.journal:
+                instance.journal.close()
+    return {
+        "benchmark": "listings",
+        "storage": storage,
+        "ads": ads,
+        "update_s": update_s,
+        "save_s": save_s,
+        "load_s": load_s,
+        "update_ads_per_s": ads / update_s,
+    }
+
+
+def search_listings(search_id: int) -> list[dict]:
+    listings = synthetic_listings(LISTINGS_PER_SEARCH)
+    return [
+        {**listing, "ad": {**listing["ad"], "ad_id": f"{search_id}{n:03}"}}
+        for n, listing in enumerate(
+            listing for entries in listings.values() for listing in entries
+        )
+    ]
+
+
+def mock_transport(bevakningar: int) -> httpx.MockTransport:
+    """
+    The saved searches and their listings, with ETags so an unchanged search
+    is answered with 304.
+    """
+    searches = codec.dumps(
+        {
+            "data": [
+                {
+                    "id": str(search_id),
+                    "name": f"Bevakning {search_id}",
+                    "total_count": LISTINGS_PER_SEARCH,
+                    "new_count": 0,
+                }
+                for search_id in range(1, bevakningar + 1)
+            ]
+        }
+    )
+    contents = {
+        str(search_id): codec.dumps({"data": search_listings(search_id)})
+        for search_id in range(1, bevakningar + 1)
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/saved/v2/searches":
+            body = searches
+        elif path == "/mobility-saved-searches/v1/searches":
+            body = b'{"data": []}'
+        elif match := re.fullmatch(r"/saved/v2/searches_content/(\d+)", path):
+            body = contents[match.group(1)]
+        else:
+            return httpx.Response(404)
+        etag = f'"{hash(body)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=body, headers={"ETag": etag})
+
+    return httpx.MockTransport(handler)
+
+
+def cycle_run(storage: str, bevakningar: int, workers: int) -> dict:
+    with in_temporary_directory():
+        monitor_type = monitor_class()
+        monitor = monitor_type(storage=storage, workers=workers)
+        monitor.api.close()
+        # Same client as the monitor's, minus rate limiting and retries.
+        monitor.api = BlocketAPI(
+            "token",
+            validators=ValidatorStore(monitor.validators_file),
+            rate_limiter=None,
+            retry=None,
+            hooks=monitor.api.hooks,
+        )
+        monitor.api.client.close()
+        monitor.api.client = httpx.Client(transport=mock_transport(bevakningar))
+
+        def cycle() -> None:
+            monitor.check_bevakningar(monitor.get_bevakningar())
+            monitor.save_listings()
+            monitor.save_state()
+
+        cold_s = timed(cycle)
+        warm_s = timed(cycle)
+        monitor.api.close()
+        if monitor.store:
+            monitor.store.close()
+        if monitor.journal:
+            monitor.journal.close()
+    return {
+        "benchmark": "cycle",
+        "storage": storage,
+        "bevakningar": bevakningar,
+        "workers": workers,
+        "cold_s": cold_s,
+        "warm_s": warm_s,
+    }
+
+
+def run(
+    ads: list[int],
+    bevakningar: list[int],
+    workers: int = 8,
+    storages: tuple[str, ...] = STORAGES,
+) -> list[dict]:
+    results: list[dict] = []
+    for storage in storages:
+        results.extend(storage_run(storage, count) for count in ads)
+        results.extend(cycle_run(storage, count, workers) for count in bevakningar)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ads", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--bevakningar", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--storage", choices=STORAGES, nargs="+", default=STORAGES)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.ads, args.bevakningar, args.workers, tuple(args.storage))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        if result["benchmark"] == "listings":
+            print(
+                f"{result['storage']:>7} {result['ads']:>7} ads:"
+                f"  update {result['update_s'] * 1000:8.1f} ms"
+                f"  save {result['save_s'] * 1000:8.1f} ms"
+                f"  load {result['load_s'] * 1000:8.1f} ms"
+            )
+        else:
+            print(
+                f"{result['storage']:>7} {result['bevakningar']:>4} bevakningar:"
+                f"  cold cycle {result['cold_s'] * 1000:8.1f} ms"
+                f"  warm cycle {result['warm_s'] * 1000:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
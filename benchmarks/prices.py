@@ -0,0 +1,88 @@
+"""
+Time recording prices and the deal statistics of PriceHistory.
+
+    python -m benchmarks.prices [--rows 100000 300000] [--repeat 5] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from functools import partial
+
+from benchmarks.codec import best_of
+from blocket_api import prices
+from blocket_api.prices import PriceHistory
+
+CATEGORIES = ["6060", "1020", "5020", "3020", "4080"]
+REGIONS = ["Stockholm", "Skåne", "Västra Götaland", "Uppsala", "Halland"]
+
+
+def listing(i: int) -> dict:
+    return {
+        "ad": {
+            "ad_id": str(1_200_000_000 + i),
+            "price": {"value": 1000 + (i * 7919) % 50_000, "suffix": "kr"},
+            "category": [{"id": "6000"}, {"id": CATEGORIES[i % 5]}],
+            "location": [{"name": REGIONS[i // 5 % 5]}],
+        }
+    }
+
+
+def run(row_counts: list[int], repeat: int) -> list[dict]:
+    results = []
+    for rows in row_counts:
+        listings = [listing(i) for i in range(rows)]
+        history = PriceHistory()
+        start = time.perf_counter()
+        for i, item in enumerate(listings):
+            history.record(item, str(i % 50), seen_at=i)
+        record_s = time.perf_counter() - start
+        new = listings[:99]
+        results.append(
+            {
+                "rows": rows,
+                "numpy": prices.np is not None,
+                "record_per_row_us": record_s / rows * 1e6,
+                "column_bytes": sum(
+                    len(column) * column.itemsize for column in history.columns.values()
+                ),
+                "median_s": best_of(
+                    repeat, partial(history.stats, category="6060", region="Skåne")
+                ),
+                "percentile_s": best_of(
+                    repeat, partial(history.percentile, 10, category="6060")
+                ),
+                "zscores_99_s": best_of(
+                    repeat, partial(history.zscores, new, since=rows / 2)
+                ),
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 300_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        print(
+            f"{result['rows']:>8} rows ({'numpy' if result['numpy'] else 'stdlib'}):"
+            f" record {result['record_per_row_us']:5.2f} µs/row"
+            f"  median {result['median_s'] * 1000:7.2f} ms"
+            f"  percentile {result['percentile_s'] * 1000:7.2f} ms"
+            f"  zscores(99) {result['zscores_99_s'] * 1000:7.2f} ms"
+            f"  {result['column_bytes'] / 1024:6.0f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,10 @@
+from .async_blocket import AsyncBlocketAPI as AsyncBlocketAPI
 from .blocket import BlocketAPI as BlocketAPI
 from .blocket import Region as Region
+from .cache import ResponseCache as ResponseCache
+from .hooks import RequestHooks as RequestHooks
+from .metrics import Metrics as Metrics
+from .routing import SearchRoutes as SearchRoutes
+from .throttle import RateLimiter as RateLimiter
+from .throttle import RetryPolicy as RetryPolicy
+from .token_cache import PublicTokenProvider as PublicTokenProvider
@@ -0,0 +1,159 @@
+"""
+Index of every ad the monitor has stored, across all bevakningar.
+
+For each ad_id it keeps which bevakningar matched the ad and when it was
+first seen. Dedupe is a dictionary lookup, and the index is persisted on its
+own, so it does not have to be rebuilt from the stored listings on every
+start. The file is a JSON lines log with one [ad_id, bevakning_id,
+first_seen] line per sighting, so saving appends only the sightings added
+since the last save. Changes to the content of ads are tracked by
+ChangeDetector.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+
+from blocket_api import codec
+from blocket_api.models import Ad, listing_ad_id
+
+
+class Sighting(Enum):
+    # The ad has not been stored before.
+    new = "new"
+    # The ad is stored, but this bevakning has not matched it before.
+    new_reference = "new_reference"
+    # This bevakning already references the ad.
+    known = "known"
+
+
+@dataclass
+class IndexEntry:
+    bevakning_ids: list[str]
+    first_seen: str
+
+
+class AdIndex:
+    """
+    ad_id -> IndexEntry, optionally persisted to path with save().
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        # Sightings not saved yet, as (ad_id, bevakning_id).
+        self._pending: list[tuple[str, str]] = []
+        # Set when the file ends in a partial line, which must be ended first.
+        self._torn = False
+        self._entries: dict[str, IndexEntry] = self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, ad_id: object) -> bool:
+        return ad_id in self._entries
+
+    def get(self, ad_id: str) -> IndexEntry | None:
+        return self._entries.get(ad_id)
+
+    def sighting(self, bevakning_id: str, ad_id: str) -> Sighting:
+        entry = self._entries.get(ad_id)
+        if entry is None:
+            return Sighting.new
+        if bevakning_id in entry.bevakning_ids:
+            return Sighting.known
+        return Sighting.new_reference
+
+    def record(
+        self, bevakning_id: str, listing: dict | Ad, seen_at: str | None = None
+    ) -> Sighting:
+        """
+        Add a sighting of listing in bevakning_id, returns what it was before.
+        """
+        ad_id = listing_ad_id(listing)
+        with self._lock:
+            entry = self._entries.get(ad_id)
+            if entry is None:
+                self._entries[ad_id] = IndexEntry(
+                    bevakning_ids=[bevakning_id],
+                    first_seen=seen_at or datetime.now().isoformat(),
+                )
+                self._pending.append((ad_id, bevakning_id))
+                return Sighting.new
+            if bevakning_id in entry.bevakning_ids:
+                return Sighting.known
+            entry.bevakning_ids.append(bevakning_id)
+            self._pending.append((ad_id, bevakning_id))
+            return Sighting.new_reference
+
+    def reconcile(self, listings: Mapping[str, Iterable[dict | Ad]]) -> int:
+        """
+        Add ads found in stored listings that the index is missing, e.g.
+        after a crash between storing listings and saving the index.
+        Returns the number of sightings added.
+        """
+        added = 0
+        for bevakning_id, entries in listings.items():
+            for listing in entries:
+                ad_id = listing_ad_id(listing)
+                if not ad_id or self.sighting(bevakning_id, ad_id) is Sighting.known:
+                    continue
+                discovered_at = (
+                    listing.discovered_at
+                    if isinstance(listing, Ad)
+                    else listing.get("discovered_at")
+                )
+                self.record(bevakning_id, listing, seen_at=discovered_at)
+                added += 1
+        return added
+
+    def _load(self) -> dict[str, IndexEntry]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            data = self.path.read_bytes()
+        except OSError:
+            return {}
+        self._torn = bool(data) and not data.endswith(b"\n")
+        entries: dict[str, IndexEntry] = {}
+        for line in data.splitlines():
+            try:
+                ad_id, bevakning_id, first_seen = codec.loads(line)
+            except (ValueError, TypeError):
+                # A line cut short by a crash, its sighting is reconciled.
+                continue
+            entry = entries.setdefault(ad_id, IndexEntry([], first_seen))
+            if bevakning_id not in entry.bevakning_ids:
+                entry.bevakning_ids.append(bevakning_id)
+        return entries
+
+    def save(self) -> None:
+        """
+        Append the sightings added since the last save.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            sightings = self._pending
+            lines = b"\n" if self._torn else b""
+            lines += b"".join(
+                codec.dumps([ad_id, bevakning_id, self._entries[ad_id].first_seen])
+                + b"\n"
+                for ad_id, bevakning_id in sightings
+            )
+            self._pending = []
+            self._torn = False
+        if not lines:
+            return
+        try:
+            with open(self.path, "ab") as f:
+                f.write(lines)
+        except OSError:
+            with self._lock:
+                self._pending[:0] = sightings
+                self._torn = lines.startswith(b"\n")
@@ -0,0 +1,519 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+import httpx
+
+from blocket_api import codec
+from blocket_api.blocket import (
+    CHASSI_OPTIONS,
+    FUEL_OPTIONS,
+    GEARBOX_OPTIONS,
+    MAKE_OPTIONS,
+    USER_AGENT,
+    APIError,
+    Category,
+    Region,
+    TokenError,
+    _check_concurrency,
+    _check_limit,
+    _custom_search_url,
+    _default_limits,
+    _default_timeout,
+    _is_unauthorized,
+    _listings_url,
+    _motor_search_url,
+    _price_eval_url,
+    _request_headers,
+    _saved_searches_urls,
+    _search_content_url,
+    _search_id_urls,
+    _search_store_url,
+    _store_listings_url,
+)
+from blocket_api.cache import ResponseCache
+from blocket_api.hooks import RequestHooks
+from blocket_api.pagination import CONTENT_PAGER, MOTOR_PAGER, aiter_paged
+from blocket_api.qasa import (
+    HOME_PAGER,
+    HOME_SEARCH_ORDERING,
+    HomeFields,
+    HomeType,
+    OrderBy,
+    Qasa,
+    remaining_offsets,
+    unique_homes,
+)
+from blocket_api.routing import SearchBackend, SearchRoutes
+from blocket_api.singleflight import AsyncSingleFlight
+from blocket_api.throttle import (
+    RateLimiter,
+    RetryPolicy,
+    asend_with_retries,
+    default_rate_limiter,
+)
+from blocket_api.token_cache import PublicTokenProvider, default_token_provider
+from blocket_api.tracing import start_request, traced
+
+if TYPE_CHECKING:
+    from httpx import Response
+
+
+def async_auth_token(method: Callable) -> Callable:
+    @wraps(method)
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        if not self.token:
+            raise TokenError("Token is required, see documentation.")
+        return await method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def async_public_token(method: Callable) -> Callable:
+    @wraps(method)
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        if self.token and not self._public_token:
+            return await method(self, *args, **kwargs)
+        self.token = await self.token_provider.aget(self.client)
+        self._public_token = True
+        try:
+            return await method(self, *args, **kwargs)
+        except APIError as error:
+            if not _is_unauthorized(error):
+                raise
+            self.token_provider.invalidate(self.token)
+            self.token = await self.token_provider.aget(self.client)
+            return await method(self, *args, **kwargs)
+
+    return wrapper
+
+
+async def _make_async_request(
+    *,
+    url: str,
+    token: str | None,
+    client: httpx.AsyncClient,
+    raise_for_status: bool = True,
+    cache: ResponseCache | None = None,
+    rate_limiter: RateLimiter | None = None,
+    retry: RetryPolicy | None = None,
+    hooks: RequestHooks | None = None,
+) -> Response:
+    request = start_request(hooks, "GET", url)
+    if cache is not None:
+        cache_key = cache.key("GET", url, token)
+        if (cached := cache.get(cache_key)) is not None:
+            if request is not None:
+                request.end(cached, cache_hit=True)
+            return cached
+    headers = _request_headers(token)
+
+    def send() -> Awaitable[Response]:
+        return client.get(url, headers=headers)
+
+    try:
+        response = await asend_with_retries(
+            request.counting(send) if request is not None else send,
+            url,
+            rate_limiter,
+            retry,
+        )
+        if raise_for_status:
+            response.raise_for_status()
+    except Exception as E:
+        if request is not None:
+            request.end(error=E)
+        raise APIError(E)
+    if request is not None:
+        request.end(response)
+    if cache is not None:
+        cache.set(cache_key, response)
+    return response
+
+
+@dataclass
+class AsyncBlocketAPI:
+    """
+    Asyncio counterpart of BlocketAPI, backed by one pooled httpx.AsyncClient.
+    Use it as an async context manager, or await aclose(), to release the pool.
+    http2=True needs the h2 package (pip install blocket_api[http2]).
+    The default rate_limiter is the one shared with BlocketAPI, and
+    identical concurrent requests are coalesced through single_flight.
+    hooks are called from the event loop.
+    """
+
+    token: str | None = None
+    limits: httpx.Limits = field(default_factory=_default_limits)
+    timeout: httpx.Timeout = field(default_factory=_default_timeout)
+    http2: bool = False
+    token_provider: PublicTokenProvider = field(
+        default=default_token_provider, repr=False
+    )
+    qasa_persisted_queries: bool = False
+    cache: ResponseCache | None = field(default=None, repr=False)
+    search_routes: SearchRoutes = field(default_factory=SearchRoutes, repr=False)
+    rate_limiter: RateLimiter | None = field(default=default_rate_limiter, repr=False)
+    retry: RetryPolicy | None = field(default_factory=RetryPolicy, repr=False)
+    single_flight: AsyncSingleFlight | None = field(
+        default_factory=AsyncSingleFlight, repr=False
+    )
+    hooks: RequestHooks | None = field(default=None, repr=False)
+    client: httpx.AsyncClient = field(init=False, repr=False)
+    _public_token: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2,
+        )
+
+    async def __aenter__(self) -> AsyncBlocketAPI:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def _get(
+        self, url: str, token: str | None, raise_for_status: bool = True
+    ) -> Response:
+        return await _make_async_request(
+            url=url,
+            token=token,
+            client=self.client,
+            raise_for_status=raise_for_status,
+            cache=self.cache,
+            rate_limiter=self.rate_limiter,
+            retry=self.retry,
+            hooks=self.hooks,
+        )
+
+    async def _coalesced(
+        self, url: str, token: str | None, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        if self.single_flight is None:
+            return await fetch()
+        return await self.single_flight.do(ResponseCache.key("GET", url, token), fetch)
+
+    async def _get_json(self, url: str, token: str | None) -> Any:
+        async def fetch() -> Any:
+            return codec.loads((await self._get(url=url, token=token)).content)
+
+        return await self._coalesced(url, token, fetch)
+
+    @traced("blocket.saved_searches")
+    @async_auth_token
+    async def saved_searches(self) -> list[dict]:
+        """
+        Retrieves saved searches data, also known as "Bevakningar".
+        Both saved search backends are queried concurrently.
+        """
+        assert self.token
+
+        searches, mobility_searches = await asyncio.gather(
+            *(self._get(url=url, token=self.token) for url in _saved_searches_urls())
+        )
+
+        searches_data = codec.loads(searches.content).get("data", [])
+        mobility_data = codec.loads(mobility_searches.content).get("data", [])
+        self.search_routes.record_searches(searches_data, SearchBackend.saved)
+        self.search_routes.record_searches(mobility_data, SearchBackend.mobility)
+
+        return searches_data + mobility_data
+
+    async def _for_search_id(self, search_id: int, limit: int) -> dict:
+        return await self._coalesced(
+            _search_content_url(search_id, limit),
+            self.token,
+            lambda: self._fetch_search_id(search_id, limit),
+        )
+
+    async def _fetch_search_id(self, search_id: int, limit: int) -> dict:
+        assert self.token
+        (backend, url), (fallback, fallback_url) = _search_id_urls(
+            search_id, limit, self.search_routes.get(search_id)
+        )
+        searches = await self._get(url=url, token=self.token, raise_for_status=False)
+        if searches.status_code == 404:
+            searches = await self._get(url=fallback_url, token=self.token)
+            backend = fallback
+        if searches.is_success:
+            self.search_routes.record(search_id, backend)
+        else:
+            try:
+                searches.raise_for_status()
+            except httpx.HTTPStatusError as error:
+                raise APIError(error)
+        return codec.loads(searches.content)
+
+    @traced("blocket.get_listings", arguments=("search_id", "limit"))
+    @async_auth_token
+    async def get_listings(self, search_id: int | None = None, limit: int = 99) -> dict:
+        """
+        Retrieve listings/ads based on the provided search criteria.
+        """
+        assert self.token
+
+        _check_limit(limit)
+
+        if search_id:
+            return await self._for_search_id(search_id, limit)
+
+        return await self._get_json(url=_listings_url(limit), token=self.token)
+
+    @traced("blocket.get_listings_many", arguments=("limit", "concurrency"))
+    @async_auth_token
+    async def get_listings_many(
+        self, search_ids: Iterable[int], limit: int = 99, concurrency: int = 8
+    ) -> dict[int, dict | Exception]:
+        """
+        get_listings(search_id=...) for several saved searches, at most
+        concurrency at a time. Each id maps to its listings or to the error
+        fetching them raised.
+        """
+        _check_limit(limit)
+        _check_concurrency(concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(search_id: int) -> dict | Exception:
+            async with semaphore:
+                try:
+                    return await self._for_search_id(search_id, limit)
+                except Exception as error:
+                    return error
+
+        ids = list(dict.fromkeys(search_ids))
+        return dict(zip(ids, await asyncio.gather(*(fetch(id_) for id_ in ids))))
+
+    @traced("blocket.custom_search", arguments=("limit",))
+    @async_public_token
+    async def custom_search(
+        self,
+        search_query: str,
+        region: Region = Region.hela_sverige,
+        category: Category | None = None,
+        limit: int = 99,
+    ) -> dict:
+        """
+        Do a custom search through out all of Blocket.
+        Supply a region for filtering. Default is all of Sweden.
+        """
+        assert self.token
+
+        _check_limit(limit)
+
+        url = _custom_search_url(search_query, region, category, limit)
+        return await self._get_json(url=url, token=self.token)
+
+    @traced("blocket.motor_search", arguments=("page",))
+    @async_public_token
+    async def motor_search(
+        self,
+        page: int,
+        make: List[MAKE_OPTIONS],
+        fuel: Optional[List[FUEL_OPTIONS]] = None,
+        chassi: Optional[List[CHASSI_OPTIONS]] = None,
+        price: Optional[Tuple[int, int]] = None,
+        modelYear: Optional[Tuple[int, int]] = None,
+        milage: Optional[Tuple[int, int]] = None,
+        gearbox: Optional[GEARBOX_OPTIONS] = None,
+    ) -> dict:
+        """
+        Search specifically in the car section of Blocket
+        with set optional parameters for filtering.
+        """
+        assert self.token
+
+        url = _motor_search_url(
+            page,
+            make=make,
+            fuel=fuel,
+            chassi=chassi,
+            price=price,
+            modelYear=modelYear,
+            milage=milage,
+            gearbox=gearbox,
+        )
+        return await self._get_json(url=url, token=self.token)
+
+    @traced("blocket.price_eval")
+    @async_public_token
+    async def price_eval(
+        self,
+        registration_number: str,
+    ) -> dict:
+        """
+        Price evaluation for a specific vehicle by using cars
+        registration number (ABC123).
+        """
+        url = _price_eval_url(registration_number)
+        return await self._get_json(url=url, token=None)
+
+    @traced("blocket.home_search", arguments=("city", "offset"))
+    async def home_search(
+        self,
+        city: str,
+        type: HomeType,
+        order_by: OrderBy = OrderBy.published_at,
+        ordering: HOME_SEARCH_ORDERING = "descending",
+        offset: int = 0,
+        fields: HomeFields = "full",
+    ) -> dict:
+        """
+        Home listings from https://bostad.blocket.se/, 60 items per page.
+        Specify offset to get next page, use fields to fetch less per home.
+        """
+        return await Qasa(
+            city=city,
+            home_type=type,
+            order_by=order_by,
+            ordering=ordering,
+            offset=offset,
+            fields=fields,
+            persisted_query=self.qasa_persisted_queries,
+        ).async_search(
+            client=self.client,
+            cache=self.cache,
+            rate_limiter=self.rate_limiter,
+            retry=self.retry,
+            hooks=self.hooks,
+        )
+
+    def iter_home_search(
+        self,
+        city: str,
+        type: HomeType,
+        order_by: OrderBy = OrderBy.published_at,
+        ordering: HOME_SEARCH_ORDERING = "descending",
+        start_offset: int = 0,
+        fields: HomeFields = "full",
+    ) -> AsyncIterator[dict]:
+        """
+        Iterate over every home from home_search(), prefetching the next page.
+        """
+        return aiter_paged(
+            lambda offset: self.home_search(
+                city, type, order_by, ordering, offset, fields
+            ),
+            HOME_PAGER,
+            start_offset,
+        )
+
+    @traced("blocket.home_search_all", arguments=("city", "concurrency"))
+    async def home_search_all(
+        self,
+        city: str,
+        type: HomeType,
+        order_by: OrderBy = OrderBy.published_at,
+        ordering: HOME_SEARCH_ORDERING = "descending",
+        concurrency: int = 4,
+        fields: HomeFields = "full",
+    ) -> list[dict]:
+        """
+        Return every home matching the search. The remaining pages are fetched
+        concurrently, at most concurrency at a time. Homes are deduplicated by id.
+        """
+        _check_concurrency(concurrency)
+        first = await self.home_search(city, type, order_by, ordering, fields=fields)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def page(offset: int) -> dict:
+            async with semaphore:
+                return await self.home_search(
+                    city, type, order_by, ordering, offset, fields
+                )
+
+        pages = await asyncio.gather(
+            *(page(offset) for offset in remaining_offsets(first, 0))
+        )
+        return unique_homes([first, *pages])
+
+    @traced("blocket.search_store", arguments=("page",))
+    @async_public_token
+    async def search_store(
+        self,
+        search_query: str,
+        page: int = 0,
+    ) -> dict:
+        """
+        Searching through Blocket stores from https://www.blocket.se/butiker.
+        The store_id is used for get_store_listings().
+        """
+        url = _search_store_url(search_query, page)
+        return await self._get_json(url=url, token=self.token)
+
+    @traced("blocket.get_store_listings", arguments=("store_id", "page"))
+    @async_public_token
+    async def get_store_listings(
+        self,
+        store_id: int,
+        page: int = 0,
+    ) -> dict:
+        """
+        Return all listings from a specific store from https://www.blocket.se/butik/<store>.
+        The store_id can be found by searching for the store with search_store().
+        """
+        url = _store_listings_url(store_id, page)
+        return await self._get_json(url=url, token=self.token)
+
+    def iter_motor_search(
+        self,
+        make: List[MAKE_OPTIONS],
+        fuel: Optional[List[FUEL_OPTIONS]] = None,
+        chassi: Optional[List[CHASSI_OPTIONS]] = None,
+        price: Optional[Tuple[int, int]] = None,
+        modelYear: Optional[Tuple[int, int]] = None,
+        milage: Optional[Tuple[int, int]] = None,
+        gearbox: Optional[GEARBOX_OPTIONS] = None,
+        start_page: int = 1,
+    ) -> AsyncIterator[dict]:
+        """
+        Iterate over every car from motor_search(), prefetching the next page.
+        """
+        return aiter_paged(
+            lambda page: self.motor_search(
+                page=page,
+                make=make,
+                fuel=fuel,
+                chassi=chassi,
+                price=price,
+                modelYear=modelYear,
+                milage=milage,
+                gearbox=gearbox,
+            ),
+            MOTOR_PAGER,
+            start_page,
+        )
+
+    def iter_search_store(
+        self, search_query: str, start_page: int = 0
+    ) -> AsyncIterator[dict]:
+        """
+        Iterate over every store from search_store(), prefetching the next page.
+        """
+        return aiter_paged(
+            lambda page: self.search_store(search_query, page=page),
+            CONTENT_PAGER,
+            start_page,
+        )
+
+    def iter_store_listings(
+        self, store_id: int, start_page: int = 0
+    ) -> AsyncIterator[dict]:
+        """
+        Iterate over every listing from get_store_listings(), prefetching the
+        next page.
+        """
+        return aiter_paged(
+            lambda page: self.get_store_listings(store_id, page=page),
+            CONTENT_PAGER,
+            start_page,
+        )
@@ -1,22 +1,51 @@
 from __future__ import annotations
 
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 import urllib
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import TYPE_CHECKING, Any, List, Literal, Optional, Tuple
+from typing import TYPE_CHECKING, Any, List, Literal, Optional, Tuple, TypeVar
 
 import httpx
 
-from blocket_api.qasa import HOME_SEARCH_ORDERING, HomeType, OrderBy, Qasa
+from blocket_api import codec
+from blocket_api.cache import ResponseCache
+from blocket_api.hooks import RequestHooks
+from blocket_api.pagination import CONTENT_PAGER, MOTOR_PAGER, iter_paged
+from blocket_api.qasa import (
+    HOME_PAGER,
+    HOME_SEARCH_ORDERING,
+    HomeFields,
+    HomeType,
+    OrderBy,
+    Qasa,
+    remaining_offsets,
+    unique_homes,
+)
+from blocket_api.revalidation import ValidatorStore
+from blocket_api.routing import SearchBackend, SearchRoutes
+from blocket_api.singleflight import SingleFlight
+from blocket_api.throttle import (
+    RateLimiter,
+    RetryPolicy,
+    default_rate_limiter,
+    send_with_retries,
+)
+from blocket_api.token_cache import PublicTokenProvider, default_token_provider
+from blocket_api.tracing import start_request, traced
 
 if TYPE_CHECKING:
     from httpx import Response
 
+T = TypeVar("T")
+
 BASE_URL = "https://api.blocket.se"
 SITE_URL = "https://www.blocket.se"
 BYTBIL_URL = "https://api.bytbil.com"
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
 
 
 class Region(Enum):
@@ -141,41 +170,291 @@ def auth_token(method: Callable) -> Callable:
     return wrapper
 
 
+def _is_unauthorized(error: APIError) -> bool:
+    cause = error.args[0] if error.args else None
+    return (
+        isinstance(cause, httpx.HTTPStatusError) and cause.response.status_code == 401
+    )
+
+
 def public_token(method: Callable) -> Callable:
+    """
+    Use the shared public token unless the caller supplied their own.
+    A rejected public token is refreshed once and the call retried.
+    """
+
     @wraps(method)
     def wrapper(self: Any, *args: Any, **kwargs: Any) -> Callable:
-        if not self.token:
-            response = httpx.get(
-                f"{SITE_URL}/api/adout-api-route/refresh-token-and-validate-session"
-            )
-            response.raise_for_status()
-            self.token = response.json()["bearerToken"]
-        return method(self, *args, **kwargs)
+        if self.token and not self._public_token:
+            return method(self, *args, **kwargs)
+        self.token = self.token_provider.get(self.client)
+        self._public_token = True
+        try:
+            return method(self, *args, **kwargs)
+        except APIError as error:
+            if not _is_unauthorized(error):
+                raise
+            self.token_provider.invalidate(self.token)
+            self.token = self.token_provider.get(self.client)
+            return method(self, *args, **kwargs)
 
     return wrapper
 
 
-def _make_request(
-    *, url: str, token: str | None, raise_for_status: bool = True
-) -> Response:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
-    }
+def _request_headers(token: str | None) -> dict[str, str]:
+    headers = {"User-Agent": USER_AGENT}
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def _make_request(
+    *,
+    url: str,
+    token: str | None,
+    raise_for_status: bool = True,
+    client: httpx.Client | None = None,
+    cache: ResponseCache | None = None,
+    validators: ValidatorStore | None = None,
+    rate_limiter: RateLimiter | None = None,
+    retry: RetryPolicy | None = None,
+    hooks: RequestHooks | None = None,
+) -> Response:
+    request = start_request(hooks, "GET", url)
+    if cache is not None:
+        cache_key = cache.key("GET", url, token)
+        if (cached := cache.get(cache_key)) is not None:
+            if request is not None:
+                request.end(cached, cache_hit=True)
+            return cached
+    headers = _request_headers(token)
+    if validators is not None:
+        headers.update(validators.headers(url))
+    get = client.get if client is not None else httpx.get
+
+    def send() -> Response:
+        return get(url, headers=headers)
+
     try:
-        response = httpx.get(url, headers=headers)
-        if raise_for_status:
+        response = send_with_retries(
+            request.counting(send) if request is not None else send,
+            url,
+            rate_limiter,
+            retry,
+        )
+        not_modified = validators is not None and response.status_code == 304
+        if raise_for_status and not not_modified:
             response.raise_for_status()
     except Exception as E:
+        if request is not None:
+            request.end(error=E)
         raise APIError(E)
+    if request is not None:
+        request.end(response)
+    if cache is not None:
+        cache.set(cache_key, response)
     return response
 
 
+def _default_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0
+    )
+
+
+def _default_timeout() -> httpx.Timeout:
+    return httpx.Timeout(10.0, connect=5.0)
+
+
+def _check_limit(limit: int) -> None:
+    if limit > 99:
+        raise LimitError("Limit cannot be greater than 99.")
+
+
+def _in_context(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    func run in a copy of the caller's context, so spans started on pool
+    threads are children of the caller's span.
+    """
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(func, *args)
+
+
+def _check_concurrency(concurrency: int) -> None:
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1.")
+
+
+def _saved_searches_urls() -> tuple[str, str]:
+    return (
+        f"{BASE_URL}/saved/v2/searches",
+        f"{BASE_URL}/mobility-saved-searches/v1/searches",
+    )
+
+
+def _search_content_url(search_id: int, limit: int) -> str:
+    return f"{BASE_URL}/saved/v2/searches_content/{search_id}?lim={limit}"
+
+
+def _mobility_search_url(search_id: int, limit: int) -> str:
+    return f"{BASE_URL}/mobility-saved-searches/v1/searches/{search_id}/ads?lim={limit}"
+
+
+def _search_id_urls(
+    search_id: int, limit: int, route: SearchBackend | None
+) -> list[tuple[SearchBackend, str]]:
+    """
+    Endpoints to try for a saved search, the recorded backend first.
+    Without a recorded route the regular endpoint is tried first.
+    """
+    urls = [
+        (SearchBackend.saved, _search_content_url(search_id, limit)),
+        (SearchBackend.mobility, _mobility_search_url(search_id, limit)),
+    ]
+    if route is SearchBackend.mobility:
+        urls.reverse()
+    return urls
+
+
+def _listings_url(limit: int) -> str:
+    return BASE_URL + f"/saved/v2/searches_content?lim={limit}"
+
+
+def _custom_search_url(
+    search_query: str, region: Region, category: Category | None, limit: int
+) -> str:
+    url = f"{BASE_URL}/search_bff/v2/content?lim={limit}&q={search_query}&r={region.value}&status=active"
+
+    if category:
+        url += f"&cg={category.value}"
+
+    return url
+
+
+def _motor_search_url(page: int, **params: Any) -> str:
+    range_params = ["price", "modelYear", "milage"]
+    set_params = {key: value for key, value in params.items() if value is not None}
+
+    filters = []
+    for param, value in set_params.items():
+        filter = {"key": param, "values": value}
+        if param in range_params:
+            range_start, range_end = filter.pop("values")
+            filter["range"] = {
+                "start": str(range_start),
+                "end": str(range_end),
+            }
+        filter_str = urllib.parse.quote(str(filter).replace("'", '"'))
+        filters.append(filter_str)
+
+    motor_base_url = f"{BASE_URL}/motor-search-service/v4/search/car"
+
+    filters_str = "&".join([f"filter={f}" for f in filters])
+    return f"{motor_base_url}?{filters_str}&page={page}"
+
+
+def _price_eval_url(registration_number: str) -> str:
+    return f"{BYTBIL_URL}/blocket-basedata-api/v3/vehicle-data/{registration_number}"
+
+
+def _search_store_url(search_query: str, page: int) -> str:
+    return f"{BASE_URL}/search_bff/v1/stores?q={search_query}&page={page}"
+
+
+def _store_listings_url(store_id: int, page: int) -> str:
+    return (
+        f"{BASE_URL}/search_bff/v2/content?lim=60&page={page}&sort=rel&store_id={store_id}"
+        "&status=active&gl=3&include=extend_with_shipping"
+    )
+
+
 @dataclass
 class BlocketAPI:
+    """
+    Every request made by an instance goes through one pooled httpx.Client,
+    so connections to Blocket, Bytbil and Qasa are kept alive between calls.
+    Use it as a context manager, or call close(), to release the pool.
+    http2=True needs the h2 package (pip install blocket_api[http2]).
+
+    Pass a ResponseCache as cache to reuse responses of identical requests
+    for the TTL of their endpoint.
+
+    Requests are paced per host by rate_limiter, which by default is shared
+    by all clients in the process, and rate limited or failed requests are
+    retried as retry says. Pass None to turn either off.
+
+    Identical requests made concurrently from several threads are sent once
+    through single_flight, and every caller gets the same parsed result.
+
+    hooks are told when each request starts and ends, see Metrics.hooks()
+    for per-endpoint latency histograms.
+    """
+
     token: str | None = None
+    limits: httpx.Limits = field(default_factory=_default_limits)
+    timeout: httpx.Timeout = field(default_factory=_default_timeout)
+    http2: bool = False
+    token_provider: PublicTokenProvider = field(
+        default=default_token_provider, repr=False
+    )
+    qasa_persisted_queries: bool = False
+    cache: ResponseCache | None = field(default=None, repr=False)
+    validators: ValidatorStore = field(default_factory=ValidatorStore, repr=False)
+    search_routes: SearchRoutes = field(default_factory=SearchRoutes, repr=False)
+    rate_limiter: RateLimiter | None = field(default=default_rate_limiter, repr=False)
+    retry: RetryPolicy | None = field(default_factory=RetryPolicy, repr=False)
+    single_flight: SingleFlight | None = field(default_factory=SingleFlight, repr=False)
+    hooks: RequestHooks | None = field(default=None, repr=False)
+    client: httpx.Client = field(init=False, repr=False)
+    _public_token: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.client = httpx.Client(
+            headers={"User-Agent": USER_AGENT},
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2,
+        )
+
+    def __enter__(self) -> BlocketAPI:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
 
+    def close(self) -> None:
+        self.client.close()
+
+    def _get(
+        self,
+        url: str,
+        token: str | None,
+        raise_for_status: bool = True,
+        conditional: bool = False,
+    ) -> Response:
+        return _make_request(
+            url=url,
+            token=token,
+            raise_for_status=raise_for_status,
+            client=self.client,
+            cache=None if conditional else self.cache,
+            validators=self.validators if conditional else None,
+            rate_limiter=self.rate_limiter,
+            retry=self.retry,
+            hooks=self.hooks,
+        )
+
+    def _coalesced(self, url: str, token: str | None, fetch: Callable[[], Any]) -> Any:
+        if self.single_flight is None:
+            return fetch()
+        return self.single_flight.do(ResponseCache.key("GET", url, token), fetch)
+
+    def _get_json(self, url: str, token: str | None) -> Any:
+        return self._coalesced(
+            url, token, lambda: codec.loads(self._get(url=url, token=token).content)
+        )
+
+    @traced("blocket.saved_searches")
     @auth_token
     def saved_searches(self) -> list[dict]:
         """
@@ -183,37 +462,81 @@ class BlocketAPI:
         """
         assert self.token
 
-        searches = (
-            _make_request(url=f"{BASE_URL}/saved/v2/searches", token=self.token)
-            .json()
-            .get("data", [])
-        )
-        mobility_searches = (
-            _make_request(
-                url=f"{BASE_URL}/mobility-saved-searches/v1/searches", token=self.token
-            )
-            .json()
-            .get("data", [])
-        )
+        searches_url, mobility_searches_url = _saved_searches_urls()
+        searches = self._get_json(url=searches_url, token=self.token).get("data", [])
+        mobility_searches = self._get_json(
+            url=mobility_searches_url, token=self.token
+        ).get("data", [])
+        self.search_routes.record_searches(searches, SearchBackend.saved)
+        self.search_routes.record_searches(mobility_searches, SearchBackend.mobility)
 
         return searches + mobility_searches
 
-    def _for_search_id(self, search_id: int, limit: int) -> dict:
+    @traced("blocket.saved_searches_if_changed")
+    @auth_token
+    def saved_searches_if_changed(self) -> list[dict] | None:
+        """
+        Like saved_searches(), but returns None when neither backend has
+        changed since the last call. Uses ETag/Last-Modified where the server
+        sends them and a hash of the body otherwise.
+        """
         assert self.token
-        searches = _make_request(
-            url=f"{BASE_URL}/saved/v2/searches_content/{search_id}?lim={limit}",
-            token=self.token,
-            raise_for_status=False,
+
+        urls = _saved_searches_urls()
+        responses = [
+            self._get(url=url, token=self.token, conditional=True) for url in urls
+        ]
+        changed = [
+            not self.validators.is_unchanged(url, response)
+            for url, response in zip(urls, responses)
+        ]
+        if not any(changed):
+            return None
+
+        searches, mobility_searches = (
+            self._get(url=url, token=self.token)
+            if response.status_code == 304
+            else response
+            for url, response in zip(urls, responses)
+        )
+        searches_data = codec.loads(searches.content).get("data", [])
+        mobility_data = codec.loads(mobility_searches.content).get("data", [])
+        self.search_routes.record_searches(searches_data, SearchBackend.saved)
+        self.search_routes.record_searches(mobility_data, SearchBackend.mobility)
+
+        return searches_data + mobility_data
+
+    def _search_id_response(
+        self, search_id: int, limit: int, conditional: bool = False
+    ) -> tuple[str, Response]:
+        assert self.token
+        (backend, url), (fallback, fallback_url) = _search_id_urls(
+            search_id, limit, self.search_routes.get(search_id)
+        )
+        searches = self._get(
+            url=url, token=self.token, raise_for_status=False, conditional=conditional
         )
         if searches.status_code == 404:
-            mobility_searches = _make_request(
-                url=f"{BASE_URL}/mobility-saved-searches/v1/searches/{search_id}/ads?lim={limit}",
-                token=self.token,
-                raise_for_status=True,
-            )
-            return mobility_searches.json()
-        return searches.json()
+            url = fallback_url
+            searches = self._get(url=url, token=self.token, conditional=conditional)
+            backend = fallback
+        if searches.is_success or searches.status_code == 304:
+            self.search_routes.record(search_id, backend)
+        else:
+            try:
+                searches.raise_for_status()
+            except httpx.HTTPStatusError as error:
+                raise APIError(error)
+        return url, searches
 
+    def _for_search_id(self, search_id: int, limit: int) -> dict:
+        return self._coalesced(
+            _search_content_url(search_id, limit),
+            self.token,
+            lambda: codec.loads(self._search_id_response(search_id, limit)[1].content),
+        )
+
+    @traced("blocket.get_listings", arguments=("search_id", "limit"))
     @auth_token
     def get_listings(self, search_id: int | None = None, limit: int = 99) -> dict:
         """
@@ -221,17 +544,55 @@ class BlocketAPI:
         """
         assert self.token
 
-        if limit > 99:
-            raise LimitError("Limit cannot be greater than 99.")
+        _check_limit(limit)
 
         if search_id:
             return self._for_search_id(search_id, limit)
 
-        return _make_request(
-            url=BASE_URL + f"/saved/v2/searches_content?lim={limit}",
-            token=self.token,
-        ).json()
+        return self._get_json(url=_listings_url(limit), token=self.token)
+
+    @traced("blocket.get_listings_many", arguments=("limit", "concurrency"))
+    @auth_token
+    def get_listings_many(
+        self, search_ids: Iterable[int], limit: int = 99, concurrency: int = 8
+    ) -> dict[int, dict | Exception]:
+        """
+        get_listings(search_id=...) for several saved searches, fetched
+        concurrently over the pooled client, at most concurrency at a time.
+        Each id maps to its listings or to the error fetching them raised, so
+        one failing search doesn't fail the others.
+        """
+        _check_limit(limit)
+        _check_concurrency(concurrency)
 
+        def fetch(search_id: int) -> dict | Exception:
+            try:
+                return self._for_search_id(search_id, limit)
+            except Exception as error:
+                return error
+
+        ids = list(dict.fromkeys(search_ids))
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return dict(zip(ids, executor.map(_in_context(fetch), ids)))
+
+    @traced("blocket.get_listings_if_changed", arguments=("search_id", "limit"))
+    @auth_token
+    def get_listings_if_changed(self, search_id: int, limit: int = 99) -> dict | None:
+        """
+        Like get_listings(search_id=...), but returns None when the listings
+        have not changed since the last call, so parsing can be skipped.
+        """
+        _check_limit(limit)
+
+        url, response = self._search_id_response(search_id, limit, conditional=True)
+        if self.validators.is_unchanged(url, response):
+            return None
+        if response.status_code == 304:
+            # The validators were forgotten or never stored, fetch it in full.
+            response = self._get(url=url, token=self.token)
+        return codec.loads(response.content)
+
+    @traced("blocket.custom_search", arguments=("limit",))
     @public_token
     def custom_search(
         self,
@@ -246,16 +607,12 @@ class BlocketAPI:
         """
         assert self.token
 
-        if limit > 99:
-            raise LimitError("Limit cannot be greater than 99.")
-
-        url = f"{BASE_URL}/search_bff/v2/content?lim={limit}&q={search_query}&r={region.value}&status=active"
-
-        if category:
-            url += f"&cg={category.value}"
+        _check_limit(limit)
 
-        return _make_request(url=url, token=self.token).json()
+        url = _custom_search_url(search_query, region, category, limit)
+        return self._get_json(url=url, token=self.token)
 
+    @traced("blocket.motor_search", arguments=("page",))
     @public_token
     def motor_search(
         self,
@@ -274,32 +631,19 @@ class BlocketAPI:
         """
         assert self.token
 
-        range_params = ["price", "modelYear", "milage"]
-        set_params = {
-            key: value
-            for key, value in locals().items()
-            if key not in ["self", "page", "range_params"] and value is not None
-        }
-
-        filters = []
-        for param, value in set_params.items():
-            filter = {"key": param, "values": value}
-            if param in range_params:
-                range_start, range_end = filter.pop("values")
-                filter["range"] = {
-                    "start": str(range_start),
-                    "end": str(range_end),
-                }
-            filter_str = urllib.parse.quote(str(filter).replace("'", '"'))
-            filters.append(filter_str)
-
-        motor_base_url = f"{BASE_URL}/motor-search-service/v4/search/car"
-
-        filters_str = "&".join([f"filter={f}" for f in filters])
-        url = f"{motor_base_url}?{filters_str}&page={page}"
-
-        return _make_request(url=f"{url}", token=self.token).json()
+        url = _motor_search_url(
+            page,
+            make=make,
+            fuel=fuel,
+            chassi=chassi,
+            price=price,
+            modelYear=modelYear,
+            milage=milage,
+            gearbox=gearbox,
+        )
+        return self._get_json(url=url, token=self.token)
 
+    @traced("blocket.price_eval")
     @public_token
     def price_eval(
         self,
@@ -311,9 +655,10 @@ class BlocketAPI:
 
         This is using same api endpoint as https://www.blocket.se/tjanster/vardera-bil.
         """
-        url = f"{BYTBIL_URL}/blocket-basedata-api/v3/vehicle-data/{registration_number}"
-        return _make_request(url=f"{url}", token=None).json()
+        url = _price_eval_url(registration_number)
+        return self._get_json(url=url, token=None)
 
+    @traced("blocket.home_search", arguments=("city", "offset"))
     def home_search(
         self,
         city: str,
@@ -321,11 +666,13 @@ class BlocketAPI:
         order_by: OrderBy = OrderBy.published_at,
         ordering: HOME_SEARCH_ORDERING = "descending",
         offset: int = 0,
+        fields: HomeFields = "full",
     ) -> dict:
         """
         This returns all available home listings available at
         https://bostad.blocket.se/. Specify offset to get next page. Each page contains
         60 items, which is max items returned per api query.
+        Use fields ("minimal", "card" or field names) to fetch less per home.
         """
         return Qasa(
             city=city,
@@ -333,8 +680,65 @@ class BlocketAPI:
             order_by=order_by,
             ordering=ordering,
             offset=offset,
-        ).search()
+            fields=fields,
+            persisted_query=self.qasa_persisted_queries,
+        ).search(
+            client=self.client,
+            cache=self.cache,
+            rate_limiter=self.rate_limiter,
+            retry=self.retry,
+            hooks=self.hooks,
+        )
+
+    def iter_home_search(
+        self,
+        city: str,
+        type: HomeType,
+        order_by: OrderBy = OrderBy.published_at,
+        ordering: HOME_SEARCH_ORDERING = "descending",
+        start_offset: int = 0,
+        fields: HomeFields = "full",
+    ) -> Iterator[dict]:
+        """
+        Iterate over every home from home_search(), prefetching the next page.
+        """
+        return iter_paged(
+            lambda offset: self.home_search(
+                city, type, order_by, ordering, offset, fields
+            ),
+            HOME_PAGER,
+            start_offset,
+        )
+
+    @traced("blocket.home_search_all", arguments=("city", "concurrency"))
+    def home_search_all(
+        self,
+        city: str,
+        type: HomeType,
+        order_by: OrderBy = OrderBy.published_at,
+        ordering: HOME_SEARCH_ORDERING = "descending",
+        concurrency: int = 4,
+        fields: HomeFields = "full",
+    ) -> list[dict]:
+        """
+        Return every home matching the search. The first page tells how many
+        there are, the remaining pages are fetched concurrently, at most
+        concurrency at a time. Homes are deduplicated by id.
+        """
+        _check_concurrency(concurrency)
+        first = self.home_search(city, type, order_by, ordering, fields=fields)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pages = executor.map(
+                _in_context(
+                    lambda offset: self.home_search(
+                        city, type, order_by, ordering, offset, fields
+                    )
+                ),
+                remaining_offsets(first, 0),
+            )
+            return unique_homes([first, *pages])
 
+    @traced("blocket.search_store", arguments=("page",))
     @public_token
     def search_store(
         self,
@@ -345,9 +749,10 @@ class BlocketAPI:
         Searching through Blocket stores from https://www.blocket.se/butiker.
         The store_id is used for get_store_listings().
         """
-        url = f"{BASE_URL}/search_bff/v1/stores?q={search_query}&page={page}"
-        return _make_request(url=f"{url}", token=self.token).json()
+        url = _search_store_url(search_query, page)
+        return self._get_json(url=url, token=self.token)
 
+    @traced("blocket.get_store_listings", arguments=("store_id", "page"))
     @public_token
     def get_store_listings(
         self,
@@ -358,8 +763,58 @@ class BlocketAPI:
         Return all listings from a specific store from https://www.blocket.se/butik/<store>.
         The store_id can be found by searching for the store with search_store().
         """
-        url = (
-            f"{BASE_URL}/search_bff/v2/content?lim=60&page={page}&sort=rel&store_id={store_id}"
-            "&status=active&gl=3&include=extend_with_shipping"
+        url = _store_listings_url(store_id, page)
+        return self._get_json(url=url, token=self.token)
+
+    def iter_motor_search(
+        self,
+        make: List[MAKE_OPTIONS],
+        fuel: Optional[List[FUEL_OPTIONS]] = None,
+        chassi: Optional[List[CHASSI_OPTIONS]] = None,
+        price: Optional[Tuple[int, int]] = None,
+        modelYear: Optional[Tuple[int, int]] = None,
+        milage: Optional[Tuple[int, int]] = None,
+        gearbox: Optional[GEARBOX_OPTIONS] = None,
+        start_page: int = 1,
+    ) -> Iterator[dict]:
+        """
+        Iterate over every car from motor_search(), one at a time. The next
+        page is fetched in the background while the current one is consumed.
+        """
+        return iter_paged(
+            lambda page: self.motor_search(
+                page=page,
+                make=make,
+                fuel=fuel,
+                chassi=chassi,
+                price=price,
+                modelYear=modelYear,
+                milage=milage,
+                gearbox=gearbox,
+            ),
+            MOTOR_PAGER,
+            start_page,
+        )
+
+    def iter_search_store(
+        self, search_query: str, start_page: int = 0
+    ) -> Iterator[dict]:
+        """
+        Iterate over every store from search_store(), prefetching the next page.
+        """
+        return iter_paged(
+            lambda page: self.search_store(search_query, page=page),
+            CONTENT_PAGER,
+            start_page,
+        )
+
+    def iter_store_listings(self, store_id: int, start_page: int = 0) -> Iterator[dict]:
+        """
+        Iterate over every listing from get_store_listings(), prefetching the
+        next page.
+        """
+        return iter_paged(
+            lambda page: self.get_store_listings(store_id, page=page),
+            CONTENT_PAGER,
+            start_page,
         )
-        return _make_request(url=f"{url}", token=self.token).json()
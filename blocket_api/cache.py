@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+
+# Seconds to keep responses per URL path prefix, the longest matching prefix
+# wins. Saved searches are left out since the monitor needs them fresh.
+DEFAULT_TTLS = {
+    "/search_bff/v1/stores": 300.0,
+    "/search_bff/v2/content": 30.0,
+    "/motor-search-service": 60.0,
+    "/blocket-basedata-api": 3600.0,
+    "/graphql": 60.0,
+    "/saved": 0.0,
+    "/mobility-saved-searches": 0.0,
+}
+
+CacheKey = tuple[str, str, str, str]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _digest(value: str | bytes | None) -> str:
+    if not value:
+        return ""
+    if isinstance(value, str):
+        value = value.encode()
+    return hashlib.sha256(value).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU of successful responses, each kept for the TTL of its
+    endpoint. Entries are keyed on method, URL, token and request body, the
+    token is only stored as a digest.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: float = 30.0,
+        ttls: dict[str, float] | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.stats = CacheStats()
+        self._entries: OrderedDict[CacheKey, tuple[float, httpx.Response]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl_for(self, url: str) -> float:
+        path = urlsplit(url).path
+        matches = [prefix for prefix in self.ttls if path.startswith(prefix)]
+        if not matches:
+            return self.default_ttl
+        return self.ttls[max(matches, key=len)]
+
+    @staticmethod
+    def key(
+        method: str, url: str, token: str | None, body: str | bytes | None = None
+    ) -> CacheKey:
+        return (method, url, _digest(token), _digest(body))
+
+    def get(self, key: CacheKey) -> httpx.Response | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires_at, response = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return response
+
+    def set(self, key: CacheKey, response: httpx.Response) -> None:
+        ttl = self.ttl_for(key[1])
+        if ttl <= 0 or not response.is_success:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def invalidate(self, url_prefix: str | None = None) -> int:
+        """
+        Drop entries whose URL starts with url_prefix, or every entry.
+        Returns the number of entries dropped.
+        """
+        with self._lock:
+            if url_prefix is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            keys = [key for key in self._entries if key[1].startswith(url_prefix)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
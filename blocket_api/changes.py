@@ -0,0 +1,202 @@
+"""
+Field-level changes of ads seen before.
+
+ChangeDetector keeps a 64-bit fingerprint of the fields that matter per ad
+(price, status, subject and body), next to the previous price, status and
+hashes of the texts. An unchanged ad costs one hash and one comparison, the
+typed changes are only worked out for ads whose fingerprint differs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from blocket_api import codec
+from blocket_api.files import atomic_write_text
+from blocket_api.models import Ad, listing_ad_id
+
+
+@dataclass(frozen=True)
+class AdChange:
+    ad_id: str
+    # The bevakning the change was seen in, if any.
+    bevakning_id: str | None
+
+
+@dataclass(frozen=True)
+class PriceChanged(AdChange):
+    old_price: int | None
+    new_price: int | None
+
+    @property
+    def lowered(self) -> bool:
+        return (
+            self.old_price is not None
+            and self.new_price is not None
+            and self.new_price < self.old_price
+        )
+
+
+@dataclass(frozen=True)
+class StatusChanged(AdChange):
+    old_status: str | None
+    new_status: str | None
+
+
+@dataclass(frozen=True)
+class Edited(AdChange):
+    # "subject" and/or "body".
+    fields: tuple[str, ...]
+
+
+def _hash(value: Any) -> int:
+    digest = hashlib.blake2b(codec.dumps(value), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def tracked_fields(listing: dict | Ad) -> tuple[int | None, str | None, str, str]:
+    """
+    (price, ad_status, subject, body) of a listing wrapper, ad dict or Ad.
+    """
+    if isinstance(listing, Ad):
+        price = listing.price.value if listing.price is not None else None
+        return price, listing.ad_status, listing.subject or "", listing.body or ""
+    ad = listing.get("ad", listing)
+    return (
+        (ad.get("price") or {}).get("value"),
+        ad.get("ad_status"),
+        ad.get("subject") or "",
+        ad.get("body") or "",
+    )
+
+
+class Snapshot:
+    __slots__ = ("fingerprint", "price", "status", "subject", "body")
+
+    def __init__(
+        self,
+        fingerprint: int,
+        price: int | None,
+        status: str | None,
+        subject: int,
+        body: int,
+    ) -> None:
+        self.fingerprint = fingerprint
+        self.price = price
+        self.status = status
+        self.subject = subject
+        self.body = body
+
+    @classmethod
+    def of(
+        cls, fingerprint: int, fields: tuple[int | None, str | None, str, str]
+    ) -> Snapshot:
+        price, status, subject, body = fields
+        return cls(fingerprint, price, status, _hash(subject), _hash(body))
+
+    def to_list(self) -> list:
+        return [self.fingerprint, self.price, self.status, self.subject, self.body]
+
+
+class ChangeDetector:
+    """
+    ad_id -> Snapshot, optionally persisted to path with save(). The first
+    sighting of an ad only records it, later ones return what changed.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, Snapshot] = self._load()
+        self._changed = False
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def __contains__(self, ad_id: object) -> bool:
+        return ad_id in self._snapshots
+
+    def observe(
+        self, listing: dict | Ad, bevakning_id: str | None = None
+    ) -> list[AdChange]:
+        ad_id = listing_ad_id(listing)
+        if not ad_id:
+            return []
+        fields = tracked_fields(listing)
+        fingerprint = _hash(fields)
+        with self._lock:
+            previous = self._snapshots.get(ad_id)
+            if previous is not None and previous.fingerprint == fingerprint:
+                return []
+            current = Snapshot.of(fingerprint, fields)
+            self._snapshots[ad_id] = current
+            self._changed = True
+        if previous is None:
+            return []
+        return self._diff(ad_id, bevakning_id, previous, current)
+
+    def observe_many(
+        self, bevakning_id: str | None, listings: Iterable[dict | Ad]
+    ) -> list[AdChange]:
+        return [
+            change
+            for listing in listings
+            for change in self.observe(listing, bevakning_id)
+        ]
+
+    def forget(self, ad_id: str) -> None:
+        with self._lock:
+            if self._snapshots.pop(ad_id, None) is not None:
+                self._changed = True
+
+    def _diff(
+        self,
+        ad_id: str,
+        bevakning_id: str | None,
+        previous: Snapshot,
+        current: Snapshot,
+    ) -> list[AdChange]:
+        changes: list[AdChange] = []
+        if previous.price != current.price:
+            changes.append(
+                PriceChanged(ad_id, bevakning_id, previous.price, current.price)
+            )
+        if previous.status != current.status:
+            changes.append(
+                StatusChanged(ad_id, bevakning_id, previous.status, current.status)
+            )
+        edited = tuple(
+            name
+            for name in ("subject", "body")
+            if getattr(previous, name) != getattr(current, name)
+        )
+        if edited:
+            changes.append(Edited(ad_id, bevakning_id, edited))
+        return changes
+
+    def _load(self) -> dict[str, Snapshot]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            data = codec.loads(self.path.read_bytes())
+            return {ad_id: Snapshot(*values) for ad_id, values in data.items()}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def save(self) -> None:
+        if not self.path or not self._changed:
+            return
+        with self._lock:
+            data = {
+                ad_id: snapshot.to_list() for ad_id, snapshot in self._snapshots.items()
+            }
+            self._changed = False
+        try:
+            atomic_write_text(self.path, codec.dumps(data).decode())
+        except OSError:
+            self._changed = True
@@ -0,0 +1,73 @@
+"""
+JSON encoding and decoding used by the client and the monitor.
+
+orjson is used when it is installed (pip install blocket_api[fast]), otherwise
+the stdlib json module. Both decode straight from bytes and encode to compact
+UTF-8 bytes, so callers never need to know which one is active.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+Default = Callable[[Any], Any]
+
+
+class StdlibCodec:
+    name = "json"
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dumps(self, value: Any, default: Default | None = None) -> bytes:
+        return json.dumps(
+            value, ensure_ascii=False, separators=(",", ":"), default=default
+        ).encode()
+
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, value: Any, default: Default | None = None) -> bytes:
+        return orjson.dumps(value, default=default)
+
+
+BACKENDS: dict[str, type[StdlibCodec] | type[OrjsonCodec]] = {"json": StdlibCodec}
+if orjson is not None:
+    BACKENDS["orjson"] = OrjsonCodec
+
+_codec: StdlibCodec | OrjsonCodec = OrjsonCodec() if orjson else StdlibCodec()
+
+
+def backend() -> str:
+    return _codec.name
+
+
+def use_backend(name: str) -> None:
+    """
+    Switch backend for the whole process, e.g. to compare them in benchmarks.
+    """
+    global _codec
+    if name not in BACKENDS:
+        raise ValueError(
+            f"JSON backend {name!r} is not available, use {list(BACKENDS)}"
+        )
+    _codec = BACKENDS[name]()
+
+
+def loads(data: bytes | str) -> Any:
+    return _codec.loads(data)
+
+
+def dumps(value: Any, default: Default | None = None) -> bytes:
+    return _codec.dumps(value, default=default)
@@ -0,0 +1,302 @@
+"""
+Columnar export of listings.
+
+ListingExporter flattens listings into the columns of COLUMNS and writes
+them in record batches of a fixed number of rows, so memory use depends on
+the batch size and not on how many listings are streamed through it. Arrow
+IPC and Parquet files need pyarrow (pip install blocket_api[arrow]).
+Without it CSV is written instead, unless another fallback is given.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Any, Protocol
+
+from blocket_api import codec
+from blocket_api.models import Ad
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None  # type: ignore[assignment]
+    pq = None  # type: ignore[assignment]
+
+COLUMNS = (
+    "ad_id",
+    "bevakning_id",
+    "subject",
+    "price",
+    "old_price",
+    "list_time",
+    "zipcode",
+    "category_ids",
+    "seller_type",
+    "image_count",
+    "discovered_at",
+)
+# File suffix -> format, when no format is given.
+FORMATS = {
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".parquet": "parquet",
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+ARROW_FORMATS = ("arrow", "parquet")
+
+Batch = dict[str, list]
+
+
+def _int(value: Any) -> int | None:
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def listing_row(listing: dict | Ad, bevakning_id: str | None = None) -> dict[str, Any]:
+    """
+    The export columns of a listing wrapper, a bare ad dict or an Ad.
+    """
+    if isinstance(listing, Ad):
+        listing = listing.to_listing()
+    ad = listing["ad"] if isinstance(listing.get("ad"), dict) else listing
+    price = ad.get("price") or {}
+    return {
+        "ad_id": str(ad["ad_id"]) if ad.get("ad_id") is not None else None,
+        "bevakning_id": bevakning_id,
+        "subject": ad.get("subject"),
+        "price": _int(price.get("value")),
+        "old_price": _int(price.get("old_value")),
+        "list_time": ad.get("list_time"),
+        "zipcode": ad.get("zipcode"),
+        "category_ids": [
+            str(category.get("id"))
+            for category in ad.get("category") or []
+            if isinstance(category, dict)
+        ],
+        "seller_type": (ad.get("advertiser") or {}).get("type"),
+        "image_count": len(ad.get("images") or []),
+        "discovered_at": listing.get("discovered_at"),
+    }
+
+
+def grouped_listings(
+    listings: Mapping[str, Iterable[dict | Ad]],
+) -> Iterator[tuple[str, dict | Ad]]:
+    """
+    (bevakning_id, listing) pairs of listings per bevakning id, as kept by
+    the monitor.
+    """
+    for bevakning_id, bevakning_listings in listings.items():
+        for listing in bevakning_listings:
+            yield bevakning_id, listing
+
+
+def arrow_schema() -> Any:
+    return pa.schema(
+        [
+            ("ad_id", pa.string()),
+            ("bevakning_id", pa.string()),
+            ("subject", pa.string()),
+            ("price", pa.int64()),
+            ("old_price", pa.int64()),
+            # ISO 8601 as returned by the API.
+            ("list_time", pa.string()),
+            ("zipcode", pa.string()),
+            ("category_ids", pa.list_(pa.string())),
+            ("seller_type", pa.string()),
+            ("image_count", pa.int32()),
+            ("discovered_at", pa.string()),
+        ]
+    )
+
+
+class _Writer(Protocol):
+    def write(self, batch: Batch) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class _ArrowWriter:
+    def __init__(self, path: Path) -> None:
+        self.schema = arrow_schema()
+        self.sink = pa.OSFile(str(path), "wb")
+        self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def write(self, batch: Batch) -> None:
+        self.writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+        self.sink.close()
+
+
+class _ParquetWriter:
+    # One row group per batch.
+    def __init__(self, path: Path) -> None:
+        self.schema = arrow_schema()
+        self.writer = pq.ParquetWriter(str(path), self.schema)
+
+    def write(self, batch: Batch) -> None:
+        self.writer.write_table(pa.Table.from_pydict(batch, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _CSVWriter:
+    # Category ids are joined with commas.
+    def __init__(self, path: Path) -> None:
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, batch: Batch) -> None:
+        columns = dict(
+            batch, category_ids=[",".join(ids) for ids in batch["category_ids"]]
+        )
+        self.writer.writerows(zip(*(columns[name] for name in COLUMNS)))
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _NDJSONWriter:
+    def __init__(self, path: Path) -> None:
+        self.file: IO[bytes] = open(path, "wb")
+
+    def write(self, batch: Batch) -> None:
+        self.file.writelines(
+            codec.dumps(dict(zip(COLUMNS, values))) + b"\n"
+            for values in zip(*(batch[name] for name in COLUMNS))
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+WRITERS: dict[str, Callable[[Path], _Writer]] = {
+    "arrow": _ArrowWriter,
+    "parquet": _ParquetWriter,
+    "csv": _CSVWriter,
+    "ndjson": _NDJSONWriter,
+}
+
+
+def _empty_batch() -> Batch:
+    return {name: [] for name in COLUMNS}
+
+
+class ListingExporter:
+    """
+    Export listings to path as "arrow", "parquet", "csv" or "ndjson",
+    defaulting to the format of its suffix.
+
+    When pyarrow is missing Arrow and Parquet exports are written in the
+    fallback format instead, with its suffix; path and format tell what was
+    written. Pass fallback=None to raise ImportError instead.
+
+    Use it as a context manager. The file is written next to path and
+    renamed into place when closed, or removed if an exception is raised.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        format: str | None = None,
+        batch_size: int = 10_000,
+        fallback: str | None = "csv",
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        path = Path(path)
+        format = format or FORMATS.get(path.suffix.lower())
+        if format not in WRITERS:
+            raise ValueError(
+                f"Unknown export format for {path}, use one of {', '.join(WRITERS)}"
+            )
+        if format in ARROW_FORMATS and pa is None:
+            if fallback is None:
+                raise ImportError(
+                    f"{format} export needs pyarrow, pip install blocket_api[arrow]"
+                )
+            format, path = fallback, path.with_suffix(f".{fallback}")
+        self.path = path
+        self.format = format
+        self.batch_size = batch_size
+        # Rows written so far.
+        self.rows = 0
+        self._tmp = path.with_suffix(path.suffix + ".tmp")
+        self._writer = WRITERS[format](self._tmp)
+        self._batch = _empty_batch()
+
+    def write(self, listing: dict | Ad, bevakning_id: str | None = None) -> None:
+        for name, value in listing_row(listing, bevakning_id).items():
+            self._batch[name].append(value)
+        if len(self._batch["ad_id"]) >= self.batch_size:
+            self.flush()
+
+    def write_many(
+        self, listings: Iterable[dict | Ad], bevakning_id: str | None = None
+    ) -> None:
+        for listing in listings:
+            self.write(listing, bevakning_id)
+
+    def flush(self) -> None:
+        """
+        Write the rows buffered so far as a record batch.
+        """
+        rows = len(self._batch["ad_id"])
+        if not rows:
+            return
+        self._writer.write(self._batch)
+        self.rows += rows
+        self._batch = _empty_batch()
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        self._writer.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> ListingExporter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if exc is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def export_listings(
+    listings: Iterable[tuple[str | None, dict | Ad]],
+    path: str | Path,
+    format: str | None = None,
+    batch_size: int = 10_000,
+    fallback: str | None = "csv",
+) -> ListingExporter:
+    """
+    Export (bevakning_id, listing) pairs, e.g. from
+    SQLiteListingStore.bevakning_listings() or grouped_listings(). Returns
+    the closed exporter, with the path and format written and the number
+    of rows.
+    """
+    with ListingExporter(path, format, batch_size, fallback) as exporter:
+        for bevakning_id, listing in listings:
+            exporter.write(listing, bevakning_id)
+    return exporter
@@ -0,0 +1,134 @@
+"""
+Event hooks around the requests a client makes.
+
+Every request, including ones answered from the cache, calls the start
+hooks before it is sent and the end hooks once it is done, with its
+endpoint template, status, latency, size, retries and whether it was a
+cache hit. See Metrics for a collector built on them.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+
+T = TypeVar("T")
+
+# Path segments that identify a resource rather than an endpoint: anything
+# with a digit in it, apart from API versions like v2.
+_ID_SEGMENT = re.compile(r"(?!v\d+$).*\d.*")
+
+
+def endpoint_template(url: str) -> str:
+    """
+    host/path of url with ids replaced by {id} and the query dropped, so
+    requests for different searches or ads share one endpoint.
+    """
+    parts = urlsplit(url)
+    segments = [
+        "{id}" if _ID_SEGMENT.fullmatch(segment) else segment
+        for segment in parts.path.split("/")
+    ]
+    return f"{parts.hostname}{'/'.join(segments)}"
+
+
+@dataclass
+class RequestStart:
+    method: str
+    url: str
+    endpoint: str
+
+
+@dataclass
+class RequestEnd:
+    method: str
+    url: str
+    endpoint: str
+    # None when no response was received.
+    status: int | None
+    # Seconds from start to end, including rate limiting and retries.
+    latency: float
+    bytes: int
+    retries: int
+    cache_hit: bool
+    error: Exception | None = None
+
+
+class RequestHooks:
+    """
+    Callables run on the thread or event loop making the request, so they
+    should return quickly. Exceptions raised by them are not caught.
+    """
+
+    def __init__(
+        self,
+        on_start: list[Callable[[RequestStart], None]] | None = None,
+        on_end: list[Callable[[RequestEnd], None]] | None = None,
+    ) -> None:
+        self.on_start = list(on_start or [])
+        self.on_end = list(on_end or [])
+
+    def extend(self, other: RequestHooks) -> RequestHooks:
+        """
+        Add the hooks of other after these, returns self.
+        """
+        self.on_start.extend(other.on_start)
+        self.on_end.extend(other.on_end)
+        return self
+
+    def start(self, method: str, url: str) -> ObservedRequest:
+        event = RequestStart(method, url, endpoint_template(url))
+        for hook in self.on_start:
+            hook(event)
+        return ObservedRequest(self, event)
+
+
+class ObservedRequest:
+    """
+    A request between its start and end hooks.
+    """
+
+    def __init__(self, hooks: RequestHooks, event: RequestStart) -> None:
+        self.hooks = hooks
+        self.event = event
+        self.attempts = 0
+        self.started = time.perf_counter()
+
+    def counting(self, send: Callable[[], T]) -> Callable[[], T]:
+        """
+        Wrap send to count how many times it is called, i.e. retried.
+        """
+
+        def counted() -> T:
+            self.attempts += 1
+            return send()
+
+        return counted
+
+    def end(
+        self,
+        response: httpx.Response | None = None,
+        cache_hit: bool = False,
+        error: Exception | None = None,
+    ) -> None:
+        if response is None and isinstance(error, httpx.HTTPStatusError):
+            response = error.response
+        event = RequestEnd(
+            method=self.event.method,
+            url=self.event.url,
+            endpoint=self.event.endpoint,
+            status=response.status_code if response is not None else None,
+            latency=time.perf_counter() - self.started,
+            bytes=len(response.content) if response is not None else 0,
+            retries=max(0, self.attempts - 1),
+            cache_hit=cache_hit,
+            error=error,
+        )
+        for hook in self.hooks.on_end:
+            hook(event)
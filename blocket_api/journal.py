@@ -0,0 +1,267 @@
+"""
+Append-only JSON lines journal of monitored listings.
+
+Every stored listing is one line, {"bevakning_id": ..., "listing": {...}},
+so saving new listings costs a write proportional to the listings added, not
+to the whole database. An ad that is already stored for another bevakning is
+written as a reference, {"bevakning_id": ..., "ad_id": ...}, so each ad is
+stored once. The last full line for an ad wins when the journal is loaded.
+Superseded and unreadable lines are dropped by compaction, which rewrites
+the journal next to itself and renames it into place.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import IO, Any
+
+from blocket_api import codec
+from blocket_api.models import Ad, listing_ad_id
+
+EntryKey = tuple[str, str]
+
+
+def _listing_json(value: Any) -> Any:
+    if isinstance(value, Ad):
+        return value.to_listing()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class ListingJournal:
+    """
+    Journal of listings per bevakning id.
+
+    load() rebuilds the listings from the file, append() adds lines for new
+    or updated listings and maybe_compact() rewrites the file in a
+    background thread once more than garbage_ratio of its lines are
+    superseded or unreadable.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        garbage_ratio: float = 0.5,
+        min_garbage_lines: int = 1000,
+        fsync: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.garbage_ratio = garbage_ratio
+        self.min_garbage_lines = min_garbage_lines
+        self.fsync = fsync
+        self.lines = 0
+        self.compactions = 0
+        self._keys: set[EntryKey] = set()
+        self._lock = threading.Lock()
+        self._file: IO[bytes] | None = None
+        self._compaction: threading.Thread | None = None
+        # Lines appended while a compaction is writing its snapshot.
+        self._tail: list[bytes] | None = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    @property
+    def garbage(self) -> int:
+        return self.lines - len(self._keys)
+
+    def load(self) -> dict[str, list[dict]]:
+        """
+        Listings per bevakning id. An ad matched by several bevakningar is
+        the same dict in each of their lists.
+        """
+        # Entries are an ad_id to resolve once every line is read, or the
+        # listing itself when it has no ad_id.
+        listings: dict[str, dict[str, str | dict]] = {}
+        ads: dict[str, dict] = {}
+        lines = 0
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        entry = codec.loads(line)
+                        bevakning_id = str(entry["bevakning_id"])
+                        if "listing" in entry:
+                            listing = entry["listing"]
+                            ad_id = listing_ad_id(listing)
+                        else:
+                            listing = None
+                            ad_id = str(entry["ad_id"])
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        continue
+                    if not ad_id:
+                        listings.setdefault(bevakning_id, {})[f"#{lines}"] = listing
+                        continue
+                    if listing is not None:
+                        ads[ad_id] = listing
+                    listings.setdefault(bevakning_id, {})[ad_id] = ad_id
+        resolved = {
+            bevakning_id: [
+                ads[entry] if isinstance(entry, str) else entry
+                for entry in entries.values()
+                if not isinstance(entry, str) or entry in ads
+            ]
+            for bevakning_id, entries in listings.items()
+        }
+        with self._lock:
+            self.lines = lines
+            self._keys = {
+                (bevakning_id, key)
+                for bevakning_id, entries in listings.items()
+                for key, entry in entries.items()
+                if not isinstance(entry, str) or entry in ads
+            }
+        return resolved
+
+    def append(self, bevakning_id: str, listings: Iterable[dict | Ad]) -> int:
+        """
+        Append listings for a bevakning, returns the number of lines written.
+        """
+        keys = []
+        data = []
+        for listing in listings:
+            keys.append((bevakning_id, listing_ad_id(listing)))
+            data.append(self._line(bevakning_id, listing))
+        return self._write(keys, data)
+
+    def append_references(self, bevakning_id: str, ad_ids: Iterable[str]) -> int:
+        """
+        Append references from a bevakning to ads already in the journal.
+        """
+        keys = []
+        data = []
+        for ad_id in ad_ids:
+            keys.append((bevakning_id, ad_id))
+            data.append(self._reference(bevakning_id, ad_id))
+        return self._write(keys, data)
+
+    def _write(self, keys: list[EntryKey], data: list[bytes]) -> int:
+        if not data:
+            return 0
+        with self._lock:
+            f = self._open()
+            f.write(b"".join(data))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            if self._tail is not None:
+                self._tail.extend(data)
+            self.lines += len(data)
+            self._keys.update(keys)
+        return len(data)
+
+    def needs_compaction(self) -> bool:
+        garbage = self.garbage
+        return (
+            garbage >= self.min_garbage_lines
+            and garbage >= self.garbage_ratio * self.lines
+        )
+
+    def maybe_compact(self, listings: Mapping[str, list]) -> bool:
+        """
+        Start a background compaction from listings if enough of the journal
+        is garbage and no compaction is running. Returns whether one started.
+        """
+        if not self.needs_compaction():
+            return False
+        return self.compact(listings, background=True)
+
+    def compact(self, listings: Mapping[str, list], background: bool = False) -> bool:
+        """
+        Rewrite the journal with exactly the given listings. The listings are
+        copied before returning, so the caller may keep changing them while a
+        background compaction writes.
+        """
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return False
+            snapshot = {
+                bevakning_id: list(entries)
+                for bevakning_id, entries in listings.items()
+            }
+            self._tail = []
+            self._compaction = None
+            if background:
+                self._compaction = threading.Thread(
+                    target=self._write_compacted,
+                    args=(snapshot,),
+                    name="blocket-journal-compaction",
+                    daemon=True,
+                )
+                self._compaction.start()
+        if not background:
+            self._write_compacted(snapshot)
+        return True
+
+    def wait(self) -> None:
+        """
+        Wait for a running compaction to finish.
+        """
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+
+    def close(self) -> None:
+        self.wait()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _line(self, bevakning_id: str, listing: dict | Ad) -> bytes:
+        entry = {"bevakning_id": bevakning_id, "listing": listing}
+        return codec.dumps(entry, default=_listing_json) + b"\n"
+
+    def _reference(self, bevakning_id: str, ad_id: str) -> bytes:
+        return codec.dumps({"bevakning_id": bevakning_id, "ad_id": ad_id}) + b"\n"
+
+    def _open(self) -> IO[bytes]:
+        if self._file is None:
+            torn = False
+            if self.path.exists() and self.path.stat().st_size:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._file = open(self.path, "ab")
+            if torn:
+                # Terminate a line left half written by a crash, so the next
+                # entry starts on a line of its own.
+                self._file.write(b"\n")
+        return self._file
+
+    def _write_compacted(self, snapshot: dict[str, list]) -> None:
+        tmp = self.path.with_suffix(self.path.suffix + ".compact")
+        try:
+            written = 0
+            keys: set[EntryKey] = set()
+            stored: set[str] = set()
+            with open(tmp, "wb") as f:
+                for bevakning_id, entries in snapshot.items():
+                    for listing in entries:
+                        ad_id = listing_ad_id(listing)
+                        keys.add((bevakning_id, ad_id))
+                        if ad_id and ad_id in stored:
+                            f.write(self._reference(bevakning_id, ad_id))
+                        else:
+                            f.write(self._line(bevakning_id, listing))
+                            stored.add(ad_id)
+                        written += 1
+                with self._lock:
+                    tail = self._tail or []
+                    f.write(b"".join(tail))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    os.replace(tmp, self.path)
+                    if self._file is not None:
+                        self._file.close()
+                        self._file = None
+                    self.lines = written + len(tail)
+                    self._keys |= keys
+                    self.compactions += 1
+        finally:
+            with self._lock:
+                self._tail = None
+            tmp.unlink(missing_ok=True)
@@ -0,0 +1,259 @@
+"""
+In-process metrics: counters, gauges and histograms with labels, rendered
+in the Prometheus text format or as JSON.
+
+Metrics.hooks() gives RequestHooks that record latency histograms and
+request, byte, retry and cache hit counters per endpoint of a client.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from blocket_api import codec
+from blocket_api.files import atomic_write_text
+from blocket_api.hooks import RequestEnd, RequestHooks
+
+# Upper bounds in seconds, as used by the Prometheus client libraries.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...]
+    # Observations per bucket, the last one counts those above every bound.
+    counts: list[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        self.counts = self.counts or [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """
+        (le, observations <= le) per bucket, ending with +Inf.
+        """
+        bounds = [_format(bound) for bound in self.buckets] + ["+Inf"]
+        total = 0
+        result = []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+@dataclass
+class Metric:
+    kind: str
+    help: str
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    values: dict[Labels, float] = field(default_factory=dict)
+    histograms: dict[Labels, Histogram] = field(default_factory=dict)
+
+
+REQUEST_METRICS = {
+    "blocket_request_duration_seconds": (
+        "histogram",
+        "Request latency per endpoint, including rate limiting and retries.",
+    ),
+    "blocket_requests_total": ("counter", "Requests per endpoint and status."),
+    "blocket_response_bytes_total": ("counter", "Response bytes per endpoint."),
+    "blocket_request_retries_total": ("counter", "Retried attempts per endpoint."),
+    "blocket_cache_hits_total": ("counter", "Requests answered from the cache."),
+}
+
+
+def _format(value: float) -> str:
+    return repr(float(value))
+
+
+def _labels(labels: Mapping[str, str] | None) -> Labels:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _render_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    pairs = [*labels, extra] if extra else list(labels)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """
+    Metrics are declared with describe(), or on first use without help text.
+    Collectors run before every render, to set gauges that are computed
+    from other state, e.g. how long ago something happened.
+    """
+
+    def __init__(self) -> None:
+        self.collectors: list[Callable[[], None]] = []
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+        for name, (kind, help) in REQUEST_METRICS.items():
+            self.describe(name, kind, help)
+
+    def describe(
+        self,
+        name: str,
+        kind: str,
+        help: str,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """
+        kind is counter, gauge or histogram.
+        """
+        with self._lock:
+            self._metrics.setdefault(name, Metric(kind, help, buckets))
+
+    def _metric(self, name: str, kind: str) -> Metric:
+        if name not in self._metrics:
+            self._metrics[name] = Metric(kind, "")
+        return self._metrics[name]
+
+    def inc(
+        self, name: str, value: float = 1, labels: Mapping[str, str] | None = None
+    ) -> None:
+        key = _labels(labels)
+        with self._lock:
+            values = self._metric(name, "counter").values
+            values[key] = values.get(key, 0) + value
+
+    def set(
+        self, name: str, value: float, labels: Mapping[str, str] | None = None
+    ) -> None:
+        with self._lock:
+            self._metric(name, "gauge").values[_labels(labels)] = value
+
+    def observe(
+        self, name: str, value: float, labels: Mapping[str, str] | None = None
+    ) -> None:
+        key = _labels(labels)
+        with self._lock:
+            metric = self._metric(name, "histogram")
+            if key not in metric.histograms:
+                metric.histograms[key] = Histogram(metric.buckets)
+            metric.histograms[key].observe(value)
+
+    def get(
+        self, name: str, labels: Mapping[str, str] | None = None
+    ) -> float | Histogram | None:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                return None
+            key = _labels(labels)
+            return metric.histograms.get(key, metric.values.get(key))
+
+    def request_end(self, event: RequestEnd) -> None:
+        endpoint = {"endpoint": event.endpoint}
+        status = str(event.status) if event.status is not None else "error"
+        self.observe("blocket_request_duration_seconds", event.latency, endpoint)
+        self.inc("blocket_requests_total", 1, {**endpoint, "status": status})
+        self.inc("blocket_response_bytes_total", event.bytes, endpoint)
+        if event.retries:
+            self.inc("blocket_request_retries_total", event.retries, endpoint)
+        if event.cache_hit:
+            self.inc("blocket_cache_hits_total", 1, endpoint)
+
+    def hooks(self) -> RequestHooks:
+        return RequestHooks(on_end=[self.request_end])
+
+    def _collect(self) -> None:
+        for collector in self.collectors:
+            collector()
+
+    def prometheus(self) -> str:
+        self._collect()
+        lines = []
+        with self._lock:
+            for name, metric in sorted(self._metrics.items()):
+                if not metric.values and not metric.histograms:
+                    continue
+                if metric.help:
+                    lines.append(f"# HELP {name} {metric.help}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+                for labels, value in sorted(metric.values.items()):
+                    lines.append(f"{name}{_render_labels(labels)} {_format(value)}")
+                for labels, histogram in sorted(metric.histograms.items()):
+                    for bound, count in histogram.cumulative():
+                        rendered = _render_labels(labels, ("le", bound))
+                        lines.append(f"{name}_bucket{rendered} {count}")
+                    rendered = _render_labels(labels)
+                    lines.append(f"{name}_sum{rendered} {_format(histogram.sum)}")
+                    lines.append(f"{name}_count{rendered} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        self._collect()
+        with self._lock:
+            return {
+                name: {
+                    "type": metric.kind,
+                    "samples": [
+                        {"labels": dict(labels), "value": value}
+                        for labels, value in sorted(metric.values.items())
+                    ]
+                    + [
+                        {
+                            "labels": dict(labels),
+                            "count": histogram.count,
+                            "sum": histogram.sum,
+                            "buckets": dict(histogram.cumulative()),
+                        }
+                        for labels, histogram in sorted(metric.histograms.items())
+                    ],
+                }
+                for name, metric in sorted(self._metrics.items())
+                if metric.values or metric.histograms
+            }
+
+    def dump(self, path: str | Path) -> None:
+        """
+        Write to_dict() to path as JSON, replacing it atomically.
+        """
+        atomic_write_text(Path(path), codec.dumps(self.to_dict()).decode())
+
+
+def serve_metrics(
+    metrics: Metrics, port: int, host: str = "127.0.0.1"
+) -> ThreadingHTTPServer:
+    """
+    Serve metrics in the Prometheus text format on http://host:port/metrics
+    from a daemon thread. Call shutdown() on the returned server to stop.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,281 @@
+"""
+Compact, typed views of Blocket ads.
+
+An Ad keeps the fields that are read on every poll (id, subject, price, list
+time, zipcode, status) as plain attributes and packs everything else into a
+compact JSON blob that is only decoded when one of those fields is accessed.
+Nothing is lost, to_dict()/to_listing() return the original JSON.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from blocket_api import codec
+
+HOT_FIELDS = ("ad_id", "subject", "price", "list_time", "zipcode", "ad_status")
+
+
+def _pack(value: dict) -> bytes:
+    if not value:
+        return b""
+    return codec.dumps(value)
+
+
+def _unpack(blob: bytes) -> dict:
+    if not blob:
+        return {}
+    return codec.loads(blob)
+
+
+def _take(raw: dict, key: str) -> Any:
+    """
+    Pop key if it holds a value. Missing keys and explicit nulls stay in raw,
+    so they round-trip unchanged.
+    """
+    value = raw.get(key)
+    if value is None:
+        return None
+    return raw.pop(key)
+
+
+class Price:
+    __slots__ = ("value", "old_value", "suffix", "price_lowered", "_extra")
+
+    def __init__(
+        self,
+        value: int | None = None,
+        old_value: int | None = None,
+        suffix: str | None = None,
+        price_lowered: bool | None = None,
+        extra: dict | None = None,
+    ) -> None:
+        self.value = value
+        self.old_value = old_value
+        self.suffix = suffix
+        self.price_lowered = price_lowered
+        self._extra = extra or None
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> Price:
+        raw = dict(raw)
+        return cls(
+            value=_take(raw, "value"),
+            old_value=_take(raw, "old_value"),
+            suffix=_take(raw, "suffix"),
+            price_lowered=_take(raw, "price_lowered"),
+            extra=raw,
+        )
+
+    def to_dict(self) -> dict:
+        result = {
+            key: value
+            for key in ("value", "old_value", "suffix", "price_lowered")
+            if (value := getattr(self, key)) is not None
+        }
+        result.update(self._extra or {})
+        return result
+
+    def __repr__(self) -> str:
+        return f"Price(value={self.value!r}, old_value={self.old_value!r})"
+
+
+class Image:
+    __slots__ = ("url", "width", "height", "type")
+
+    def __init__(
+        self,
+        url: str,
+        width: int | None = None,
+        height: int | None = None,
+        type: str | None = None,
+    ) -> None:
+        self.url = url
+        self.width = width
+        self.height = height
+        self.type = type
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> Image:
+        return cls(
+            url=raw.get("url", ""),
+            width=raw.get("width"),
+            height=raw.get("height"),
+            type=raw.get("type"),
+        )
+
+    def __repr__(self) -> str:
+        return f"Image(url={self.url!r})"
+
+
+class Advertiser:
+    __slots__ = ("name", "type", "account_id", "_raw")
+
+    def __init__(self, raw: dict) -> None:
+        self.name: str | None = raw.get("name")
+        self.type: str | None = raw.get("type")
+        self.account_id: str | None = raw.get("account_id")
+        self._raw = raw
+
+    @property
+    def is_private(self) -> bool:
+        return self.type == "private"
+
+    @property
+    def public_profile(self) -> dict:
+        return self._raw.get("public_profile") or {}
+
+    def to_dict(self) -> dict:
+        return self._raw
+
+    def __repr__(self) -> str:
+        return f"Advertiser(name={self.name!r}, type={self.type!r})"
+
+
+class Ad:
+    """
+    A Blocket ad, optionally with the listing wrapper it came in
+    ({"ad": {...}, "is_new": ..., "discovered_at": ...}).
+    """
+
+    __slots__ = (
+        "ad_id",
+        "subject",
+        "price",
+        "list_time",
+        "zipcode",
+        "ad_status",
+        "discovered_at",
+        "_cold",
+        "_listing",
+    )
+
+    def __init__(
+        self,
+        ad_id: str | None,
+        subject: str | None = None,
+        price: Price | None = None,
+        list_time: str | None = None,
+        zipcode: str | None = None,
+        ad_status: str | None = None,
+        discovered_at: str | None = None,
+        cold: bytes = b"",
+        listing: bytes | None = None,
+    ) -> None:
+        self.ad_id = ad_id
+        self.subject = subject
+        self.price = price
+        self.list_time = list_time
+        self.zipcode = zipcode
+        self.ad_status = ad_status
+        self.discovered_at = discovered_at
+        self._cold = cold
+        self._listing = listing
+
+    @classmethod
+    def from_dict(cls, ad: dict) -> Ad:
+        raw = dict(ad)
+        price = _take(raw, "price")
+        return cls(
+            ad_id=_take(raw, "ad_id"),
+            subject=_take(raw, "subject"),
+            price=Price.from_dict(price) if isinstance(price, dict) else None,
+            list_time=_take(raw, "list_time"),
+            zipcode=_take(raw, "zipcode"),
+            ad_status=_take(raw, "ad_status"),
+            cold=_pack(raw),
+        )
+
+    @classmethod
+    def from_listing(cls, listing: dict) -> Ad:
+        """
+        Accepts a listing wrapper from get_listings(), or a bare ad dict as
+        returned by the search endpoints.
+        """
+        if not isinstance(listing.get("ad"), dict):
+            return cls.from_dict(listing)
+        outer = dict(listing)
+        ad = cls.from_dict(outer.pop("ad"))
+        ad.discovered_at = _take(outer, "discovered_at")
+        ad._listing = _pack(outer)
+        return ad
+
+    def to_dict(self) -> dict:
+        ad = {
+            key: value.to_dict() if isinstance(value, Price) else value
+            for key in HOT_FIELDS
+            if (value := getattr(self, key)) is not None
+        }
+        ad.update(_unpack(self._cold))
+        return ad
+
+    def to_listing(self) -> dict:
+        """
+        The listing wrapper this ad was built from, or the bare ad dict.
+        """
+        if self._listing is None:
+            return self.to_dict()
+        listing = {"ad": self.to_dict(), **_unpack(self._listing)}
+        if self.discovered_at is not None:
+            listing["discovered_at"] = self.discovered_at
+        return listing
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Raw access to any field of the ad, decoding it on demand.
+        """
+        if key in HOT_FIELDS and (value := getattr(self, key)) is not None:
+            return value.to_dict() if isinstance(value, Price) else value
+        return _unpack(self._cold).get(key, default)
+
+    @property
+    def body(self) -> str:
+        return self.get("body", "")
+
+    @property
+    def images(self) -> list[Image]:
+        return [Image.from_dict(image) for image in self.get("images") or []]
+
+    @property
+    def advertiser(self) -> Advertiser | None:
+        advertiser = self.get("advertiser")
+        return Advertiser(advertiser) if advertiser else None
+
+    @property
+    def category_ids(self) -> list[str]:
+        return [str(category.get("id")) for category in self.get("category") or []]
+
+    @property
+    def share_url(self) -> str | None:
+        return self.get("share_url")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Ad):
+            return NotImplemented
+        return self.to_listing() == other.to_listing()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"Ad(ad_id={self.ad_id!r}, subject={self.subject!r}, price={self.price!r})"
+        )
+
+
+def listing_ad_id(listing: dict | Ad) -> str:
+    """
+    ad_id of a listing wrapper, a bare ad dict or an Ad, "" when it has none.
+    """
+    if isinstance(listing, Ad):
+        return listing.ad_id or ""
+    ad = listing.get("ad")
+    if isinstance(ad, dict):
+        return str(ad.get("ad_id") or "")
+    return str(listing.get("ad_id") or "")
+
+
+def ads_from_response(response: dict) -> list[Ad]:
+    """
+    Ads from the data of a listings or search response.
+    """
+    return [Ad.from_listing(listing) for listing in response.get("data") or []]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Pager:
+    """
+    Describes how a paged endpoint lays out its items, and whether there is
+    a page after the current cursor. step is how far the cursor moves per page.
+    """
+
+    items: Callable[[dict], list]
+    has_next: Callable[[dict, int, list], bool]
+    step: int = 1
+
+
+def _content_has_next(response: dict, page: int, items: list) -> bool:
+    total_pages = response.get("total_page_count")
+    if total_pages is None:
+        return bool(items)
+    return bool(items) and page + 1 < total_pages
+
+
+def _motor_has_next(response: dict, page: int, items: list) -> bool:
+    last_page = response.get("pagination", {}).get("lastPage")
+    if last_page is None:
+        return bool(items)
+    return bool(items) and page < last_page
+
+
+# search_bff endpoints, pages are numbered from 0.
+CONTENT_PAGER = Pager(
+    items=lambda response: response.get("data") or [],
+    has_next=_content_has_next,
+)
+
+# motor-search-service, pages are numbered from 1.
+MOTOR_PAGER = Pager(
+    items=lambda response: response.get("cards") or [],
+    has_next=_motor_has_next,
+)
+
+
+def iter_paged(
+    fetch: Callable[[int], dict], pager: Pager, start: int
+) -> Iterator[dict]:
+    """
+    Yield items page by page, fetching the next page in a background thread
+    while the current one is consumed. At most two pages are held at a time,
+    the one being yielded and the next one in flight.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="blocket-page")
+    try:
+        cursor = start
+        future: Future[dict] | None = executor.submit(fetch, cursor)
+        while future is not None:
+            response = future.result()
+            items = pager.items(response)
+            future = None
+            if pager.has_next(response, cursor, items):
+                cursor += pager.step
+                future = executor.submit(fetch, cursor)
+            yield from items
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_paged(
+    fetch: Callable[[int], Awaitable[dict]], pager: Pager, start: int
+) -> AsyncIterator[dict]:
+    """
+    Async counterpart of iter_paged, the next page is fetched in a task.
+    """
+
+    async def fetch_page(cursor: int) -> dict:
+        return await fetch(cursor)
+
+    cursor = start
+    task: asyncio.Task[dict] | None = asyncio.create_task(fetch_page(cursor))
+    try:
+        while task is not None:
+            response = await task
+            items = pager.items(response)
+            task = None
+            if pager.has_next(response, cursor, items):
+                cursor += pager.step
+                task = asyncio.create_task(fetch_page(cursor))
+            for item in items:
+                yield item
+    finally:
+        if task is not None:
+            task.cancel()
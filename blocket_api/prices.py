@@ -0,0 +1,407 @@
+"""
+Asking prices over time, for spotting underpriced ads.
+
+PriceHistory keeps one row per new ad or price change in typed arrays:
+(ad, bevakning, category, region, timestamp, price), with the strings
+interned to ints. Hundreds of thousands of rows take a few megabytes, and
+save() writes all of them again as raw column bytes after a small JSON
+header, without encoding each row. Statistics are computed over the
+latest price of each matching ad, with NumPy when it is installed
+(pip install blocket_api[stats]) and the statistics module otherwise.
+"""
+
+from __future__ import annotations
+
+import math
+import statistics
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from blocket_api import codec
+from blocket_api.files import atomic_write_bytes
+from blocket_api.models import Ad, listing_ad_id
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None  # type: ignore[assignment]
+
+MAGIC = b"BPH1"
+# Column -> array typecode, in the order they are written.
+COLUMNS = {
+    "ad": "i",
+    "bevakning": "i",
+    "category": "i",
+    "region": "i",
+    "time": "d",
+    "price": "q",
+}
+# Columns holding interned strings, -1 when missing.
+NAMED = ("ad", "bevakning", "category", "region")
+# Groups with fewer ads than this give no z-score.
+MIN_SAMPLES = 5
+
+
+def price_fields(listing: dict | Ad) -> tuple[Any, str | None, str | None]:
+    """
+    (price, category id, region) of a listing wrapper, ad dict or Ad. The
+    category is the most specific one, the region the first location name.
+    """
+    if isinstance(listing, Ad):
+        price = listing.price.value if listing.price is not None else None
+        categories = listing.category_ids
+        location = listing.get("location")
+    else:
+        ad = listing.get("ad", listing)
+        price = (ad.get("price") or {}).get("value")
+        categories = [str(category.get("id")) for category in ad.get("category") or []]
+        location = ad.get("location")
+    region = None
+    if isinstance(location, list) and location and isinstance(location[0], dict):
+        region = location[0].get("name")
+    return price, categories[-1] if categories else None, region
+
+
+def _percentile(values: list[float], q: float) -> float:
+    # Linear interpolation between the closest ranks, like numpy.percentile.
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class _Names:
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    def intern(self, name: str | None) -> int:
+        if name is None:
+            return -1
+        i = self.index.get(name)
+        if i is None:
+            i = self.index[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+
+@dataclass(frozen=True)
+class PriceStats:
+    count: int
+    mean: float
+    # Population standard deviation.
+    std: float
+    median: float
+
+    def zscore(self, price: float, exclude: float | None = None) -> float | None:
+        """
+        Standard deviations price lies above (or below, when negative) the
+        mean, None when there are too few ads or all cost the same. exclude
+        is a price left out of the statistics first, e.g. the ad's own.
+        """
+        count, mean, std = self.count, self.mean, self.std
+        if exclude is not None and count > 1:
+            # Remove one value from the mean and the sum of squared deviations.
+            count -= 1
+            mean = (self.mean * self.count - exclude) / count
+            squares = self.std**2 * self.count
+            left = squares - (exclude - self.mean) * (exclude - mean)
+            # Rounding leaves a tiny remainder when the other prices are equal.
+            std = math.sqrt(left / count) if left > squares * 1e-9 else 0.0
+        if count < MIN_SAMPLES or not std:
+            return None
+        return (price - mean) / std
+
+
+class PriceHistory:
+    """
+    Price rows of every ad, optionally persisted to path with save(). An ad
+    gets a new row per bevakning when it is first recorded and whenever its
+    price changes.
+
+    Queries filter on bevakning_id, category, region and since (a Unix
+    timestamp), and use the latest price of each ad left.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self.columns: dict[str, array[Any]] = {
+            name: array(code) for name, code in COLUMNS.items()
+        }
+        self._names = {name: _Names() for name in NAMED}
+        # (ad, bevakning) -> last recorded price
+        self._last: dict[tuple[int, int], int] = {}
+        self._changed = False
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.columns["price"])
+
+    def record(
+        self,
+        listing: dict | Ad,
+        bevakning_id: str | None = None,
+        seen_at: float | None = None,
+    ) -> bool:
+        """
+        Add a row for listing unless its price is unchanged, returns whether
+        one was added. Listings without an ad_id or a price are ignored.
+        """
+        ad_id = listing_ad_id(listing)
+        price, category, region = price_fields(listing)
+        if not ad_id or not isinstance(price, int):
+            return False
+        with self._lock:
+            ad = self._names["ad"].intern(ad_id)
+            bevakning = self._names["bevakning"].intern(bevakning_id)
+            if self._last.get((ad, bevakning)) == price:
+                return False
+            self._last[ad, bevakning] = price
+            self.columns["ad"].append(ad)
+            self.columns["bevakning"].append(bevakning)
+            self.columns["category"].append(self._names["category"].intern(category))
+            self.columns["region"].append(self._names["region"].intern(region))
+            self.columns["time"].append(time.time() if seen_at is None else seen_at)
+            self.columns["price"].append(price)
+            self._changed = True
+        return True
+
+    def record_many(
+        self,
+        bevakning_id: str | None,
+        listings: Iterable[dict | Ad],
+        seen_at: float | None = None,
+    ) -> int:
+        return sum(self.record(listing, bevakning_id, seen_at) for listing in listings)
+
+    def prices(
+        self,
+        bevakning_id: str | None = None,
+        category: str | None = None,
+        region: str | None = None,
+        since: float | None = None,
+    ) -> list[float]:
+        """
+        Latest price of each matching ad.
+        """
+        latest = self._latest(bevakning_id, category, region, since)
+        return latest if isinstance(latest, list) else latest.tolist()
+
+    def stats(
+        self,
+        bevakning_id: str | None = None,
+        category: str | None = None,
+        region: str | None = None,
+        since: float | None = None,
+    ) -> PriceStats | None:
+        """
+        None when no ad matches.
+        """
+        return self._stats(self._latest(bevakning_id, category, region, since))
+
+    def _stats(self, latest: Any) -> PriceStats | None:
+        if not len(latest):
+            return None
+        if isinstance(latest, list):
+            return PriceStats(
+                count=len(latest),
+                mean=statistics.fmean(latest),
+                std=statistics.pstdev(latest),
+                median=statistics.median(latest),
+            )
+        return PriceStats(
+            count=len(latest),
+            mean=float(latest.mean()),
+            std=float(latest.std()),
+            median=float(np.median(latest)),
+        )
+
+    def percentile(
+        self,
+        q: float,
+        bevakning_id: str | None = None,
+        category: str | None = None,
+        region: str | None = None,
+        since: float | None = None,
+    ) -> float | None:
+        """
+        q-th percentile (0-100) of the latest prices, None when no ad matches.
+        """
+        if not 0 <= q <= 100:
+            raise ValueError("q must be between 0 and 100")
+        latest = self._latest(bevakning_id, category, region, since)
+        if not len(latest):
+            return None
+        if isinstance(latest, list):
+            return _percentile(latest, q)
+        return float(np.percentile(latest, q))
+
+    def zscores(
+        self,
+        listings: Iterable[dict | Ad],
+        bevakning_id: str | None = None,
+        since: float | None = None,
+    ) -> list[float | None]:
+        """
+        Z-score of the price of each listing among the other ads in its
+        category and region, computing the statistics once per category and
+        region. An ad already recorded is left out of its own group. None for
+        listings without a price or with too few ads to compare to.
+        """
+        groups: dict[
+            tuple[str | None, str | None], tuple[PriceStats | None, dict[int, float]]
+        ] = {}
+        scores: list[float | None] = []
+        for listing in listings:
+            price, category, region = price_fields(listing)
+            if not isinstance(price, int):
+                scores.append(None)
+                continue
+            if (category, region) not in groups:
+                ads, latest = self._latest_ads(bevakning_id, category, region, since)
+                values = latest if isinstance(latest, list) else latest.tolist()
+                groups[category, region] = (self._stats(latest), dict(zip(ads, values)))
+            group, own_prices = groups[category, region]
+            ad = self._names["ad"].index.get(listing_ad_id(listing))
+            own = own_prices.get(ad) if ad is not None else None
+            scores.append(group.zscore(price, exclude=own) if group else None)
+        return scores
+
+    def _latest(
+        self,
+        bevakning_id: str | None,
+        category: str | None,
+        region: str | None,
+        since: float | None,
+    ) -> Any:
+        # A list, or a NumPy array when it is installed.
+        return self._latest_ads(bevakning_id, category, region, since)[1]
+
+    def _latest_ads(
+        self,
+        bevakning_id: str | None,
+        category: str | None,
+        region: str | None,
+        since: float | None,
+    ) -> tuple[list[int], Any]:
+        # Interned ids of the matching ads and their latest prices.
+        filters = {}
+        for name, value in (
+            ("bevakning", bevakning_id),
+            ("category", category),
+            ("region", region),
+        ):
+            if value is None:
+                continue
+            index = self._names[name].index.get(value)
+            if index is None:
+                return [], []
+            filters[name] = index
+        with self._lock:
+            # Arrays can't grow while NumPy views of them exist, so the views
+            # never outlive the lock.
+            if np is not None and len(self):
+                return self._latest_numpy(filters, since)
+            return self._latest_python(filters, since)
+
+    def _latest_numpy(
+        self, filters: dict[str, int], since: float | None
+    ) -> tuple[list[int], Any]:
+        columns = {
+            name: np.frombuffer(column, dtype=column.typecode)
+            for name, column in self.columns.items()
+        }
+        mask = np.ones(len(self), dtype=bool)
+        for name, index in filters.items():
+            mask &= columns[name] == index
+        if since is not None:
+            mask &= columns["time"] >= since
+        # Newest first, so unique() finds the latest row of each ad.
+        rows = np.flatnonzero(mask)[::-1]
+        ads, first = np.unique(columns["ad"][rows], return_index=True)
+        return ads.tolist(), columns["price"][rows[first]].astype(float)
+
+    def _latest_python(
+        self, filters: dict[str, int], since: float | None
+    ) -> tuple[list[int], list[float]]:
+        rows: Iterable[int] = range(len(self))
+        for name, index in filters.items():
+            column = self.columns[name]
+            rows = [row for row in rows if column[row] == index]
+        if since is not None:
+            times = self.columns["time"]
+            rows = [row for row in rows if times[row] >= since]
+        ads, prices = self.columns["ad"], self.columns["price"]
+        latest = {ads[row]: float(prices[row]) for row in rows}
+        return list(latest), list(latest.values())
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = self.path.read_bytes()
+            if data[:4] != MAGIC:
+                raise ValueError("not a price history file")
+            (size,) = struct.unpack_from("<I", data, 4)
+            meta = codec.loads(data[8 : 8 + size])
+            offset = 8 + size
+            columns: dict[str, array[Any]] = {}
+            for name, code in COLUMNS.items():
+                column = array(code)
+                end = offset + meta["rows"] * column.itemsize
+                column.frombytes(data[offset:end])
+                if len(column) != meta["rows"]:
+                    raise ValueError("truncated price history file")
+                if meta["byteorder"] != sys.byteorder:
+                    column.byteswap()
+                columns[name] = column
+                offset = end
+            names = {name: _Names(meta["names"][name]) for name in NAMED}
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            return
+        self.columns = columns
+        self._names = names
+        self._last = {
+            (ad, bevakning): price
+            for ad, bevakning, price in zip(
+                columns["ad"], columns["bevakning"], columns["price"]
+            )
+        }
+
+    def save(self) -> None:
+        """
+        Write a small JSON header with the interned names, followed by the
+        raw bytes of every column.
+        """
+        if not self.path or not self._changed:
+            return
+        with self._lock:
+            header = codec.dumps(
+                {
+                    "rows": len(self),
+                    "byteorder": sys.byteorder,
+                    "names": {name: self._names[name].names for name in NAMED},
+                }
+            )
+            data = b"".join(
+                [
+                    MAGIC,
+                    struct.pack("<I", len(header)),
+                    header,
+                    *(column.tobytes() for column in self.columns.values()),
+                ]
+            )
+            self._changed = False
+        try:
+            atomic_write_bytes(self.path, data)
+        except OSError:
+            self._changed = True
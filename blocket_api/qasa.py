@@ -1,10 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Awaitable, Iterable
 from dataclasses import dataclass
 from enum import Enum
-from typing import Literal
+from functools import lru_cache
+from typing import Literal, Union
 import httpx
 
+from blocket_api import codec
+from blocket_api.cache import CacheKey, ResponseCache
+from blocket_api.hooks import RequestHooks
+from blocket_api.pagination import Pager
+from blocket_api.throttle import (
+    RateLimiter,
+    RetryPolicy,
+    asend_with_retries,
+    send_with_retries,
+)
+from blocket_api.tracing import start_request
+
 QASA_URL = "https://api.qasa.se/graphql"
 HOME_SEARCH_ORDERING = Literal["descending", "ascending"]
+PAGE_SIZE = 60  # no more than 60 items per page is allowed
+
+# Sub-selections for the home fields that are objects rather than scalars.
+NESTED_HOME_FIELDS = {
+    "location": (
+        "id locality countryCode streetNumber point { lat lon __typename } "
+        "route __typename"
+    ),
+    "uploads": "id order type url __typename",
+}
+HOME_FIELDS = (
+    "bedroomCount",
+    "blockListing",
+    "rentalLengthSeconds",
+    "householdSize",
+    "corporateHome",
+    "description",
+    "endDate",
+    "firstHand",
+    "furnished",
+    "homeType",
+    "id",
+    "instantSign",
+    "market",
+    "lastBumpedAt",
+    "monthlyCost",
+    "petsAllowed",
+    "platform",
+    "publishedAt",
+    "publishedOrBumpedAt",
+    "earlyAccessEndsAt",
+    "rent",
+    "currency",
+    "roomCount",
+    "seniorHome",
+    "shared",
+    "shortcutHome",
+    "smokingAllowed",
+    "sortingScore",
+    "squareMeters",
+    "startDate",
+    "studentHome",
+    "tenantBaseFee",
+    "title",
+    "wheelchairAccessible",
+    "location",
+    "displayStreetNumber",
+    "uploads",
+)
+PROJECTIONS = {
+    "minimal": ("id", "rent", "squareMeters", "location"),
+    "card": (
+        "id",
+        "title",
+        "homeType",
+        "rent",
+        "monthlyCost",
+        "currency",
+        "roomCount",
+        "squareMeters",
+        "furnished",
+        "startDate",
+        "publishedAt",
+        "location",
+        "uploads",
+    ),
+    "full": HOME_FIELDS,
+}
+HOME_PROJECTION = Literal["minimal", "card", "full"]
+HomeFields = Union[HOME_PROJECTION, Iterable[str]]
 
 
 class OrderBy(Enum):
@@ -23,20 +110,117 @@ class HomeType(Enum):
     other = ["other"]
 
 
+def _documents(response: dict) -> dict:
+    return (response.get("data") or {}).get("homeIndexSearch", {}).get("documents", {})
+
+
+def home_nodes(response: dict) -> list[dict]:
+    return _documents(response).get("nodes") or []
+
+
+def remaining_offsets(response: dict, offset: int) -> range:
+    """
+    Offsets of the pages after the one in response, from its totalCount.
+    """
+    documents = _documents(response)
+    total = documents.get("totalCount")
+    if total is None:
+        total = documents.get("pagesCount", 0) * PAGE_SIZE
+    return range(offset + PAGE_SIZE, total, PAGE_SIZE)
+
+
+def unique_homes(pages: Iterable[dict]) -> list[dict]:
+    homes: dict[object, dict] = {}
+    for page in pages:
+        for home in home_nodes(page):
+            homes.setdefault(home.get("id") or id(home), home)
+    return list(homes.values())
+
+
+def _field_names(fields: HomeFields) -> tuple[str, ...]:
+    if isinstance(fields, str):
+        if fields not in PROJECTIONS:
+            raise ValueError(
+                f"Unknown projection {fields!r}, use one of {list(PROJECTIONS)}"
+            )
+        return PROJECTIONS[fields]
+    names = tuple(fields)
+    unknown = set(names) - set(HOME_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown home fields: {sorted(unknown)}")
+    return names
+
+
+@lru_cache(maxsize=32)
+def home_search_query(fields: tuple[str, ...]) -> tuple[str, str]:
+    """
+    Build the HomeSearch query selecting only fields on each home.
+    Returns the query and its sha256 hash for persisted queries.
+    """
+    selection = " ".join(
+        f"{name} {{ {NESTED_HOME_FIELDS[name]} }}"
+        if name in NESTED_HOME_FIELDS
+        else name
+        for name in fields
+    )
+    query = (
+        "query HomeSearch($order: HomeIndexSearchOrderInput, $offset: Int, "
+        "$limit: Int, $params: HomeSearchParamsInput) { "
+        "homeIndexSearch(order: $order, params: $params) { "
+        "documents(offset: $offset, limit: $limit) { "
+        f"hasNextPage hasPreviousPage nodes {{ {selection} __typename }} "
+        "pagesCount totalCount __typename } __typename } }"
+    )
+    return query, hashlib.sha256(query.encode()).hexdigest()
+
+
+def _persisted_query_missing(response: httpx.Response) -> bool:
+    if response.status_code not in (200, 400):
+        return False
+    try:
+        errors = codec.loads(response.content).get("errors") or []
+    except ValueError:
+        return False
+    return any(
+        error.get("message") == "PersistedQueryNotFound"
+        or (error.get("extensions") or {}).get("code")
+        in ("PERSISTED_QUERY_NOT_FOUND", "PERSISTED_QUERY_NOT_SUPPORTED")
+        for error in errors
+    )
+
+
+HOME_PAGER = Pager(
+    items=home_nodes,
+    has_next=lambda response, offset, items: (
+        bool(items) and bool(_documents(response).get("hasNextPage"))
+    ),
+    step=PAGE_SIZE,
+)
+
+
 @dataclass
 class Qasa:
+    """
+    fields is a named projection ("minimal", "card", "full") or the home
+    fields to select. With persisted_query the query text is replaced by its
+    hash, and only sent again when the server does not know the hash yet.
+    """
+
     city: str
     home_type: HomeType
     order_by: OrderBy
     ordering: HOME_SEARCH_ORDERING
     offset: int
+    fields: HomeFields = "full"
+    persisted_query: bool = False
 
-    def _construct_payload(self) -> dict:
-        return {
+    def _construct_payload(self, include_query: bool = True) -> dict:
+        query, query_hash = home_search_query(_field_names(self.fields))
+        payload: dict = {
             "operationName": "HomeSearch",
             "variables": {
-                "limit": 60,  # no more than 60 items per page is allowed
-                "offset": 0,
+                "limit": PAGE_SIZE,
+                "offset": self.offset,
                 "order": {
                     "direction": f"{self.ordering}",
                     "orderBy": f"{self.order_by.value}",
@@ -49,87 +233,108 @@ class Qasa:
                     "markets": ["sweden"],
                 },
             },
-            "query": """
-                query HomeSearch(
-                    $order: HomeIndexSearchOrderInput, 
-                    $offset: Int, 
-                    $limit: Int, 
-                    $params: HomeSearchParamsInput
-                ) {
-                    homeIndexSearch(order: $order, params: $params) {
-                        documents(offset: $offset, limit: $limit) {
-                            hasNextPage
-                            hasPreviousPage
-                            nodes {
-                                bedroomCount
-                                blockListing
-                                rentalLengthSeconds
-                                householdSize
-                                corporateHome
-                                description
-                                endDate
-                                firstHand
-                                furnished
-                                homeType
-                                id
-                                instantSign
-                                market
-                                lastBumpedAt
-                                monthlyCost
-                                petsAllowed
-                                platform
-                                publishedAt
-                                publishedOrBumpedAt
-                                earlyAccessEndsAt
-                                rent
-                                currency
-                                roomCount
-                                seniorHome
-                                shared
-                                shortcutHome
-                                smokingAllowed
-                                sortingScore
-                                squareMeters
-                                startDate
-                                studentHome
-                                tenantBaseFee
-                                title
-                                wheelchairAccessible
-                                location {
-                                    id
-                                    locality
-                                    countryCode
-                                    streetNumber
-                                    point {
-                                    lat
-                                    lon
-                                    __typename
-                                    }
-                                    route
-                                    __typename
-                                }
-                                displayStreetNumber
-                                uploads {
-                                    id
-                                    order
-                                    type
-                                    url
-                                    __typename
-                                }
-                                __typename
-                            }
-                            pagesCount
-                            totalCount
-                            __typename
-                        }
-                    __typename
-                    }
-                }""",
         }
+        if include_query:
+            payload["query"] = query
+        if self.persisted_query:
+            payload["extensions"] = {
+                "persistedQuery": {"version": 1, "sha256Hash": query_hash}
+            }
+        return payload
+
+    def _cache_key(self, cache: ResponseCache) -> CacheKey:
+        body = codec.dumps(self._construct_payload())
+        return cache.key("POST", QASA_URL, None, body)
+
+    def search(
+        self,
+        client: httpx.Client | None = None,
+        cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        retry: RetryPolicy | None = None,
+        hooks: RequestHooks | None = None,
+    ) -> dict:
+        if cache is not None:
+            cache_key = self._cache_key(cache)
+            if (cached := cache.get(cache_key)) is not None:
+                if (request := start_request(hooks, "POST", QASA_URL)) is not None:
+                    request.end(cached, cache_hit=True)
+                return codec.loads(cached.content)
+        post = client.post if client is not None else httpx.post
+
+        def send(payload: dict) -> httpx.Response:
+            request = start_request(hooks, "POST", QASA_URL)
+
+            def attempt() -> httpx.Response:
+                return post(QASA_URL, json=payload)
+
+            try:
+                response = send_with_retries(
+                    request.counting(attempt) if request is not None else attempt,
+                    QASA_URL,
+                    rate_limiter,
+                    retry,
+                )
+            except Exception as error:
+                if request is not None:
+                    request.end(error=error)
+                raise
+            if request is not None:
+                request.end(response)
+            return response
+
+        response = None
+        if self.persisted_query:
+            response = send(self._construct_payload(include_query=False))
+        if response is None or _persisted_query_missing(response):
+            response = send(self._construct_payload())
+        response.raise_for_status()
+        if cache is not None:
+            cache.set(cache_key, response)
+        return codec.loads(response.content)
+
+    async def async_search(
+        self,
+        client: httpx.AsyncClient,
+        cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        retry: RetryPolicy | None = None,
+        hooks: RequestHooks | None = None,
+    ) -> dict:
+        if cache is not None:
+            cache_key = self._cache_key(cache)
+            if (cached := cache.get(cache_key)) is not None:
+                if (request := start_request(hooks, "POST", QASA_URL)) is not None:
+                    request.end(cached, cache_hit=True)
+                return codec.loads(cached.content)
+
+        async def send(payload: dict) -> httpx.Response:
+            request = start_request(hooks, "POST", QASA_URL)
+
+            def attempt() -> Awaitable[httpx.Response]:
+                return client.post(QASA_URL, json=payload)
 
-    def search(self) -> dict:
-        query = self._construct_payload()
+            try:
+                response = await asend_with_retries(
+                    request.counting(attempt) if request is not None else attempt,
+                    QASA_URL,
+                    rate_limiter,
+                    retry,
+                )
+            except Exception as error:
+                if request is not None:
+                    request.end(error=error)
+                raise
+            if request is not None:
+                request.end(response)
+            return response
 
-        response = httpx.post(QASA_URL, json=query)
+        response = None
+        if self.persisted_query:
+            response = await send(self._construct_payload(include_query=False))
+        if response is None or _persisted_query_missing(response):
+            response = await send(self._construct_payload())
         response.raise_for_status()
-        return response.json()
+        if cache is not None:
+            cache.set(cache_key, response)
+        return codec.loads(response.content)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import httpx
+
+from blocket_api.files import atomic_write_text
+
+
+@dataclass
+class Validators:
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class ValidatorStore:
+    """
+    Remembers ETag, Last-Modified and a hash of the body for each polled URL.
+
+    headers() gives the conditional headers for the next request, and
+    is_unchanged() tells whether a response carries the same data as last
+    time, either through a 304 or, when the server sends no validators,
+    through an identical body. With a path, save() persists the validators
+    so a restarted poller can keep revalidating.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._validators: dict[str, Validators] = self._load()
+
+    def headers(self, url: str) -> dict[str, str]:
+        validators = self._validators.get(url)
+        headers: dict[str, str] = {}
+        if validators is None:
+            return headers
+        if validators.etag:
+            headers["If-None-Match"] = validators.etag
+        if validators.last_modified:
+            headers["If-Modified-Since"] = validators.last_modified
+        return headers
+
+    def is_unchanged(self, url: str, response: httpx.Response) -> bool:
+        if response.status_code == 304:
+            return url in self._validators
+        if not response.is_success:
+            return False
+        validators = Validators(
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            content_hash=content_hash(response.content),
+        )
+        with self._lock:
+            previous = self._validators.get(url)
+            self._validators[url] = validators
+        return previous is not None and previous.content_hash == validators.content_hash
+
+    def forget(self, url: str) -> None:
+        with self._lock:
+            self._validators.pop(url, None)
+
+    def _load(self) -> dict[str, Validators]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text())
+            return {url: Validators(**values) for url, values in data.items()}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            data = {url: asdict(values) for url, values in self._validators.items()}
+        try:
+            atomic_write_text(self.path, json.dumps(data))
+        except OSError:
+            pass
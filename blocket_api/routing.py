@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import threading
+from enum import Enum
+from pathlib import Path
+
+from blocket_api.files import atomic_write_text
+
+
+class SearchBackend(Enum):
+    saved = "saved"
+    mobility = "mobility"
+
+
+class SearchRoutes:
+    """
+    Remembers which backend each saved search lives on, so listings can be
+    fetched from the right endpoint without probing the other one first.
+    With a path the table is persisted between runs.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._routes: dict[str, SearchBackend] = self._load()
+
+    def get(self, search_id: int | str) -> SearchBackend | None:
+        return self._routes.get(str(search_id))
+
+    def record(self, search_id: int | str, backend: SearchBackend) -> None:
+        self.update({str(search_id): backend})
+
+    def record_searches(self, searches: list[dict], backend: SearchBackend) -> None:
+        self.update(
+            {str(search["id"]): backend for search in searches if "id" in search}
+        )
+
+    def update(self, routes: dict[str, SearchBackend]) -> None:
+        with self._lock:
+            if all(self._routes.get(key) == value for key, value in routes.items()):
+                return
+            self._routes.update(routes)
+            self._save()
+
+    def _load(self) -> dict[str, SearchBackend]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text())
+            return {key: SearchBackend(value) for key, value in data.items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            atomic_write_text(
+                self.path,
+                json.dumps({key: value.value for key, value in self._routes.items()}),
+            )
+        except OSError:
+            pass
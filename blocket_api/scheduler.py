@@ -0,0 +1,187 @@
+"""
+Adaptive polling of saved searches.
+
+Each search gets its own next-due time from the rate at which new items
+arrive in it, so searches that get new ads all the time are polled often and
+quiet ones rarely, within fixed bounds. The total_count and new_count of a
+search decide whether its listings need to be fetched at all, and are only
+kept once they were.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from blocket_api.files import atomic_write_text
+
+
+@dataclass
+class Schedule:
+    interval: float
+    next_due: float = 0.0
+    last_poll: float | None = None
+    # Smoothed number of new items per second.
+    rate: float = 0.0
+    total_count: int | None = None
+    new_count: int | None = None
+
+
+class PollScheduler:
+    """
+    Keeps a Schedule per search id.
+
+    Polls aim to find about target_items new items each, the interval is
+    target_items / rate, bounded by min_interval and max_interval. A search
+    without new items doubles its interval instead. Every interval is
+    spread by +/- jitter so searches don't end up polled in lockstep.
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = 300.0,
+        min_interval: float = 60.0,
+        max_interval: float = 3600.0,
+        target_items: float = 1.0,
+        smoothing: float = 0.3,
+        jitter: float = 0.1,
+        path: str | Path | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.initial_interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_items = target_items
+        self.smoothing = smoothing
+        self.jitter = jitter
+        self.path = Path(path) if path else None
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._schedules: dict[str, Schedule] = self._load()
+
+    def get(self, search_id: int | str) -> Schedule | None:
+        return self._schedules.get(str(search_id))
+
+    def due(self, searches: list[dict], now: float | None = None) -> list[dict]:
+        """
+        The searches that should be polled now. Unknown searches are due.
+        """
+        now = self.clock() if now is None else now
+        return [
+            search
+            for search in searches
+            if (schedule := self._schedules.get(str(search["id"]))) is None
+            or schedule.next_due <= now
+        ]
+
+    def seconds_until_next(self, now: float | None = None) -> float:
+        now = self.clock() if now is None else now
+        if not self._schedules:
+            return 0.0
+        next_due = min(schedule.next_due for schedule in self._schedules.values())
+        return max(0.0, next_due - now)
+
+    def observe(self, search: dict, now: float | None = None) -> bool:
+        """
+        Compare the counters of a polled search to the last committed ones
+        and schedule its next poll. Returns whether total_count or new_count
+        changed, which is always the case for a search seen the first time.
+        Unchanged counters are committed right away, changed ones only by
+        commit() once the listings were fetched, so a failed fetch is
+        retried on the next poll.
+        """
+        now = self.clock() if now is None else now
+        total = search.get("total_count", 0)
+        new = search.get("new_count", 0)
+        with self._lock:
+            schedule = self._schedules.get(str(search["id"]))
+            if schedule is None:
+                schedule = Schedule(interval=self.initial_interval)
+                self._schedules[str(search["id"])] = schedule
+            changed = (total, new) != (schedule.total_count, schedule.new_count)
+            if changed:
+                self._schedule_next(schedule, now)
+            else:
+                self._record(schedule, total, new, now)
+        return changed
+
+    def commit(self, search: dict, now: float | None = None) -> None:
+        """
+        Record the counters of a search whose listings were fetched, and
+        reschedule it from the rate at which they grew.
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            schedule = self._schedules.get(str(search["id"]))
+            if schedule is None:
+                schedule = Schedule(interval=self.initial_interval)
+                self._schedules[str(search["id"])] = schedule
+            self._record(
+                schedule, search.get("total_count", 0), search.get("new_count", 0), now
+            )
+
+    def _record(self, schedule: Schedule, total: int, new: int, now: float) -> None:
+        if schedule.last_poll is not None and now > schedule.last_poll:
+            arrived = max(
+                total - (schedule.total_count or 0),
+                new - (schedule.new_count or 0),
+                0,
+            )
+            self._update_rate(schedule, arrived, now - schedule.last_poll)
+        schedule.total_count = total
+        schedule.new_count = new
+        schedule.last_poll = now
+        self._schedule_next(schedule, now)
+
+    def _schedule_next(self, schedule: Schedule, now: float) -> None:
+        spread = 1 + self.jitter * (2 * random.random() - 1)
+        schedule.next_due = now + schedule.interval * spread
+
+    def forget(self, search_id: int | str) -> None:
+        with self._lock:
+            self._schedules.pop(str(search_id), None)
+
+    def prune(self, searches: list[dict]) -> list[str]:
+        """
+        Forget the schedules of searches no longer among searches, e.g.
+        deleted ones, whose past next_due would otherwise make
+        seconds_until_next() return 0 for good. Returns the forgotten ids.
+        """
+        current = {str(search["id"]) for search in searches}
+        with self._lock:
+            removed = [key for key in self._schedules if key not in current]
+        for key in removed:
+            self.forget(key)
+        return removed
+
+    def _update_rate(self, schedule: Schedule, arrived: int, elapsed: float) -> None:
+        schedule.rate += self.smoothing * (arrived / elapsed - schedule.rate)
+        if arrived:
+            interval = self.target_items / schedule.rate
+        else:
+            interval = schedule.interval * 2
+        schedule.interval = min(self.max_interval, max(self.min_interval, interval))
+
+    def _load(self) -> dict[str, Schedule]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text())
+            return {key: Schedule(**values) for key, values in data.items()}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            data = {key: asdict(schedule) for key, schedule in self._schedules.items()}
+        try:
+            atomic_write_text(self.path, json.dumps(data))
+        except OSError:
+            pass
@@ -0,0 +1,93 @@
+"""
+Coalescing of identical in-flight requests.
+
+While a call for a key is running, further calls for the same key wait for
+it and get its result instead of making their own request. Nothing is kept
+once the call completes, so this only removes concurrent duplicates, see
+ResponseCache for reusing results over time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class FlightStats:
+    calls: int = 0
+    coalesced: int = 0
+
+
+class SingleFlight:
+    """
+    For threads. Every caller of a coalesced call gets the same result
+    object, so treat it as read-only.
+    """
+
+    def __init__(self) -> None:
+        self.stats = FlightStats()
+        self._calls: dict[Hashable, Future[Any]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            waiting = self._calls.get(key)
+            if waiting is None:
+                call: Future[Any] = Future()
+                self._calls[key] = call
+                self.stats.calls += 1
+            else:
+                self.stats.coalesced += 1
+        if waiting is not None:
+            return waiting.result()
+        try:
+            result = fn()
+        except BaseException as error:
+            call.set_exception(error)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    For asyncio. The call runs in its own task, so a cancelled caller does
+    not cancel it for the others.
+    """
+
+    def __init__(self) -> None:
+        self.stats = FlightStats()
+        self._calls: dict[Hashable, asyncio.Task[Any]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.stats.coalesced += 1
+        else:
+
+            async def call() -> T:
+                return await fn()
+
+            task = asyncio.create_task(call())
+            self._calls[key] = task
+            self.stats.calls += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every caller went away.
+            task.exception()
@@ -0,0 +1,347 @@
+"""
+Persistent storage for the listings found by the monitor.
+
+SQLiteListingStore keeps bevakningar, ads and the links between them in
+SQLite, so searches with months of history can be queried without loading
+everything into memory. Unlike the single listings table of
+database/schema.sql, each ad is stored once in ads, and bevakning_listings
+holds the bevakning_id and discovered_at of every bevakning that matched it.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Protocol
+
+from blocket_api import codec
+from blocket_api.models import Ad
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bevakningar (
+    bevakning_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    user_id TEXT DEFAULT 'default_user',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    is_active INTEGER DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS ads (
+    ad_id TEXT PRIMARY KEY,
+    title TEXT,
+    price REAL,
+    currency TEXT DEFAULT 'kr',
+    description TEXT,
+    category TEXT,
+    location TEXT,
+    seller_type TEXT,
+    blocket_url TEXT,
+    images TEXT DEFAULT '[]',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    raw BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS bevakning_listings (
+    bevakning_id TEXT NOT NULL,
+    ad_id TEXT NOT NULL REFERENCES ads(ad_id),
+    discovered_at TEXT NOT NULL,
+    PRIMARY KEY (bevakning_id, ad_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_bevakning_listings_ad_id
+    ON bevakning_listings(ad_id);
+CREATE INDEX IF NOT EXISTS idx_bevakning_listings_bevakning_discovered
+    ON bevakning_listings(bevakning_id, discovered_at);
+CREATE INDEX IF NOT EXISTS idx_bevakning_listings_discovered_at
+    ON bevakning_listings(discovered_at);
+"""
+
+UPSERT_AD = """
+INSERT INTO ads (
+    ad_id, title, price, currency, description, category, location,
+    seller_type, blocket_url, images, created_at, updated_at, raw
+) VALUES (
+    :ad_id, :title, :price, :currency, :description, :category, :location,
+    :seller_type, :blocket_url, :images, :now, :now, :raw
+)
+ON CONFLICT (ad_id) DO UPDATE SET
+    title = excluded.title,
+    price = excluded.price,
+    currency = excluded.currency,
+    description = excluded.description,
+    category = excluded.category,
+    location = excluded.location,
+    seller_type = excluded.seller_type,
+    blocket_url = excluded.blocket_url,
+    images = excluded.images,
+    updated_at = excluded.updated_at,
+    raw = excluded.raw
+"""
+
+INSERT_BEVAKNING_LISTING = """
+INSERT OR IGNORE INTO bevakning_listings (bevakning_id, ad_id, discovered_at)
+VALUES (:bevakning_id, :ad_id, :discovered_at)
+"""
+
+# Stored listings with the bevakning that matched them.
+SELECT_LISTINGS = """
+SELECT bevakning_listings.bevakning_id, ads.raw, bevakning_listings.discovered_at
+FROM bevakning_listings JOIN ads USING (ad_id)
+"""
+
+UPSERT_BEVAKNING = """
+INSERT INTO bevakningar (bevakning_id, name, created_at, updated_at)
+VALUES (:bevakning_id, :name, :now, :now)
+ON CONFLICT (bevakning_id) DO UPDATE SET
+    name = excluded.name,
+    updated_at = excluded.updated_at,
+    is_active = 1
+WHERE name != excluded.name OR is_active = 0
+"""
+
+# Stay well below SQLite's limit on parameters per statement.
+MAX_PARAMETERS = 500
+
+
+class ListingStore(Protocol):
+    def upsert_bevakningar(self, bevakningar: Iterable[dict]) -> None: ...
+
+    def add_listings(
+        self, bevakning_id: str, listings: Iterable[dict | Ad]
+    ) -> list[dict]: ...
+
+    def ad_ids(self, bevakning_id: str) -> set[str]: ...
+
+    def listings(self, bevakning_id: str | None = None) -> Iterator[dict]: ...
+
+    def listings_since(
+        self,
+        since: datetime | str,
+        bevakning_id: str | None = None,
+        limit: int | None = None,
+    ) -> list[dict]: ...
+
+    def count(self, bevakning_id: str | None = None) -> int: ...
+
+    def ad_count(self) -> int: ...
+
+    def close(self) -> None: ...
+
+
+def _first_name(values: Any) -> str | None:
+    if isinstance(values, list) and values and isinstance(values[0], dict):
+        return values[0].get("name")
+    return None
+
+
+def _ad_row(listing: dict, now: str) -> dict[str, Any]:
+    ad = listing.get("ad") or {}
+    price = ad.get("price") or {}
+    advertiser = ad.get("advertiser") or {}
+    return {
+        "ad_id": str(ad.get("ad_id")),
+        "title": ad.get("subject"),
+        "price": price.get("value"),
+        "currency": price.get("suffix") or "kr",
+        "description": ad.get("body"),
+        "category": _first_name(ad.get("category")),
+        "location": _first_name(ad.get("location")),
+        "seller_type": advertiser.get("type"),
+        "blocket_url": ad.get("share_url"),
+        "images": codec.dumps(ad.get("images") or []).decode(),
+        "now": now,
+        # discovered_at differs per bevakning and is kept with each of them.
+        "raw": codec.dumps(
+            {key: value for key, value in listing.items() if key != "discovered_at"}
+        ),
+    }
+
+
+def _listing(raw: bytes, discovered_at: str) -> dict:
+    listing = codec.loads(raw)
+    listing["discovered_at"] = discovered_at
+    return listing
+
+
+class SQLiteListingStore:
+    """
+    ListingStore backed by a SQLite file.
+
+    Each ad is stored once in ads, keyed on ad_id, and bevakning_listings
+    links it to every bevakning that matched it, with when that bevakning
+    first found it. Batches are written in one transaction. The full listing
+    JSON is kept next to the ad columns, so reads return exactly what was
+    stored, with discovered_at of the bevakning read.
+    """
+
+    def __init__(self, path: str | Path = "bevakningar.sqlite3") -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def __enter__(self) -> SQLiteListingStore:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def upsert_bevakningar(self, bevakningar: Iterable[dict]) -> None:
+        now = datetime.now().isoformat()
+        rows = [
+            {
+                "bevakning_id": str(search["id"]),
+                "name": search.get("name") or "",
+                "now": now,
+            }
+            for search in bevakningar
+            if "id" in search
+        ]
+        with self._lock, self._db:
+            self._db.executemany(UPSERT_BEVAKNING, rows)
+
+    def add_listings(
+        self, bevakning_id: str, listings: Iterable[dict | Ad]
+    ) -> list[dict]:
+        """
+        Insert or update listings of a bevakning in one transaction. Returns
+        the listings the bevakning had not found before, with discovered_at
+        set. Ads already stored for another bevakning are updated and linked.
+        """
+        now = datetime.now().isoformat()
+        batch: dict[str, dict] = {}
+        for listing in listings:
+            if isinstance(listing, Ad):
+                listing = listing.to_listing()
+            ad_id = (listing.get("ad") or {}).get("ad_id")
+            if ad_id:
+                batch[str(ad_id)] = listing
+        if not batch:
+            return []
+        with self._lock, self._db:
+            existing = self._existing(bevakning_id, list(batch))
+            added = []
+            for ad_id, listing in batch.items():
+                if ad_id not in existing:
+                    listing.setdefault("discovered_at", now)
+                    added.append(listing)
+            self._db.executemany(
+                UPSERT_AD, [_ad_row(listing, now) for listing in batch.values()]
+            )
+            self._db.executemany(
+                INSERT_BEVAKNING_LISTING,
+                [
+                    {
+                        "bevakning_id": bevakning_id,
+                        "ad_id": ad_id,
+                        "discovered_at": listing.get("discovered_at") or now,
+                    }
+                    for ad_id, listing in batch.items()
+                ],
+            )
+        return added
+
+    def ad_ids(self, bevakning_id: str) -> set[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT ad_id FROM bevakning_listings WHERE bevakning_id = ?",
+                (bevakning_id,),
+            ).fetchall()
+        return {ad_id for (ad_id,) in rows}
+
+    def listings(self, bevakning_id: str | None = None) -> Iterator[dict]:
+        """
+        Stored listings in discovery order, read in chunks.
+        """
+        for _, listing in self.bevakning_listings(bevakning_id):
+            yield listing
+
+    def bevakning_listings(
+        self, bevakning_id: str | None = None
+    ) -> Iterator[tuple[str, dict]]:
+        """
+        (bevakning_id, listing) of the stored listings in discovery order,
+        read in chunks.
+        """
+        query = SELECT_LISTINGS
+        params: tuple = ()
+        if bevakning_id is not None:
+            query += " WHERE bevakning_listings.bevakning_id = ?"
+            params = (bevakning_id,)
+        with self._lock:
+            cursor = self._db.execute(
+                query + " ORDER BY bevakning_listings.discovered_at", params
+            )
+            rows = cursor.fetchmany(MAX_PARAMETERS)
+        while rows:
+            for listing_bevakning_id, raw, discovered_at in rows:
+                yield listing_bevakning_id, _listing(raw, discovered_at)
+            with self._lock:
+                rows = cursor.fetchmany(MAX_PARAMETERS)
+
+    def listings_since(
+        self,
+        since: datetime | str,
+        bevakning_id: str | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """
+        Listings discovered after since, oldest first.
+        """
+        if isinstance(since, datetime):
+            since = since.isoformat()
+        query = SELECT_LISTINGS + " WHERE bevakning_listings.discovered_at > ?"
+        params: list[Any] = [since]
+        if bevakning_id is not None:
+            query += " AND bevakning_listings.bevakning_id = ?"
+            params.append(bevakning_id)
+        query += " ORDER BY bevakning_listings.discovered_at"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [_listing(raw, discovered_at) for _, raw, discovered_at in rows]
+
+    def count(self, bevakning_id: str | None = None) -> int:
+        """
+        Listings of bevakning_id, or of all bevakningar, an ad matched by
+        several counting once for each.
+        """
+        query = "SELECT COUNT(*) FROM bevakning_listings"
+        params: tuple = ()
+        if bevakning_id is not None:
+            query += " WHERE bevakning_id = ?"
+            params = (bevakning_id,)
+        with self._lock:
+            (count,) = self._db.execute(query, params).fetchone()
+        return count
+
+    def ad_count(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM ads").fetchone()
+        return count
+
+    def _existing(self, bevakning_id: str, ad_ids: list[str]) -> set[str]:
+        existing: set[str] = set()
+        for start in range(0, len(ad_ids), MAX_PARAMETERS):
+            chunk = ad_ids[start : start + MAX_PARAMETERS]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self._db.execute(
+                "SELECT ad_id FROM bevakning_listings"
+                f" WHERE bevakning_id = ? AND ad_id IN ({placeholders})",
+                [bevakning_id, *chunk],
+            )
+            existing.update(ad_id for (ad_id,) in rows)
+        return existing
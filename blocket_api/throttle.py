@@ -0,0 +1,268 @@
+"""
+Client-side rate limiting and retries.
+
+A RateLimiter keeps a token bucket per host, shared by every thread and
+event loop that uses it, so a process stays under the request rate the
+APIs tolerate. A RetryPolicy retries rate limited and failed requests with
+jittered exponential backoff, or after the delay the server asks for in
+Retry-After.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import httpx
+
+# Requests per second and burst size per host.
+DEFAULT_RATES = {
+    "api.blocket.se": (10.0, 20),
+    "api.bytbil.com": (5.0, 10),
+    "api.qasa.se": (5.0, 10),
+}
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass
+class ThrottleStats:
+    requests: int = 0
+    throttled: int = 0
+    throttled_seconds: float = 0.0
+    pauses: int = 0
+
+
+@dataclass
+class RetryStats:
+    retries: int = 0
+    retry_after: int = 0
+    exhausted: int = 0
+
+
+class TokenBucket:
+    """
+    Allows rate requests per second on average and bursts of up to burst.
+    reserve() takes a token right away and returns how long the caller has
+    to wait before using it, so waiting never holds the lock.
+    """
+
+    def __init__(
+        self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self.clock()
+            elapsed = now - self._updated
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every request for seconds, e.g. after a 429.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+
+class RateLimiter:
+    """
+    Token bucket per host. Hosts without a rate in rates are not limited.
+    """
+
+    def __init__(
+        self,
+        rates: dict[str, tuple[float, int]] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rates = DEFAULT_RATES if rates is None else rates
+        self.clock = clock
+        self.stats = ThrottleStats()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url: str) -> TokenBucket | None:
+        host = urlsplit(url).hostname or ""
+        if host not in self.rates:
+            return None
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.rates[host]
+                self._buckets[host] = TokenBucket(rate, burst, self.clock)
+            return self._buckets[host]
+
+    def _reserve(self, url: str) -> float:
+        bucket = self._bucket(url)
+        wait = bucket.reserve() if bucket is not None else 0.0
+        with self._lock:
+            self.stats.requests += 1
+            if wait > 0:
+                self.stats.throttled += 1
+                self.stats.throttled_seconds += wait
+        return wait
+
+    def acquire(self, url: str) -> None:
+        if (wait := self._reserve(url)) > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, url: str) -> None:
+        if (wait := self._reserve(url)) > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, url: str, seconds: float) -> None:
+        bucket = self._bucket(url)
+        if bucket is None:
+            return
+        bucket.pause(seconds)
+        with self._lock:
+            self.stats.pauses += 1
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """
+    Seconds to wait according to the Retry-After header, as a number of
+    seconds or an HTTP date.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        # Dates in -0000, which HTTP dates should not use, are parsed naive
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    Retries transport errors and RETRY_STATUSES up to max_retries times.
+    Waits a random time up to base_delay * 2 ** attempt, capped by max_delay,
+    or what Retry-After asks for. Responses asking for more than
+    max_retry_after seconds are returned as they are.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        max_retry_after: float = 60.0,
+        statuses: frozenset[int] = RETRY_STATUSES,
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.statuses = statuses
+        self.stats = RetryStats()
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def delay(
+        self, attempt: int, response: httpx.Response | None = None
+    ) -> float | None:
+        """
+        Seconds to wait before retrying, None when the request should not
+        be retried.
+        """
+        if response is not None and response.status_code not in self.statuses:
+            return None
+        if attempt >= self.max_retries:
+            with self._lock:
+                self.stats.exhausted += 1
+            return None
+        requested = retry_after(response) if response is not None else None
+        if requested is not None and requested > self.max_retry_after:
+            return None
+        with self._lock:
+            self.stats.retries += 1
+            if requested is not None:
+                self.stats.retry_after += 1
+        return requested if requested is not None else self.backoff(attempt)
+
+
+def send_with_retries(
+    send: Callable[[], httpx.Response],
+    url: str,
+    rate_limiter: RateLimiter | None = None,
+    retry: RetryPolicy | None = None,
+) -> httpx.Response:
+    """
+    Call send once the rate limiter allows it, retrying as retry says.
+    The last response is returned, the last transport error raised.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire(url)
+        try:
+            response = send()
+        except httpx.TransportError:
+            if retry is None or (delay := retry.delay(attempt)) is None:
+                raise
+        else:
+            if retry is None or (delay := retry.delay(attempt, response)) is None:
+                return response
+            if response.status_code == 429 and rate_limiter is not None:
+                rate_limiter.pause(url, delay)
+        time.sleep(delay)
+        attempt += 1
+
+
+async def asend_with_retries(
+    send: Callable[[], Awaitable[httpx.Response]],
+    url: str,
+    rate_limiter: RateLimiter | None = None,
+    retry: RetryPolicy | None = None,
+) -> httpx.Response:
+    """
+    Async counterpart of send_with_retries.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            await rate_limiter.aacquire(url)
+        try:
+            response = await send()
+        except httpx.TransportError:
+            if retry is None or (delay := retry.delay(attempt)) is None:
+                raise
+        else:
+            if retry is None or (delay := retry.delay(attempt, response)) is None:
+                return response
+            if response.status_code == 429 and rate_limiter is not None:
+                rate_limiter.pause(url, delay)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+# Shared by every client that isn't given its own, so all threads and event
+# loops of a process draw from the same buckets.
+default_rate_limiter = RateLimiter()
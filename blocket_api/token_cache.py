@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+
+from blocket_api.files import atomic_write_text
+from blocket_api.tracing import span
+
+PUBLIC_TOKEN_URL = (
+    "https://www.blocket.se/api/adout-api-route/refresh-token-and-validate-session"
+)
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    value: str
+    expires_at: float
+
+    def is_fresh(self, margin: float) -> bool:
+        return time.time() + margin < self.expires_at
+
+
+def _token_expiry(token: str, default_ttl: float) -> float:
+    """
+    The public bearer token is a JWT, read its exp claim when present.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return time.time() + default_ttl
+
+
+class PublicTokenProvider:
+    """
+    Caches the public bearer token until shortly before it expires.
+
+    One refresh runs at a time, callers waiting on it get the refreshed token.
+    With a path the token is also persisted, so short-lived processes (cron
+    runs, workers) can reuse it instead of fetching a new one on start.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        refresh_margin: float = 60.0,
+        default_ttl: float = 600.0,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self.refresh_count = 0
+        self._token: CachedToken | None = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._async_locks: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Lock
+        ] = weakref.WeakKeyDictionary()
+
+    def _cached(self) -> str | None:
+        if not self._loaded:
+            self._token = self._load()
+            self._loaded = True
+        if self._token and self._token.is_fresh(self.refresh_margin):
+            return self._token.value
+        return None
+
+    def _store(self, value: str) -> str:
+        self._token = CachedToken(value, _token_expiry(value, self.default_ttl))
+        self.refresh_count += 1
+        self._save(self._token)
+        return value
+
+    def get(self, client: httpx.Client) -> str:
+        if token := self._cached():
+            return token
+        with self._lock:
+            if token := self._cached():
+                return token
+            with span("token.refresh"):
+                response = client.get(PUBLIC_TOKEN_URL)
+                response.raise_for_status()
+                return self._store(response.json()["bearerToken"])
+
+    async def aget(self, client: httpx.AsyncClient) -> str:
+        if token := self._cached():
+            return token
+        loop = asyncio.get_running_loop()
+        lock = self._async_locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            if token := self._cached():
+                return token
+            with span("token.refresh"):
+                response = await client.get(PUBLIC_TOKEN_URL)
+                response.raise_for_status()
+                return self._store(response.json()["bearerToken"])
+
+    def invalidate(self, token: str) -> None:
+        """
+        Drop token after it was rejected, unless it has already been replaced.
+        """
+        with self._lock:
+            if self._token and self._token.value == token:
+                self._token = None
+                self._loaded = True
+
+    def _load(self) -> CachedToken | None:
+        if not self.path or not self.path.exists():
+            return None
+        try:
+            data = json.loads(self.path.read_text())
+            return CachedToken(data["bearerToken"], float(data["expires_at"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save(self, token: CachedToken) -> None:
+        if not self.path:
+            return
+        try:
+            atomic_write_text(
+                self.path,
+                json.dumps(
+                    {"bearerToken": token.value, "expires_at": token.expires_at}
+                ),
+            )
+        except OSError:
+            pass
+
+
+# Shared by every client in the process unless one is given its own provider.
+default_token_provider = PublicTokenProvider()
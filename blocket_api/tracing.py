@@ -0,0 +1,315 @@
+"""
+Optional tracing of client calls, their requests and monitor stages.
+
+Every public BlocketAPI and AsyncBlocketAPI method runs in a span, and every
+request it makes gets a child span while a tracer is active. Spans go to
+OpenTelemetry when opentelemetry-api is installed
+(pip install blocket_api[tracing]). Without it they are dropped, and span()
+returns a shared no-op span. Use ChromeTracer to record spans locally as
+Chrome trace-event JSON instead. It opens in chrome://tracing or
+https://ui.perfetto.dev.
+"""
+
+from __future__ import annotations
+
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Protocol, TypeVar
+
+from blocket_api import codec
+from blocket_api.files import atomic_write_text
+from blocket_api.hooks import ObservedRequest, RequestEnd, RequestHooks, RequestStart
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - depends on the environment
+    otel_trace = None  # type: ignore[assignment]
+
+Attributes = dict[str, Any]
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Span:
+    """
+    A started span, ended when leaving it as a context manager. This base
+    class does nothing and is what span() returns when tracing is off.
+    """
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def end(self, error: BaseException | None = None) -> None:
+        pass
+
+    def __enter__(self) -> Span:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.end(exc)
+
+
+NOOP_SPAN = Span()
+
+
+class Tracer(Protocol):
+    def start(self, name: str, attributes: Attributes | None = None) -> Span: ...
+
+
+class NoopTracer:
+    def start(self, name: str, attributes: Attributes | None = None) -> Span:
+        return NOOP_SPAN
+
+
+def _attribute(value: Any) -> str | bool | int | float:
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
+
+
+class OpenTelemetrySpan(Span):
+    def __init__(self, span: Any) -> None:
+        self.span = span
+        self.token = otel_context.attach(otel_trace.set_span_in_context(span))
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.span.set_attribute(key, _attribute(value))
+
+    def end(self, error: BaseException | None = None) -> None:
+        if error is not None:
+            self.span.record_exception(error)
+            self.span.set_status(
+                otel_trace.Status(otel_trace.StatusCode.ERROR, str(error))
+            )
+        otel_context.detach(self.token)
+        self.span.end()
+
+
+class OpenTelemetryTracer:
+    """
+    Spans of the globally configured OpenTelemetry tracer provider, made the
+    current span while they are open, so they nest like the calls they trace.
+    """
+
+    def __init__(self, name: str = "blocket_api") -> None:
+        self.tracer = otel_trace.get_tracer(name)
+
+    def start(self, name: str, attributes: Attributes | None = None) -> Span:
+        return OpenTelemetrySpan(
+            self.tracer.start_span(
+                name,
+                attributes={
+                    key: _attribute(value)
+                    for key, value in (attributes or {}).items()
+                    if value is not None
+                },
+            )
+        )
+
+
+class ChromeSpan(Span):
+    def __init__(
+        self, tracer: ChromeTracer, name: str, attributes: Attributes | None
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attributes = {
+            key: value for key, value in (attributes or {}).items() if value is not None
+        }
+        self.thread = threading.get_ident()
+        self.started = time.perf_counter_ns()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: BaseException | None = None) -> None:
+        if error is not None:
+            self.attributes["error"] = repr(error)
+        self.tracer._record(self, time.perf_counter_ns())
+
+
+class ChromeTracer:
+    """
+    Keeps the last max_events spans in memory as complete ("X") trace
+    events, one row per thread, and writes them with write().
+    """
+
+    def __init__(self, max_events: int = 100_000) -> None:
+        self.pid = os.getpid()
+        self.events: deque[dict] = deque(maxlen=max_events)
+        self._threads: dict[int, str] = {}
+        self._origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def start(self, name: str, attributes: Attributes | None = None) -> Span:
+        return ChromeSpan(self, name, attributes)
+
+    def _record(self, span: ChromeSpan, ended: int) -> None:
+        event = {
+            "name": span.name,
+            "ph": "X",
+            "ts": (span.started - self._origin) / 1000,
+            "dur": (ended - span.started) / 1000,
+            "pid": self.pid,
+            "tid": span.thread,
+            "args": {key: _attribute(value) for key, value in span.attributes.items()},
+        }
+        with self._lock:
+            if span.thread not in self._threads:
+                self._threads[span.thread] = threading.current_thread().name
+            self.events.append(event)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            threads = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": thread,
+                    "args": {"name": name},
+                }
+                for thread, name in self._threads.items()
+            ]
+            return {"traceEvents": threads + list(self.events)}
+
+    def write(self, path: str | Path) -> None:
+        atomic_write_text(Path(path), codec.dumps(self.to_dict()).decode())
+
+
+_tracer: Tracer = OpenTelemetryTracer() if otel_trace is not None else NoopTracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer) -> None:
+    """
+    Send the spans of the whole process to tracer.
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def span(name: str, **attributes: Any) -> Span:
+    """
+    Start a span, use it as a context manager:
+
+        with span("monitor.save_state"):
+            ...
+    """
+    if isinstance(_tracer, NoopTracer):
+        return NOOP_SPAN
+    return _tracer.start(name, attributes)
+
+
+def traced(
+    name: str,
+    attributes: Callable[..., Attributes] | None = None,
+    arguments: tuple[str, ...] = (),
+) -> Callable[[F], F]:
+    """
+    Run the decorated function or coroutine function in a span. attributes
+    is called with the same arguments as the function to get the span's
+    attributes. Arguments named in arguments are added as attributes as
+    well, None values are left out.
+    """
+
+    def decorator(func: F) -> F:
+        signature = inspect.signature(func) if arguments else None
+
+        def span_attributes(args: Any, kwargs: Any) -> Attributes | None:
+            result = attributes(*args, **kwargs) if attributes else None
+            if signature is not None:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                result = {**(result or {})}
+                result.update((key, bound.arguments[key]) for key in arguments)
+            return result
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if isinstance(_tracer, NoopTracer):
+                    return await func(*args, **kwargs)
+                with _tracer.start(name, span_attributes(args, kwargs)):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if isinstance(_tracer, NoopTracer):
+                return func(*args, **kwargs)
+            with _tracer.start(name, span_attributes(args, kwargs)):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+# Open request spans of the current thread or task, innermost last.
+_request_spans: ContextVar[tuple[Span, ...]] = ContextVar(
+    "blocket_api_request_spans", default=()
+)
+
+
+def _request_start(event: RequestStart) -> None:
+    request_span = _tracer.start(
+        f"HTTP {event.method}",
+        {
+            "http.method": event.method,
+            "http.url": event.url,
+            "endpoint": event.endpoint,
+        },
+    )
+    _request_spans.set(_request_spans.get() + (request_span,))
+
+
+def _request_end(event: RequestEnd) -> None:
+    spans = _request_spans.get()
+    if not spans:
+        return
+    _request_spans.set(spans[:-1])
+    request_span = spans[-1]
+    if event.status is not None:
+        request_span.set_attribute("http.status_code", event.status)
+    request_span.set_attribute("bytes", event.bytes)
+    request_span.set_attribute("retries", event.retries)
+    request_span.set_attribute("cache_hit", event.cache_hit)
+    request_span.end(event.error)
+
+
+# Added to the hooks of every request while a tracer is active.
+_REQUEST_SPAN_HOOKS = RequestHooks(on_start=[_request_start], on_end=[_request_end])
+
+
+def start_request(
+    hooks: RequestHooks | None, method: str, url: str
+) -> ObservedRequest | None:
+    """
+    Start a request, telling hooks about it and giving it its own span when
+    a tracer is active. None when there is no one to tell.
+    """
+    if not isinstance(_tracer, NoopTracer):
+        if hooks is None:
+            hooks = _REQUEST_SPAN_HOOKS
+        else:
+            hooks = RequestHooks(
+                [*hooks.on_start, _request_start], [*hooks.on_end, _request_end]
+            )
+    return hooks.start(method, url) if hooks is not None else None
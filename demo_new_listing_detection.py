@@ -14,6 +14,9 @@ def demo_new_listing_detection():
     
     # Get your bevakningar
     searches = api.saved_searches()
+    results = api.get_listings_many(
+        [int(search['id']) for search in searches], limit=3
+    )
     
     for search in searches:
         search_id = search['id']
@@ -25,7 +28,9 @@ def demo_new_listing_detection():
         
         try:
             # Get recent listings to simulate "new" discoveries
-            response = api.get_listings(search_id=int(search_id), limit=3)
+            response = results[int(search_id)]
+            if isinstance(response, Exception):
+                raise response
             
             if 'data' in response and response['data']:
                 print(f"📝 NEW LISTINGS DETECTED from {name}:")
@@ -10,11 +10,25 @@ import time
 import json
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Set, Union
 from dataclasses import dataclass, asdict
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
+from pathlib import Path
 
-from blocket_api import BlocketAPI
+from blocket_api import BlocketAPI, codec
+from blocket_api.ad_index import AdIndex, Sighting
+from blocket_api.changes import ChangeDetector, Edited, PriceChanged, StatusChanged
+from blocket_api.export import export_listings, grouped_listings
+from blocket_api.journal import ListingJournal
+from blocket_api.metrics import Metrics, serve_metrics
+from blocket_api.models import Ad, listing_ad_id
+from blocket_api.prices import PriceHistory
+from blocket_api.revalidation import ValidatorStore
+from blocket_api.scheduler import PollScheduler
+from blocket_api.store import SQLiteListingStore
+from blocket_api.tracing import ChromeTracer, set_tracer, traced
 
 # Configure logging
 logging.basicConfig(
@@ -27,6 +41,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Upper bounds in seconds for the cycle duration histogram
+CYCLE_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800)
+# Ads are compared to the prices of the last 30 days in their category and region
+PRICE_WINDOW = timedelta(days=30)
+# Z-score at or below which an ad is logged as a possible deal
+DEAL_ZSCORE = -1.5
+
 @dataclass
 class BevakningState:
     """Track the state of a bevakning"""
@@ -38,17 +59,100 @@ class BevakningState:
     new_items_since_start: int
     total_items_seen: int
 
+def listing_to_json(listing: Ad) -> Dict:
+    """JSON encoder fallback turning compact Ads back into their raw listing"""
+    if isinstance(listing, Ad):
+        return listing.to_listing()
+    raise TypeError(f"Cannot serialize {type(listing).__name__}")
+
 class BevakningarMonitor:
-    def __init__(self, check_interval: int = 300):  # 5 minutes default
-        self.api = BlocketAPI()
+    def __init__(self, check_interval: int = 300, compact: bool = False, storage: str = 'json', workers: int = 8,
+                 adaptive: bool = False, min_interval: int = 60, max_interval: int = 3600,
+                 metrics_port: Optional[int] = None, metrics_file: Optional[str] = None,
+                 trace_file: Optional[str] = None, detect_changes: bool = False,
+                 find_deals: bool = False):  # 5 minutes default
+        if workers < 1:
+            raise ValueError("Workers must be at least 1.")
         self.check_interval = check_interval
+        # Poll each bevakning on its own schedule, starting from check_interval
+        self.scheduler = PollScheduler(
+            initial_interval=check_interval,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            path="bevakningar_schedule.json",
+        ) if adaptive else None
+        # Number of bevakningar whose listings are fetched at the same time
+        self.workers = workers
+        # Keep listings in memory as compact Ad objects instead of raw dicts
+        self.compact = compact
+        # 'json' rewrites the whole listings file, 'journal' only appends new listings,
+        # 'sqlite' keeps listings in an indexed database instead of in memory
+        self.storage = storage
         self.states: Dict[str, BevakningState] = {}
         self.state_file = "bevakningar_state.json"
         self.listings_file = "bevakningar_listings.json"
+        self.journal = ListingJournal("bevakningar_listings.jsonl") if storage == 'journal' else None
+        self.store = SQLiteListingStore("bevakningar.sqlite3") if storage == 'sqlite' else None
+        # ad_id -> bevakningar and first seen, for dedupe without scanning listings
+        self.ad_index = AdIndex("bevakningar_ad_index.jsonl") if not self.store else None
+        # Fingerprint of price, status and texts per ad, to report changes of ads seen before
+        self.changes = ChangeDetector("bevakningar_fingerprints.json") if detect_changes else None
+        # Price of every ad over time, to spot ads priced well below similar ones
+        self.prices = PriceHistory("bevakningar_prices.bin") if find_deals else None
+        # Every stored listing once by ad_id, shared by the bevakningar that matched it
+        self.ads: Dict[str, Union[Dict, Ad]] = {}
+        self.validators_file = "bevakningar_validators.json"
+        # Request latencies per endpoint, cycle durations, lag and listings ingested
+        self.metrics = Metrics()
+        self.describe_metrics()
+        # Written after every cycle when set
+        self.metrics_file = metrics_file
+        self.metrics_server = serve_metrics(self.metrics, metrics_port) if metrics_port is not None else None
+        # Record spans of every cycle as Chrome trace events, written to trace_file after each cycle
+        self.trace_file = trace_file
+        self.tracer = ChromeTracer() if trace_file else None
+        if self.tracer:
+            set_tracer(self.tracer)
+        # ETag/Last-Modified/body hash per polled URL, so unchanged responses are skipped
+        self.api = BlocketAPI(
+            validators=ValidatorStore(self.validators_file),
+            hooks=self.metrics.hooks()
+        )
+        self.bevakningar: List[Dict] = []
+        # Listings per bevakning, as raw dicts or compact Ads
+        self.listings: Dict[str, List[Union[Dict, Ad]]] = {}
         self.load_state()
         self.load_listings()
         
-    def load_state(self):
+    def describe_metrics(self) -> None:
+        """Declare the monitor's own metrics next to the request metrics of the client"""
+        self.metrics.describe('bevakningar_cycle_duration_seconds', 'histogram',
+                              'Duration of a check of all bevakningar.', CYCLE_BUCKETS)
+        self.metrics.describe('bevakningar_last_cycle_duration_seconds', 'gauge',
+                              'Duration of the last check of all bevakningar.')
+        self.metrics.describe('bevakningar_last_cycle_timestamp_seconds', 'gauge',
+                              'When the last check of all bevakningar finished.')
+        self.metrics.describe('bevakningar_cycles_total', 'counter', 'Checks of all bevakningar.')
+        self.metrics.describe('bevakningar_check_interval_seconds', 'gauge', 'Configured check interval.')
+        self.metrics.describe('bevakningar_search_lag_seconds', 'gauge',
+                              'Seconds since a bevakning was last checked.')
+        self.metrics.describe('bevakningar_listings_ingested_total', 'counter',
+                              'Listings added to the database per bevakning.')
+        self.metrics.describe('bevakningar_ad_changes_total', 'counter',
+                              'Price, status and text changes of known ads.')
+        self.metrics.describe('bevakningar_deals_total', 'counter',
+                              'Ads priced far below others in their category and region.')
+        self.metrics.set('bevakningar_check_interval_seconds', self.check_interval)
+        self.metrics.collectors.append(self.collect_lag)
+    
+    def collect_lag(self) -> None:
+        """Set how long ago each bevakning was checked, when metrics are read"""
+        now = datetime.now()
+        for bevakning_id, state in list(self.states.items()):
+            lag = (now - state.last_check).total_seconds()
+            self.metrics.set('bevakningar_search_lag_seconds', lag, {'bevakning_id': bevakning_id})
+    
+    def load_state(self) -> None:
         """Load previous state from file"""
         try:
             if os.path.exists(self.state_file):
@@ -62,7 +166,8 @@ class BevakningarMonitor:
         except Exception as e:
             logger.warning(f"Could not load state file: {e}")
     
-    def save_state(self):
+    @traced('monitor.save_state')
+    def save_state(self) -> None:
         """Save current state to file"""
         try:
             # Convert datetime to string for JSON serialization
@@ -74,65 +179,225 @@ class BevakningarMonitor:
             
             with open(self.state_file, 'w') as f:
                 json.dump(state_data, f, indent=2)
+            self.api.validators.save()
+            if self.ad_index is not None:
+                self.ad_index.save()
+            if self.changes is not None:
+                self.changes.save()
+            if self.prices is not None:
+                self.prices.save()
+            if self.scheduler:
+                self.scheduler.save()
         except Exception as e:
             logger.error(f"Could not save state file: {e}")
     
-    def load_listings(self):
+    def report_changes(self, bevakning_id: str, listings: Sequence[Union[Dict, Ad]]) -> Set[str]:
+        """Log price, status and text changes of ads seen in earlier responses, returns the changed ad ids"""
+        assert self.changes is not None
+        changed = set()
+        for change in self.changes.observe_many(bevakning_id, listings):
+            changed.add(change.ad_id)
+            if isinstance(change, PriceChanged):
+                direction = "lowered" if change.lowered else "changed"
+                logger.info(f"💸 Price {direction} for ad {change.ad_id}: {change.old_price} -> {change.new_price} SEK")
+                kind = 'price'
+            elif isinstance(change, StatusChanged):
+                logger.info(f"🏷️ Status of ad {change.ad_id}: {change.old_status} -> {change.new_status}")
+                kind = 'status'
+            elif isinstance(change, Edited):
+                logger.info(f"✏️ Ad {change.ad_id} edited: {', '.join(change.fields)}")
+                kind = 'edited'
+            self.metrics.inc('bevakningar_ad_changes_total', 1, {'bevakning_id': bevakning_id, 'kind': kind})
+        return changed
+    
+    def report_deals(self, bevakning_id: str, listings: Sequence[Union[Dict, Ad]]) -> None:
+        """Record prices and log new or repriced ads that cost far less than similar ones"""
+        assert self.prices is not None
+        recorded = [listing for listing in listings if self.prices.record(listing, bevakning_id)]
+        if not recorded:
+            return
+        since = time.time() - PRICE_WINDOW.total_seconds()
+        for listing, zscore in zip(recorded, self.prices.zscores(recorded, since=since)):
+            if zscore is None or zscore > DEAL_ZSCORE:
+                continue
+            ad = listing.get('ad', listing)
+            logger.info(f"🔥 Possible deal: {ad.get('subject', 'N/A')} ({listing_ad_id(listing)}) for "
+                        f"{(ad.get('price') or {}).get('value')} SEK, {-zscore:.1f} standard deviations "
+                        f"below similar ads")
+            self.metrics.inc('bevakningar_deals_total', 1, {'bevakning_id': bevakning_id})
+    
+    def load_listings(self) -> None:
         """Load existing listings from file"""
         try:
-            if os.path.exists(self.listings_file):
-                with open(self.listings_file, 'r') as f:
-                    self.listings = json.load(f)
-                logger.info(f"Loaded {sum(len(bevakning_listings) for bevakning_listings in self.listings.values())} existing listings")
+            if self.store:
+                self.listings = {}
+                if not self.store.count() and os.path.exists(self.listings_file):
+                    # First run with the database, import the JSON file
+                    with open(self.listings_file, 'rb') as f:
+                        for bevakning_id, bevakning_listings in codec.loads(f.read()).items():
+                            self.store.add_listings(bevakning_id, bevakning_listings)
+                logger.info(f"Listings database holds {self.store.count()} listings of {self.store.ad_count()} ads")
+                return
+            if self.journal and self.journal.exists():
+                listings = self.journal.load()
+                if self.journal.garbage:
+                    logger.info(f"Compacting listings journal ({self.journal.garbage} stale lines)")
+                    self.journal.compact(listings)
+            elif os.path.exists(self.listings_file):
+                with open(self.listings_file, 'rb') as f:
+                    listings = codec.loads(f.read())
+                if self.journal:
+                    # First run with the journal, start it from the JSON file
+                    self.journal.compact(listings)
             else:
                 self.listings = {}
                 logger.info("Starting with empty listings database")
+                return
+            self.listings = {
+                bevakning_id: [Ad.from_listing(listing) if self.compact else listing for listing in bevakning_listings]
+                for bevakning_id, bevakning_listings in listings.items()
+            }
+            self.index_listings()
+            logger.info(f"Loaded {sum(len(bevakning_listings) for bevakning_listings in self.listings.values())} existing listings")
         except Exception as e:
             logger.warning(f"Could not load listings file: {e}")
             self.listings = {}
     
-    def save_listings(self):
+    def index_listings(self) -> None:
+        """Share one stored listing per ad between bevakningar and bring the ad index up to date"""
+        for bevakning_id, bevakning_listings in self.listings.items():
+            for i, listing in enumerate(bevakning_listings):
+                listing_id = listing_ad_id(listing)
+                if listing_id:
+                    bevakning_listings[i] = self.ads.setdefault(listing_id, listing)
+        assert self.ad_index is not None
+        missing = self.ad_index.reconcile(self.listings)
+        if missing:
+            logger.info(f"Added {missing} stored listings to the ad index")
+    
+    @traced('monitor.save_listings')
+    def save_listings(self) -> None:
         """Save all listings to file"""
+        if self.store:
+            # Every update is committed to the database right away
+            return
+        if self.journal:
+            # Listings are appended as they are found, just let a running compaction finish
+            self.journal.wait()
+            return
         try:
-            with open(self.listings_file, 'w') as f:
-                json.dump(self.listings, f, indent=2, ensure_ascii=False)
+            # Compact output, written with orjson when it is installed
+            with open(self.listings_file, 'wb') as f:
+                f.write(codec.dumps(self.listings, default=listing_to_json))
             logger.info(f"Saved {sum(len(bevakning_listings) for bevakning_listings in self.listings.values())} listings to database")
         except Exception as e:
             logger.error(f"Could not save listings file: {e}")
     
-    def update_listings_database(self, bevakning_id: str, new_listings: List[Dict]):
+    @traced('monitor.update_listings_database',
+            lambda self, bevakning_id, new_listings: {'bevakning_id': bevakning_id, 'listings': len(new_listings)})
+    def update_listings_database(self, bevakning_id: str, new_listings: Sequence[Union[Dict, Ad]]) -> None:
         """Update listings database with new listings"""
+        changed: Set[str] = set()
+        if self.changes is not None:
+            changed = self.report_changes(bevakning_id, new_listings)
+        if self.prices is not None:
+            self.report_deals(bevakning_id, new_listings)
+        if self.store:
+            inserted = self.store.add_listings(bevakning_id, new_listings)
+            self.metrics.inc('bevakningar_listings_ingested_total', len(inserted), {'bevakning_id': bevakning_id})
+            if inserted:
+                logger.info(f"Added {len(inserted)} new listings to database for bevakning {bevakning_id}")
+            return
+        
+        assert self.ad_index is not None
         if bevakning_id not in self.listings:
             self.listings[bevakning_id] = []
         
-        # Create a set of existing listing IDs to avoid duplicates
-        existing_ids = {listing.get('ad', {}).get('ad_id', '') for listing in self.listings[bevakning_id]}
-        
-        # Add new listings that aren't already in the database
-        added_count = 0
+        # Add listings the ad index hasn't seen for this bevakning
+        added: List[Union[Dict, Ad]] = []
+        references = []
+        updated: List[Union[Dict, Ad]] = []
         for listing in new_listings:
-            listing_id = listing.get('ad', {}).get('ad_id', '')
-            if listing_id and listing_id not in existing_ids:
-                # Add timestamp when we discovered this listing
-                listing['discovered_at'] = datetime.now().isoformat()
-                self.listings[bevakning_id].append(listing)
-                existing_ids.add(listing_id)
-                added_count += 1
+            listing_id = listing_ad_id(listing)
+            if not listing_id:
+                continue
+            sighting = self.ad_index.record(bevakning_id, listing)
+            if listing_id in self.ads:
+                if sighting is not Sighting.known:
+                    # Already stored for another bevakning, reference the same listing
+                    references.append(listing_id)
+                if listing_id in changed:
+                    # Keep the stored copy, shared by every bevakning, at its latest price, status and texts
+                    updated.append(self.update_stored_listing(listing_id, listing))
+                continue
+            # Add timestamp when we discovered this listing
+            discovered_at = datetime.now().isoformat()
+            if isinstance(listing, Ad):
+                listing.discovered_at = discovered_at
+                stored = listing if self.compact else listing.to_listing()
+            else:
+                listing['discovered_at'] = discovered_at
+                stored = Ad.from_listing(listing) if self.compact else listing
+            self.ads[listing_id] = stored
+            added.append(stored)
         
-        if added_count > 0:
-            logger.info(f"Added {added_count} new listings to database for bevakning {bevakning_id}")
+        self.metrics.inc('bevakningar_listings_ingested_total', len(added) + len(references),
+                         {'bevakning_id': bevakning_id})
+        if not added and not references and not updated:
+            return
+        self.listings[bevakning_id].extend(added)
+        self.listings[bevakning_id].extend(self.ads[listing_id] for listing_id in references)
+        if added or references:
+            shared = f" ({len(references)} already stored for other bevakningar)" if references else ""
+            logger.info(f"Added {len(added) + len(references)} new listings to database for bevakning {bevakning_id}{shared}")
+        if updated:
+            logger.info(f"Updated {len(updated)} changed listings in database for bevakning {bevakning_id}")
+        if self.journal:
+            # Write only the new and changed listings, compacting in the background when needed
+            self.journal.append(bevakning_id, added + updated)
+            self.journal.append_references(bevakning_id, references)
+            self.journal.maybe_compact(self.listings)
+        else:
             # Save after each update
             self.save_listings()
     
+    def update_stored_listing(self, listing_id: str, listing: Union[Dict, Ad]) -> Union[Dict, Ad]:
+        """Replace the stored copy of an ad with listing in place, keeping when it was discovered"""
+        stored = self.ads[listing_id]
+        if isinstance(stored, Ad):
+            current = listing if isinstance(listing, Ad) else Ad.from_listing(listing)
+            for field in Ad.__slots__:
+                if field != 'discovered_at':
+                    setattr(stored, field, getattr(current, field))
+        else:
+            discovered_at = stored.get('discovered_at')
+            stored.clear()
+            stored.update(listing.to_listing() if isinstance(listing, Ad) else listing)
+            if discovered_at is not None:
+                stored['discovered_at'] = discovered_at
+        return stored
+    
+    @traced('monitor.get_bevakningar')
     def get_bevakningar(self) -> List[Dict]:
-        """Get current list of saved searches"""
+        """Get current list of saved searches, reusing the last list when unchanged"""
         try:
-            return self.api.saved_searches()
+            if not self.bevakningar:
+                bevakningar = self.api.saved_searches()
+            else:
+                bevakningar = self.api.saved_searches_if_changed()
         except Exception as e:
             logger.error(f"Error getting saved searches: {e}")
             return []
+        if bevakningar is None:
+            logger.info("Saved searches unchanged since last check")
+        else:
+            self.bevakningar = bevakningar
+            if self.store:
+                self.store.upsert_bevakningar(bevakningar)
+        return self.bevakningar
     
-    def check_for_new_items(self, bevakning: Dict) -> Optional[BevakningState]:
+    @traced('monitor.check_for_new_items', lambda self, bevakning: {'bevakning_id': bevakning['id']})
+    def check_for_new_items(self, bevakning: Dict) -> BevakningState:
         """Check a single bevakning for new items"""
         bevakning_id = bevakning['id']
         name = bevakning['name']
@@ -175,16 +440,17 @@ class BevakningarMonitor:
         
         return state
     
-    def get_recent_listings(self, bevakning_id: str, limit: int = 10) -> List[Dict]:
-        """Get recent listings from a specific bevakning"""
-        try:
-            response = self.api.get_listings(search_id=int(bevakning_id), limit=limit)
-            return response.get('data', [])
-        except Exception as e:
-            logger.error(f"Error getting listings for bevakning {bevakning_id}: {e}")
-            return []
+    @traced('monitor.get_changed_listings',
+            lambda self, bevakning_id, limit=99: {'bevakning_id': bevakning_id, 'limit': limit})
+    def get_changed_listings(self, bevakning_id: str, limit: int = 99) -> Optional[List[Dict]]:
+        """Get listings from a bevakning, or None when they are unchanged since the last check"""
+        response = self.api.get_listings_if_changed(search_id=int(bevakning_id), limit=limit)
+        if response is None:
+            logger.info(f"Listings for bevakning {bevakning_id} unchanged, skipping update")
+            return None
+        return response.get('data', [])
     
-    def display_summary(self):
+    def display_summary(self) -> None:
         """Display a summary of all bevakningar"""
         print("\n" + "="*60)
         print("📊 BEVAKNINGAR MONITORING SUMMARY")
@@ -201,7 +467,145 @@ class BevakningarMonitor:
         
         print("\n" + "="*60)
     
-    def run_monitoring_loop(self, max_iterations: Optional[int] = None):
+    def log_listing_details(self, state: BevakningState, listings: List[Dict]) -> None:
+        """Log details of the most recent listings of a bevakning"""
+        logger.info(f"📝 NEW LISTINGS DETAILS from {state.name}:")
+        logger.info("=" * 60)
+        
+        for i, listing in enumerate(listings, 1):
+            if 'ad' in listing:
+                ad = listing['ad']
+                logger.info(f"\n🆕 NEW LISTING #{i}:")
+                logger.info(f"   📌 Title: {ad.get('subject', 'N/A')}")
+                
+                # Price information
+                price = ad.get('price', {})
+                price_str = f"{price.get('value', 'N/A')} {price.get('suffix', '')}"
+                logger.info(f"   💰 Price: {price_str}")
+                
+                # Location and status
+                logger.info(f"   📍 Location: {ad.get('zipcode', 'N/A')}")
+                logger.info(f"   📅 Listed: {ad.get('list_time', 'N/A')}")
+                logger.info(f"   ✅ Status: {ad.get('ad_status', 'N/A')}")
+                
+                # Full description
+                body = ad.get('body', '')
+                if body:
+                    logger.info(f"   📝 Description: {body}")
+                
+                # Images
+                if 'images' in ad and ad['images']:
+                    logger.info(f"   🖼️  Images: {len(ad['images'])} available")
+                    for j, img in enumerate(ad['images'][:3], 1):  # Show first 3 image URLs
+                        if 'url' in img:
+                            logger.info(f"      Image {j}: {img['url']}")
+                
+                # Seller information
+                if 'advertiser' in ad:
+                    advertiser = ad['advertiser']
+                    logger.info(f"   👤 Seller: {advertiser.get('name', 'N/A')} ({advertiser.get('type', 'N/A')})")
+                
+                logger.info("-" * 40)
+            else:
+                logger.info(f"   • Raw listing data: {listing}")
+        
+        logger.info("=" * 60)
+    
+    @traced('monitor.check_bevakningar', lambda self, bevakningar: {'bevakningar': len(bevakningar)})
+    def check_bevakningar(self, bevakningar: List[Dict]) -> None:
+        """Check all bevakningar, fetching their listings concurrently"""
+        to_fetch = bevakningar
+        if self.scheduler:
+            # Deleted bevakningar would stay overdue and wake the loop up every second
+            for bevakning_id in self.scheduler.prune(bevakningar):
+                logger.info(f"Bevakning {bevakning_id} was removed, no longer scheduling it")
+            # Only check bevakningar that are due, and only fetch listings when their counters changed
+            bevakningar = self.scheduler.due(bevakningar)
+            to_fetch = [bevakning for bevakning in bevakningar if self.scheduler.observe(bevakning)]
+            logger.info(f"{len(bevakningar)} bevakningar due, fetching listings for {len(to_fetch)} with changed counters")
+        
+        # Counters are compared up front, only the listings fetches run in the pool
+        states = {bevakning['id']: self.check_for_new_items(bevakning) for bevakning in bevakningar}
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bevakning') as executor:
+            # Each fetch runs in a copy of this context, so its spans are children of this cycle's
+            futures = {
+                executor.submit(contextvars.copy_context().run, self.get_changed_listings, bevakning['id'], 99):
+                    bevakning
+                for bevakning in to_fetch
+            }
+            # Results are merged into the database one at a time, on this thread
+            for future in as_completed(futures):
+                bevakning = futures[future]
+                state = states[bevakning['id']]
+                try:
+                    current_listings = future.result()
+                except Exception as e:
+                    # The counters stay uncommitted, so the next poll fetches again
+                    logger.error(f"Error getting listings for bevakning {state.id}: {e}")
+                    continue
+                if self.scheduler:
+                    self.scheduler.commit(bevakning)
+                if not current_listings:
+                    continue
+                self.update_listings_database(state.id, current_listings)
+                
+                if state.new_items_since_start > 0:
+                    # Show details for the newest listings from the response we already have
+                    self.log_listing_details(state, current_listings[:5])
+    
+    @traced('monitor.cycle')
+    def run_cycle(self) -> bool:
+        """Check all bevakningar once and save state, returns False when no bevakningar were found"""
+        started = time.perf_counter()
+        bevakningar = self.get_bevakningar()
+        if not bevakningar:
+            logger.warning("No bevakningar found or API error")
+            return False
+        
+        logger.info(f"Found {len(bevakningar)} active bevakningar")
+        
+        # Check each bevakning
+        self.check_bevakningar(bevakningar)
+        
+        # Save state
+        self.save_state()
+        self.record_cycle(time.perf_counter() - started)
+        return True
+    
+    def record_cycle(self, duration: float) -> None:
+        """Record a finished cycle, alert on bevakningar_last_cycle_duration_seconds > bevakningar_check_interval_seconds"""
+        self.metrics.observe('bevakningar_cycle_duration_seconds', duration)
+        self.metrics.set('bevakningar_last_cycle_duration_seconds', duration)
+        self.metrics.set('bevakningar_last_cycle_timestamp_seconds', time.time())
+        self.metrics.inc('bevakningar_cycles_total')
+        if duration > self.check_interval:
+            logger.warning(f"⚠️ Check took {duration:.1f}s, longer than the {self.check_interval}s interval")
+        if self.metrics_file:
+            try:
+                self.metrics.dump(self.metrics_file)
+            except Exception as e:
+                logger.error(f"Could not write metrics file: {e}")
+    
+    def write_trace(self) -> None:
+        """Write the spans recorded so far to the trace file"""
+        if not self.tracer or not self.trace_file:
+            return
+        try:
+            self.tracer.write(self.trace_file)
+        except Exception as e:
+            logger.error(f"Could not write trace file: {e}")
+    
+    def export_listings(self, path: str) -> None:
+        """Export the stored listings as Arrow, Parquet, CSV or NDJSON depending on the suffix of path"""
+        # The database is streamed in batches, the other storages are already in memory
+        listings = self.store.bevakning_listings() if self.store else grouped_listings(self.listings)
+        exporter = export_listings(listings, path)
+        if exporter.path != Path(path):
+            logger.warning(f"pyarrow is not installed, exporting as {exporter.format} instead")
+        logger.info(f"Exported {exporter.rows} listings to {exporter.path}")
+    
+    def run_monitoring_loop(self, max_iterations: Optional[int] = None) -> None:
         """Main monitoring loop"""
         iteration = 0
         logger.info("🚀 Starting Blocket Bevakningar Monitor...")
@@ -213,80 +617,24 @@ class BevakningarMonitor:
                 
                 logger.info(f"\n🔄 Check #{iteration} at {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
                 
-                # Get current bevakningar
-                bevakningar = self.get_bevakningar()
-                if not bevakningar:
-                    logger.warning("No bevakningar found or API error")
+                # Get current bevakningar, check each one and save state
+                found = self.run_cycle()
+                self.write_trace()
+                if not found:
                     continue
                 
-                logger.info(f"Found {len(bevakningar)} active bevakningar")
-                
-                # Check each bevakning
-                for bevakning in bevakningar:
-                    state = self.check_for_new_items(bevakning)
-                    
-                    # Always get current listings and update database
-                    current_listings = self.get_recent_listings(state.id, limit=99)
-                    if current_listings:
-                        self.update_listings_database(state.id, current_listings)
-                    
-                    if state and state.new_items_since_start > 0:
-                        # Show detailed listings for new items
-                        recent_listings = self.get_recent_listings(state.id, limit=5)
-                        if recent_listings:
-                            logger.info(f"📝 NEW LISTINGS DETAILS from {state.name}:")
-                            logger.info("=" * 60)
-                            
-                            for i, listing in enumerate(recent_listings, 1):
-                                if 'ad' in listing:
-                                    ad = listing['ad']
-                                    logger.info(f"\n🆕 NEW LISTING #{i}:")
-                                    logger.info(f"   📌 Title: {ad.get('subject', 'N/A')}")
-                                    
-                                    # Price information
-                                    price = ad.get('price', {})
-                                    price_str = f"{price.get('value', 'N/A')} {price.get('suffix', '')}"
-                                    logger.info(f"   💰 Price: {price_str}")
-                                    
-                                    # Location and status
-                                    logger.info(f"   📍 Location: {ad.get('zipcode', 'N/A')}")
-                                    logger.info(f"   📅 Listed: {ad.get('list_time', 'N/A')}")
-                                    logger.info(f"   ✅ Status: {ad.get('ad_status', 'N/A')}")
-                                    
-                                    # Full description
-                                    body = ad.get('body', '')
-                                    if body:
-                                        logger.info(f"   📝 Description: {body}")
-                                    
-                                    # Images
-                                    if 'images' in ad and ad['images']:
-                                        logger.info(f"   🖼️  Images: {len(ad['images'])} available")
-                                        for j, img in enumerate(ad['images'][:3], 1):  # Show first 3 image URLs
-                                            if 'url' in img:
-                                                logger.info(f"      Image {j}: {img['url']}")
-                                    
-                                    # Seller information
-                                    if 'advertiser' in ad:
-                                        advertiser = ad['advertiser']
-                                        logger.info(f"   👤 Seller: {advertiser.get('name', 'N/A')} ({advertiser.get('type', 'N/A')})")
-                                    
-                                    logger.info("-" * 40)
-                                else:
-                                    logger.info(f"   • Raw listing data: {listing}")
-                            
-                            logger.info("=" * 60)
-                
-                # Save state
-                self.save_state()
-                
                 # Display summary every 5 iterations
                 if iteration % 5 == 0:
                     self.display_summary()
                 
                 # Wait for next check
                 if max_iterations is None or iteration < max_iterations:
-                    logger.info(f"⏰ Waiting {self.check_interval} seconds until next check...")
-                    time.sleep(self.check_interval)
+                    wait = self.check_interval
+                    if self.scheduler:
+                        # Wake up when the next bevakning is due
+                        wait = max(1, round(self.scheduler.seconds_until_next()))
+                    logger.info(f"⏰ Waiting {wait} seconds until next check...")
+                    time.sleep(wait)
                 
         except KeyboardInterrupt:
             logger.info("\n🛑 Monitoring stopped by user")
@@ -296,10 +644,24 @@ class BevakningarMonitor:
             logger.info("💾 Saving final state and listings...")
             self.save_state()
             self.save_listings()
+            self.write_trace()
             self.display_summary()
+            self.close()
             logger.info("👋 Monitor stopped")
 
-def main():
+    def close(self) -> None:
+        """Stop the metrics server and close the API client and listings storage"""
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
+        self.api.close()
+        if self.journal:
+            self.journal.close()
+        if self.store:
+            self.store.close()
+
+def main() -> None:
     """Main function with command line options"""
     import argparse
     
@@ -315,6 +677,68 @@ def main():
         type=int,
         help="Maximum number of checks to run (default: run indefinitely)"
     )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Keep listings in memory as compact Ad objects (lower memory use)"
+    )
+    parser.add_argument(
+        "--storage",
+        choices=['json', 'journal', 'sqlite'],
+        default='json',
+        help="Listings storage: rewrite a JSON file, append to a JSON lines journal or use a SQLite database (default: json)"
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=8,
+        help="Number of bevakningar to fetch listings for concurrently (default: 8)"
+    )
+    parser.add_argument(
+        "--adaptive", "-a",
+        action="store_true",
+        help="Poll each bevakning as often as it gets new items, starting from --interval"
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=int,
+        default=60,
+        help="Shortest interval between polls of a bevakning with --adaptive (default: 60)"
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=int,
+        default=3600,
+        help="Longest interval between polls of a bevakning with --adaptive (default: 3600)"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve metrics in Prometheus text format on http://127.0.0.1:PORT/metrics"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Write metrics as JSON to this file after every check"
+    )
+    parser.add_argument(
+        "--trace-file",
+        help="Record spans of every check and write them as Chrome trace-event JSON to this file"
+    )
+    parser.add_argument(
+        "--changes",
+        action="store_true",
+        help="Log price drops, status changes and edits of ads seen before, and store the changed ads"
+    )
+    parser.add_argument(
+        "--deals",
+        action="store_true",
+        help="Keep a price history and log ads priced far below similar ones"
+    )
+    parser.add_argument(
+        "--export",
+        metavar="PATH",
+        help="Export the stored listings to PATH (.parquet, .arrow, .csv or .ndjson) and exit"
+    )
     parser.add_argument(
         "--once", "-o",
         action="store_true",
@@ -322,26 +746,32 @@ def main():
     )
     
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
     
     # Create monitor
-    monitor = BevakningarMonitor(check_interval=args.interval)
+    monitor = BevakningarMonitor(
+        check_interval=args.interval, compact=args.compact, storage=args.storage, workers=args.workers,
+        adaptive=args.adaptive, min_interval=args.min_interval, max_interval=args.max_interval,
+        metrics_port=args.metrics_port, metrics_file=args.metrics_file, trace_file=args.trace_file,
+        detect_changes=args.changes, find_deals=args.deals
+    )
     
-    if args.once:
-        # Just run once
-        logger.info("🔍 Running single check...")
-        bevakningar = monitor.get_bevakningar()
-        for bevakning in bevakningar:
-            state = monitor.check_for_new_items(bevakning)
-            # Get and save all listings
-            current_listings = monitor.get_recent_listings(state.id, limit=99)
-            if current_listings:
-                monitor.update_listings_database(state.id, current_listings)
-        monitor.save_state()
-        monitor.save_listings()
-        monitor.display_summary()
-    else:
-        # Run monitoring loop
-        monitor.run_monitoring_loop(max_iterations=args.iterations)
+    try:
+        if args.export:
+            monitor.export_listings(args.export)
+        elif args.once:
+            # Just run once
+            logger.info("🔍 Running single check...")
+            monitor.run_cycle()
+            monitor.save_listings()
+            monitor.write_trace()
+            monitor.display_summary()
+        else:
+            # Run monitoring loop
+            monitor.run_monitoring_loop(max_iterations=args.iterations)
+    finally:
+        monitor.close()
 
 if __name__ == "__main__":
     main()
@@ -22,6 +22,9 @@ def test_listings():
         print()
     
     # 2. Get detailed listings from each bevakning
+    results = api.get_listings_many(
+        [int(search['id']) for search in searches], limit=5
+    )
     for search in searches:
         search_id = search['id']
         name = search['name']
@@ -32,7 +35,9 @@ def test_listings():
         
         try:
             # Get listings (limit to 5 for demo)
-            response = api.get_listings(search_id=int(search_id), limit=5)
+            response = results[int(search_id)]
+            if isinstance(response, Exception):
+                raise response
             
             if 'data' in response and response['data']:
                 print(f"Found {len(response['data'])} listings (showing first 5):")
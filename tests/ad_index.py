@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from blocket_api.ad_index import AdIndex, Sighting
+from blocket_api.models import Ad
+
+
+def listing(ad_id: str, subject: str = "Cykel") -> dict:
+    return {"ad": {"ad_id": ad_id, "subject": subject}}
+
+
+def test_record_sightings() -> None:
+    index = AdIndex()
+
+    assert index.record("1", listing("a"), seen_at="2025-01-01") is Sighting.new
+    assert index.record("1", listing("a")) is Sighting.known
+    assert index.record("2", Ad.from_listing(listing("a"))) is Sighting.new_reference
+    assert index.sighting("2", "a") is Sighting.known
+    assert index.sighting("3", "b") is Sighting.new
+
+    entry = index.get("a")
+    assert entry is not None
+    assert entry.bevakning_ids == ["1", "2"]
+    assert entry.first_seen == "2025-01-01"
+
+
+def test_persisted(tmp_path: Path) -> None:
+    path = tmp_path / "index.jsonl"
+    index = AdIndex(path)
+    index.record("1", listing("a"), seen_at="2025-01-01")
+    index.record("2", listing("a"))
+    index.save()
+    index.save()
+    index.record("1", listing("b"), seen_at="2025-01-02")
+    index.save()
+
+    # Each save appends only the sightings added since the last one.
+    assert path.read_bytes().splitlines() == [
+        b'["a","1","2025-01-01"]',
+        b'["a","2","2025-01-01"]',
+        b'["b","1","2025-01-02"]',
+    ]
+    restored = AdIndex(path)
+    assert len(restored) == 2
+    assert "a" in restored
+    assert restored.get("a") == index.get("a")
+    assert restored.get("b") == index.get("b")
+
+
+def test_torn_last_line(tmp_path: Path) -> None:
+    path = tmp_path / "index.jsonl"
+    path.write_bytes(b'["a","1","2025-01-01"]\n["b","1","20')
+    index = AdIndex(path)
+    assert "b" not in index
+
+    index.record("1", listing("c"), seen_at="2025-01-03")
+    index.save()
+
+    restored = AdIndex(path)
+    assert len(restored) == 2
+    assert "a" in restored and "c" in restored
+
+
+def test_reconcile() -> None:
+    index = AdIndex()
+    index.record("1", listing("a"))
+    stored = {"1": [listing("a"), {**listing("b"), "discovered_at": "2025-01-02"}]}
+
+    assert index.reconcile(stored) == 1
+    assert index.reconcile(stored) == 0
+    entry = index.get("b")
+    assert entry is not None
+    assert entry.first_seen == "2025-01-02"
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+import respx
+from httpx import Response
+
+from blocket_api.async_blocket import AsyncBlocketAPI
+from blocket_api.blocket import (
+    BASE_URL,
+    BYTBIL_URL,
+    APIError,
+    LimitError,
+    TokenError,
+)
+
+
+@respx.mock
+def test_saved_searches() -> None:
+    respx.get(f"{BASE_URL}/saved/v2/searches").mock(
+        return_value=Response(status_code=200, json={"data": [{"id": "1"}]}),
+    )
+    respx.get(f"{BASE_URL}/mobility-saved-searches/v1/searches").mock(
+        return_value=Response(status_code=200, json={"data": [{"id": "2"}]}),
+    )
+
+    async def run() -> list[dict]:
+        async with AsyncBlocketAPI("token") as api:
+            return await api.saved_searches()
+
+    assert asyncio.run(run()) == [{"id": "1"}, {"id": "2"}]
+
+
+@respx.mock
+def test_for_search_id_mobility() -> None:
+    respx.get(f"{BASE_URL}/saved/v2/searches_content/123?lim=99").mock(
+        return_value=Response(status_code=404),
+    )
+    respx.get(f"{BASE_URL}/mobility-saved-searches/v1/searches/123/ads?lim=99").mock(
+        return_value=Response(status_code=200, json={"data": "mobility-data"}),
+    )
+
+    async def run() -> dict:
+        async with AsyncBlocketAPI("token") as api:
+            return await api.get_listings(search_id=123)
+
+    assert asyncio.run(run()) == {"data": "mobility-data"}
+
+
+@respx.mock
+def test_get_listings_many() -> None:
+    respx.get(f"{BASE_URL}/saved/v2/searches_content/1?lim=99").mock(
+        return_value=Response(status_code=200, json={"data": "listings-data"}),
+    )
+    respx.get(f"{BASE_URL}/saved/v2/searches_content/2?lim=99").mock(
+        return_value=Response(status_code=404),
+    )
+    respx.get(f"{BASE_URL}/mobility-saved-searches/v1/searches/2/ads?lim=99").mock(
+        return_value=Response(status_code=400),
+    )
+
+    async def run() -> dict[int, dict | Exception]:
+        async with AsyncBlocketAPI("token") as api:
+            return await api.get_listings_many([1, 2], concurrency=2)
+
+    results = asyncio.run(run())
+    assert results[1] == {"data": "listings-data"}
+    assert isinstance(results[2], APIError)
+
+
+def test_get_listings_many_concurrency() -> None:
+    async def run() -> None:
+        async with AsyncBlocketAPI("token") as api:
+            with pytest.raises(ValueError, match="Concurrency must be at least 1"):
+                await api.get_listings_many([1], concurrency=0)
+
+    asyncio.run(run())
+
+
+@respx.mock
+def test_motor_search_and_price_eval() -> None:
+    expected_url_filter = '?filter={"key": "make", "values": ["Audi", "Toyota"]}'
+    respx.get(
+        f"{BASE_URL}/motor-search-service/v4/search/car{expected_url_filter}&page=1"
+    ).mock(return_value=Response(status_code=200, json={"data": "ok"}))
+    respx.get(f"{BYTBIL_URL}/blocket-basedata-api/v3/vehicle-data/ABC123").mock(
+        return_value=Response(status_code=200, json={"private_valuation": 108155}),
+    )
+
+    async def run() -> list[dict]:
+        async with AsyncBlocketAPI("token") as api:
+            return list(
+                await asyncio.gather(
+                    api.motor_search(page=1, make=["Audi", "Toyota"]),
+                    api.price_eval("ABC123"),
+                )
+            )
+
+    assert asyncio.run(run()) == [{"data": "ok"}, {"private_valuation": 108155}]
+
+
+def test_errors() -> None:
+    async def run() -> None:
+        async with AsyncBlocketAPI("token") as api:
+            with pytest.raises(LimitError):
+                await api.custom_search("saab", limit=100)
+        async with AsyncBlocketAPI() as api:
+            with pytest.raises(TokenError):
+                await api.get_listings()
+
+    asyncio.run(run())
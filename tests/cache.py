@@ -0,0 +1,76 @@
+import pytest
+import respx
+from httpx import Response
+
+from blocket_api.blocket import BASE_URL, BYTBIL_URL, APIError, BlocketAPI
+from blocket_api.cache import ResponseCache
+from blocket_api.qasa import QASA_URL, HomeType
+
+STORES_URL = f"{BASE_URL}/search_bff/v1/stores?q=bilar&page=0"
+
+
+@respx.mock
+def test_repeated_calls_are_cached() -> None:
+    stores = respx.get(STORES_URL).mock(
+        return_value=Response(status_code=200, json={"data": []}),
+    )
+    qasa = respx.post(QASA_URL).mock(
+        return_value=Response(status_code=200, json={"data": {}}),
+    )
+    cache = ResponseCache()
+    api = BlocketAPI("token", cache=cache)
+
+    for _ in range(3):
+        assert api.search_store("bilar") == {"data": []}
+        api.home_search("Stockholm", HomeType.apartment)
+    api.home_search("Göteborg", HomeType.apartment)
+
+    assert stores.call_count == 1
+    assert qasa.call_count == 2
+    assert (cache.stats.hits, cache.stats.misses) == (4, 3)
+
+
+@respx.mock
+def test_lru_eviction_and_invalidation() -> None:
+    for registration_number in ("AAA111", "BBB222", "CCC333"):
+        respx.get(
+            f"{BYTBIL_URL}/blocket-basedata-api/v3/vehicle-data/{registration_number}"
+        ).mock(return_value=Response(status_code=200, json={}))
+    cache = ResponseCache(max_entries=2)
+    api = BlocketAPI("token", cache=cache)
+
+    api.price_eval("AAA111")
+    api.price_eval("BBB222")
+    api.price_eval("CCC333")
+
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+    assert cache.invalidate(f"{BYTBIL_URL}/blocket-basedata-api") == 2
+    assert len(cache) == 0
+
+
+@respx.mock
+def test_saved_searches_and_errors_not_cached() -> None:
+    route = respx.get(f"{BASE_URL}/saved/v2/searches_content/1?lim=99").mock(
+        return_value=Response(status_code=200, json={"data": []}),
+    )
+    failing = respx.get(STORES_URL).mock(return_value=Response(status_code=500))
+    cache = ResponseCache()
+    api = BlocketAPI("token", cache=cache, retry=None)
+
+    api.get_listings(search_id=1)
+    api.get_listings(search_id=1)
+    for _ in range(2):
+        with pytest.raises(APIError):
+            api.search_store("bilar")
+
+    assert route.call_count == 2
+    assert failing.call_count == 2
+    assert len(cache) == 0
+
+
+def test_ttl_for() -> None:
+    cache = ResponseCache(default_ttl=5, ttls={"/a": 10, "/a/b": 20})
+    assert cache.ttl_for("https://x/a/b/c") == 20
+    assert cache.ttl_for("https://x/a/c") == 10
+    assert cache.ttl_for("https://x/c") == 5
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from blocket_api.changes import ChangeDetector, Edited, PriceChanged, StatusChanged
+from blocket_api.models import Ad
+
+
+def listing(
+    ad_id: str,
+    price: int = 1000,
+    status: str = "active",
+    subject: str = "Cykel",
+    body: str = "Fin cykel",
+) -> dict:
+    return {
+        "ad": {
+            "ad_id": ad_id,
+            "price": {"value": price, "suffix": "kr"},
+            "ad_status": status,
+            "subject": subject,
+            "body": body,
+        },
+        "discovered_at": "2025-01-01",
+    }
+
+
+def test_first_sighting_is_baseline() -> None:
+    detector = ChangeDetector()
+
+    assert detector.observe(listing("a"), "1") == []
+    assert detector.observe(listing("a"), "1") == []
+    assert detector.observe({"ad": {}}) == []
+    assert "a" in detector
+    assert len(detector) == 1
+
+
+def test_typed_changes() -> None:
+    detector = ChangeDetector()
+    detector.observe(listing("a"))
+
+    assert detector.observe(listing("a", price=800), "1") == [
+        PriceChanged("a", "1", 1000, 800)
+    ]
+    (change,) = detector.observe(listing("a", price=900), "1")
+    assert isinstance(change, PriceChanged) and not change.lowered
+    assert detector.observe_many(
+        "2", [listing("a", price=900, status="sold", body="Såld")]
+    ) == [
+        StatusChanged("a", "2", "active", "sold"),
+        Edited("a", "2", ("body",)),
+    ]
+
+
+def test_compact_ads_match_dicts() -> None:
+    detector = ChangeDetector()
+    detector.observe(listing("a"))
+
+    assert detector.observe(Ad.from_listing(listing("a"))) == []
+    assert detector.observe(Ad.from_listing(listing("a", subject="Ny"))) == [
+        Edited("a", None, ("subject",))
+    ]
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    path = tmp_path / "fingerprints.json"
+    detector = ChangeDetector(path)
+    detector.observe(listing("a"))
+    detector.observe(listing("b"))
+    detector.forget("b")
+    detector.save()
+
+    loaded = ChangeDetector(path)
+    assert len(loaded) == 1
+    assert loaded.observe(listing("a")) == []
+    assert loaded.observe(listing("a", price=500)) == [
+        PriceChanged("a", None, 1000, 500)
+    ]
+
+    path.write_text("not json")
+    assert len(ChangeDetector(path)) == 0
@@ -0,0 +1,42 @@
+import respx
+from httpx import Response
+
+from blocket_api.blocket import BASE_URL, BlocketAPI, Region
+from blocket_api.qasa import QASA_URL, HomeType
+from blocket_api.token_cache import PublicTokenProvider
+
+
+@respx.mock
+def test_requests_share_one_client() -> None:
+    """
+    Every method, including the Qasa path, goes through the instance's client.
+    """
+    custom = respx.get(
+        f"{BASE_URL}/search_bff/v2/content?lim=99&q=saab&r=0&status=active"
+    ).mock(return_value=Response(status_code=200, json={"data": []}))
+    qasa = respx.post(QASA_URL).mock(
+        return_value=Response(status_code=200, json={"data": {}})
+    )
+
+    with BlocketAPI("token") as api:
+        client = api.client
+        api.custom_search("saab", Region.hela_sverige)
+        api.home_search(city="Stockholm", type=HomeType.apartment)
+        assert api.client is client
+
+    assert client.is_closed
+    assert custom.calls.last.request.headers["Authorization"] == "Bearer token"
+    assert "Mozilla" in qasa.calls.last.request.headers["User-Agent"]
+
+
+@respx.mock
+def test_public_token_uses_client() -> None:
+    respx.get(
+        "https://www.blocket.se/api/adout-api-route/refresh-token-and-validate-session"
+    ).mock(return_value=Response(status_code=200, json={"bearerToken": "public"}))
+    respx.get(f"{BASE_URL}/search_bff/v1/stores?q=bilar&page=0").mock(
+        return_value=Response(status_code=200, json={"data": []}),
+    )
+    with BlocketAPI(token_provider=PublicTokenProvider()) as api:
+        assert api.search_store("bilar") == {"data": []}
+        assert api.token == "public"
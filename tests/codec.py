@@ -0,0 +1,28 @@
+import pytest
+
+from blocket_api import codec
+from blocket_api.models import Ad
+
+VALUE = {"ad": {"ad_id": "1", "subject": "Cykel för barn", "price": {"value": 5}}}
+
+
+@pytest.mark.parametrize("backend", list(codec.BACKENDS))
+def test_backends_round_trip(backend: str) -> None:
+    active = codec.backend()
+    codec.use_backend(backend)
+    try:
+        encoded = codec.dumps(VALUE)
+        assert encoded == codec.dumps(VALUE)
+        assert "Cykel för barn".encode() in encoded
+        assert b" " not in encoded.replace(b"Cykel f\xc3\xb6r barn", b"")
+        assert codec.loads(encoded) == codec.loads(encoded.decode()) == VALUE
+        assert codec.loads(
+            codec.dumps([Ad.from_listing(VALUE)], default=Ad.to_listing)
+        ) == [VALUE]
+    finally:
+        codec.use_backend(active)
+
+
+def test_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        codec.use_backend("simdjson")
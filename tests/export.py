@@ -0,0 +1,149 @@
+import csv
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from blocket_api import export
+from blocket_api.export import (
+    COLUMNS,
+    ListingExporter,
+    export_listings,
+    grouped_listings,
+    listing_row,
+)
+from blocket_api.models import Ad
+from blocket_api.store import SQLiteListingStore
+
+
+def listing(ad_id: str, price: int = 1000) -> dict:
+    return {
+        "ad": {
+            "ad_id": ad_id,
+            "subject": "Cykel",
+            "price": {"value": price, "old_value": price + 100, "suffix": "kr"},
+            "list_time": "2025-08-15T00:20:36+02:00",
+            "zipcode": "11122",
+            "category": [{"id": "6000"}, {"id": "6060"}],
+            "advertiser": {"type": "private"},
+            "images": [{"url": "a.jpg"}, {"url": "b.jpg"}],
+        },
+        "discovered_at": "2025-08-23T20:26:07",
+    }
+
+
+ROW = {
+    "ad_id": "a",
+    "bevakning_id": "1",
+    "subject": "Cykel",
+    "price": 1000,
+    "old_price": 1100,
+    "list_time": "2025-08-15T00:20:36+02:00",
+    "zipcode": "11122",
+    "category_ids": ["6000", "6060"],
+    "seller_type": "private",
+    "image_count": 2,
+    "discovered_at": "2025-08-23T20:26:07",
+}
+
+
+@pytest.fixture
+def without_pyarrow() -> Iterator[None]:
+    pyarrow = export.pa
+    export.pa = None  # type: ignore[assignment]
+    try:
+        yield
+    finally:
+        export.pa = pyarrow
+
+
+def test_listing_row() -> None:
+    assert listing_row(listing("a"), "1") == ROW
+    assert listing_row(Ad.from_listing(listing("a")), "1") == ROW
+    bare = listing_row({"ad_id": 5, "price": {"value": "gratis"}})
+    assert (bare["ad_id"], bare["price"], bare["image_count"]) == ("5", None, 0)
+    assert list(bare) == list(COLUMNS)
+
+
+def test_ndjson_batches(tmp_path: Path) -> None:
+    path = tmp_path / "listings.ndjson"
+    with ListingExporter(path, batch_size=2) as exporter:
+        exporter.write_many([listing(str(i)) for i in range(5)], "1")
+        assert exporter.rows == 4
+        assert not path.exists()
+
+    assert exporter.rows == 5
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [row["ad_id"] for row in rows] == ["0", "1", "2", "3", "4"]
+    assert rows[0] == dict(ROW, ad_id="0")
+
+
+def test_csv(tmp_path: Path) -> None:
+    exporter = export_listings(
+        grouped_listings({"1": [listing("a")], "2": [Ad.from_listing(listing("b"))]}),
+        tmp_path / "listings.csv",
+    )
+    assert exporter.rows == 2
+
+    with open(exporter.path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == list(COLUMNS)
+    assert (rows[0]["ad_id"], rows[0]["category_ids"]) == ("a", "6000,6060")
+    assert (rows[1]["bevakning_id"], rows[1]["price"]) == ("2", "1000")
+
+
+@pytest.mark.usefixtures("without_pyarrow")
+def test_fallback_without_pyarrow(tmp_path: Path) -> None:
+    exporter = export_listings([("1", listing("a"))], tmp_path / "listings.parquet")
+    assert (exporter.format, exporter.path) == ("csv", tmp_path / "listings.csv")
+    assert exporter.path.exists()
+
+    with pytest.raises(ImportError):
+        ListingExporter(tmp_path / "listings.arrow", fallback=None)
+
+
+def test_errors(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        ListingExporter(tmp_path / "listings.xlsx")
+    with pytest.raises(ValueError):
+        ListingExporter(tmp_path / "listings.csv", batch_size=0)
+
+    path = tmp_path / "listings.csv"
+    with pytest.raises(RuntimeError), ListingExporter(path) as exporter:
+        exporter.write(listing("a"))
+        raise RuntimeError("interrupted")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_arrow_and_parquet(tmp_path: Path) -> None:
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    listings = [("1", listing(str(i))) for i in range(5)]
+
+    arrow = export_listings(listings, tmp_path / "listings.arrow", batch_size=2)
+    with pa.ipc.open_file(arrow.path) as reader:
+        assert reader.num_record_batches == 3
+        table = reader.read_all()
+    assert table.column_names == list(COLUMNS)
+    assert table.to_pylist()[0] == dict(ROW, ad_id="0")
+
+    parquet = export_listings(listings, tmp_path / "listings.parquet", batch_size=2)
+    metadata = pq.ParquetFile(parquet.path).metadata
+    assert (metadata.num_rows, metadata.num_row_groups) == (5, 3)
+
+
+def test_export_store(tmp_path: Path) -> None:
+    with SQLiteListingStore(tmp_path / "db.sqlite3") as store:
+        store.add_listings("1", [listing("a")])
+        store.add_listings("2", [listing("a"), listing("b")])
+        exporter = export_listings(
+            store.bevakning_listings(), tmp_path / "listings.ndjson"
+        )
+
+    rows = [json.loads(line) for line in exporter.path.read_text().splitlines()]
+    assert sorted((row["bevakning_id"], row["ad_id"]) for row in rows) == [
+        ("1", "a"),
+        ("2", "a"),
+        ("2", "b"),
+    ]
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+from blocket_api.journal import ListingJournal
+from blocket_api.models import Ad
+
+
+def listing(ad_id: str, subject: str = "Cykel") -> dict:
+    return {"ad": {"ad_id": ad_id, "subject": subject}, "discovered_at": "2025-01-01"}
+
+
+def test_append_and_load(tmp_path: Path) -> None:
+    journal = ListingJournal(tmp_path / "listings.jsonl")
+    journal.append("1", [listing("a"), listing("b")])
+    journal.append("2", [Ad.from_listing(listing("c"))])
+    journal.close()
+
+    loaded = ListingJournal(tmp_path / "listings.jsonl").load()
+    assert loaded == {"1": [listing("a"), listing("b")], "2": [listing("c")]}
+
+
+def test_later_line_replaces_earlier(tmp_path: Path) -> None:
+    journal = ListingJournal(tmp_path / "listings.jsonl")
+    journal.append("1", [listing("a"), listing("b")])
+    journal.append("1", [listing("a", "Sänkt pris")])
+
+    assert journal.garbage == 1
+    assert journal.load() == {"1": [listing("a", "Sänkt pris"), listing("b")]}
+
+
+def test_torn_line_is_skipped(tmp_path: Path) -> None:
+    path = tmp_path / "listings.jsonl"
+    journal = ListingJournal(path)
+    journal.append("1", [listing("a")])
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b'{"bevakning_id": "1", "listi')
+
+    journal = ListingJournal(path)
+    assert journal.load() == {"1": [listing("a")]}
+    assert journal.garbage == 1
+    journal.append("1", [listing("b")])
+    assert journal.load() == {"1": [listing("a"), listing("b")]}
+
+
+def test_compaction_drops_garbage(tmp_path: Path) -> None:
+    path = tmp_path / "listings.jsonl"
+    journal = ListingJournal(path, min_garbage_lines=2)
+    journal.append("1", [listing("a"), listing("b")])
+    journal.append("1", [listing("a", "v2"), listing("b", "v2")])
+    listings = journal.load()
+
+    assert journal.maybe_compact(listings)
+    journal.append("1", [listing("c")])
+    journal.wait()
+
+    assert journal.compactions == 1
+    assert journal.garbage == 0
+    assert not path.with_suffix(".jsonl.compact").exists()
+    assert len(path.read_bytes().splitlines()) == 3
+    assert ListingJournal(path).load() == {
+        "1": [listing("a", "v2"), listing("b", "v2"), listing("c")]
+    }
+
+
+def test_no_compaction_below_threshold(tmp_path: Path) -> None:
+    journal = ListingJournal(tmp_path / "listings.jsonl")
+    journal.append("1", [listing("a"), listing("a")])
+
+    assert not journal.maybe_compact(journal.load())
+
+
+def test_references_share_one_listing(tmp_path: Path) -> None:
+    path = tmp_path / "listings.jsonl"
+    journal = ListingJournal(path)
+    journal.append("1", [listing("a")])
+    journal.append_references("2", ["a", "missing"])
+    journal.append("1", [listing("a", "v2")])
+
+    loaded = journal.load()
+    assert loaded == {"1": [listing("a", "v2")], "2": [listing("a", "v2")]}
+    assert loaded["1"][0] is loaded["2"][0]
+    assert journal.garbage == 2
+
+    journal.compact(loaded)
+    assert len(path.read_bytes().splitlines()) == 2
+    assert b'"ad_id":"a"}' in path.read_bytes().splitlines()[1]
+    assert ListingJournal(path).load() == loaded
@@ -0,0 +1,159 @@
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+from blocket_api.async_blocket import AsyncBlocketAPI
+from blocket_api.blocket import BASE_URL, APIError, BlocketAPI
+from blocket_api.cache import ResponseCache
+from blocket_api.hooks import RequestEnd, RequestHooks, RequestStart, endpoint_template
+from blocket_api.metrics import Histogram, Metrics, serve_metrics
+from blocket_api.throttle import RetryPolicy
+
+LISTINGS_URL = f"{BASE_URL}/saved/v2/searches_content/1?lim=99"
+LISTINGS_ENDPOINT = "api.blocket.se/saved/v2/searches_content/{id}"
+SEARCH_URL = f"{BASE_URL}/search_bff/v2/content?lim=99&q=saab&r=0&status=active"
+
+
+def test_endpoint_template() -> None:
+    assert endpoint_template(LISTINGS_URL) == LISTINGS_ENDPOINT
+    assert (
+        endpoint_template(
+            "https://api.bytbil.com/blocket-basedata-api/v3/vehicle-data/ABC123"
+        )
+        == "api.bytbil.com/blocket-basedata-api/v3/vehicle-data/{id}"
+    )
+    assert (
+        endpoint_template(f"{BASE_URL}/mobility-saved-searches/v1/searches/3/ads")
+        == "api.blocket.se/mobility-saved-searches/v1/searches/{id}/ads"
+    )
+
+
+@respx.mock
+def test_hooks() -> None:
+    respx.get(SEARCH_URL).mock(
+        side_effect=[
+            Response(status_code=503),
+            Response(status_code=200, json={"data": [1]}),
+        ]
+    )
+    started: list[RequestStart] = []
+    ended: list[RequestEnd] = []
+    api = BlocketAPI(
+        "token",
+        rate_limiter=None,
+        retry=RetryPolicy(base_delay=0),
+        cache=ResponseCache(),
+        hooks=RequestHooks(on_start=[started.append], on_end=[ended.append]),
+    )
+
+    api.custom_search("saab")
+    api.custom_search("saab")
+
+    assert [event.endpoint for event in started] == [
+        "api.blocket.se/search_bff/v2/content"
+    ] * 2
+    miss, hit = ended
+    assert (miss.status, miss.retries, miss.cache_hit) == (200, 1, False)
+    assert miss.bytes == len(b'{"data":[1]}')
+    assert miss.latency > 0
+    assert (hit.status, hit.retries, hit.cache_hit) == (200, 0, True)
+
+
+@respx.mock
+def test_hooks_error() -> None:
+    respx.get(LISTINGS_URL).mock(side_effect=httpx.ConnectError("down"))
+    ended: list[RequestEnd] = []
+    api = BlocketAPI(
+        "token",
+        rate_limiter=None,
+        retry=None,
+        hooks=RequestHooks(on_end=[ended.append]),
+    )
+
+    with pytest.raises(APIError):
+        api.get_listings(search_id=1)
+    assert ended[0].status is None
+    assert isinstance(ended[0].error, httpx.ConnectError)
+
+
+@respx.mock
+def test_metrics_collect_requests() -> None:
+    respx.get(LISTINGS_URL).mock(
+        return_value=Response(status_code=200, json={"data": []})
+    )
+    metrics = Metrics()
+
+    async def run() -> None:
+        async with AsyncBlocketAPI(
+            "token", rate_limiter=None, hooks=metrics.hooks()
+        ) as api:
+            await api.get_listings(search_id=1)
+
+    asyncio.run(run())
+    endpoint = {"endpoint": LISTINGS_ENDPOINT}
+
+    latency = metrics.get("blocket_request_duration_seconds", endpoint)
+    assert isinstance(latency, Histogram)
+    assert latency.count == 1
+    assert metrics.get("blocket_requests_total", {**endpoint, "status": "200"}) == 1
+    text = metrics.prometheus()
+    assert "# TYPE blocket_request_duration_seconds histogram" in text
+    assert (
+        'blocket_request_duration_seconds_bucket{endpoint="'
+        + LISTINGS_ENDPOINT
+        + '",le="+Inf"} 1'
+    ) in text
+
+
+def test_prometheus_and_json(tmp_path: Path) -> None:
+    metrics = Metrics()
+    metrics.describe("cycle_seconds", "histogram", "Cycle duration.", (1.0, 10.0))
+    metrics.observe("cycle_seconds", 0.5)
+    metrics.observe("cycle_seconds", 5)
+    metrics.observe("cycle_seconds", 50)
+    metrics.inc("ingested_total", 3, {"bevakning_id": "1"})
+    metrics.collectors.append(lambda: metrics.set("lag_seconds", 7.5))
+
+    assert metrics.prometheus().splitlines() == [
+        "# HELP cycle_seconds Cycle duration.",
+        "# TYPE cycle_seconds histogram",
+        'cycle_seconds_bucket{le="1.0"} 1',
+        'cycle_seconds_bucket{le="10.0"} 2',
+        'cycle_seconds_bucket{le="+Inf"} 3',
+        "cycle_seconds_sum 55.5",
+        "cycle_seconds_count 3",
+        "# TYPE ingested_total counter",
+        'ingested_total{bevakning_id="1"} 3.0',
+        "# TYPE lag_seconds gauge",
+        "lag_seconds 7.5",
+    ]
+
+    path = tmp_path / "metrics.json"
+    metrics.dump(path)
+    dumped = json.loads(path.read_text())
+    assert dumped["lag_seconds"]["samples"] == [{"labels": {}, "value": 7.5}]
+    assert dumped["cycle_seconds"]["samples"][0]["buckets"] == {
+        "1.0": 1,
+        "10.0": 2,
+        "+Inf": 3,
+    }
+
+
+def test_serve_metrics() -> None:
+    metrics = Metrics()
+    metrics.inc("cycles_total")
+    server = serve_metrics(metrics, 0)
+    try:
+        port = server.server_address[1]
+        response = httpx.get(f"http://127.0.0.1:{port}/metrics")
+        assert response.status_code == 200
+        assert "cycles_total 1.0" in response.text
+        assert httpx.get(f"http://127.0.0.1:{port}/other").status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
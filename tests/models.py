@@ -0,0 +1,45 @@
+from blocket_api.models import Ad, ads_from_response
+
+LISTING: dict = {
+    "ad": {
+        "ad_id": "1212894864",
+        "zipcode": "83751",
+        "ad_status": "active",
+        "list_time": "2025-08-15T00:20:36+02:00",
+        "subject": "Giro merit spherical",
+        "body": "Trail hjälm från Giro.",
+        "price": {"value": 750, "old_value": 1000, "suffix": "kr"},
+        "category": [{"id": "6000", "name": "Fritid & hobby"}],
+        "advertiser": {"name": "joeljansson", "type": "private"},
+        "images": [{"url": "https://i.blocketcdn.se/1.jpg", "width": 768}],
+        "map_url": None,
+    },
+    "is_new": True,
+    "discovered_at": "2025-08-23T20:26:07.652283",
+}
+
+
+def test_hot_and_lazy_fields() -> None:
+    ad = Ad.from_listing(LISTING)
+
+    assert ad.ad_id == "1212894864"
+    assert ad.price is not None
+    assert (ad.price.value, ad.price.old_value) == (750, 1000)
+    assert ad.discovered_at == "2025-08-23T20:26:07.652283"
+    assert ad.body == "Trail hjälm från Giro."
+    assert ad.category_ids == ["6000"]
+    assert ad.advertiser is not None and ad.advertiser.is_private
+    assert [image.url for image in ad.images] == ["https://i.blocketcdn.se/1.jpg"]
+    assert ad.get("map_url", "missing") is None
+    assert not hasattr(ad, "__dict__")
+
+
+def test_round_trip() -> None:
+    assert Ad.from_listing(LISTING).to_listing() == LISTING
+    assert Ad.from_listing(LISTING["ad"]).to_dict() == LISTING["ad"]
+
+
+def test_ads_from_response() -> None:
+    ads = ads_from_response({"data": [LISTING, LISTING["ad"]]})
+    assert [ad.ad_id for ad in ads] == ["1212894864", "1212894864"]
+    assert ads[0] == Ad.from_listing(LISTING)
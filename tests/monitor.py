@@ -0,0 +1,347 @@
+import importlib
+import json
+import socket
+import threading
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+import respx
+from httpx import Response
+
+from blocket_api import tracing
+from blocket_api.blocket import BASE_URL
+from blocket_api.models import Ad, listing_ad_id
+
+SEARCHES_URL = f"{BASE_URL}/saved/v2/searches"
+MOBILITY_SEARCHES_URL = f"{BASE_URL}/mobility-saved-searches/v1/searches"
+
+
+def listing(ad_id: str, price: int = 1000) -> dict:
+    return {"ad": {"ad_id": ad_id, "subject": "Cykel", "price": {"value": price}}}
+
+
+def mock_searches(searches: dict[str, list[dict]]) -> None:
+    respx.get(SEARCHES_URL).mock(
+        return_value=Response(
+            status_code=200,
+            json={
+                "data": [
+                    {
+                        "id": search_id,
+                        "name": f"Bevakning {search_id}",
+                        "total_count": len(listings),
+                        "new_count": 0,
+                    }
+                    for search_id, listings in searches.items()
+                ]
+            },
+        )
+    )
+    respx.get(MOBILITY_SEARCHES_URL).mock(
+        return_value=Response(status_code=200, json={"data": []})
+    )
+    for search_id, listings in searches.items():
+        respx.get(f"{BASE_URL}/saved/v2/searches_content/{search_id}?lim=99").mock(
+            return_value=Response(status_code=200, json={"data": listings})
+        )
+
+
+@pytest.fixture
+def make_monitor(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[Callable[..., Any]]:
+    """
+    Monitors keeping their files in tmp_path, with a token and without rate
+    limiting or retries.
+    """
+    monkeypatch.chdir(tmp_path)
+    # Not a package, and only importable once the working directory is set,
+    # as it sets up a log file there.
+    module = importlib.import_module("monitor_bevakningar")
+    previous = tracing.get_tracer()
+    monitors = []
+
+    def make(**kwargs: Any) -> Any:
+        monitor = module.BevakningarMonitor(**kwargs)
+        monitor.api.token = "token"
+        monitor.api.rate_limiter = None
+        monitor.api.retry = None
+        monitors.append(monitor)
+        return monitor
+
+    try:
+        yield make
+    finally:
+        tracing.set_tracer(previous)
+        for monitor in monitors:
+            monitor.close()
+
+
+@respx.mock
+def test_loop_writes_trace(make_monitor: Callable[..., Any]) -> None:
+    mock_searches({"1": [listing("a")]})
+    monitor = make_monitor(trace_file="trace.json")
+
+    monitor.run_monitoring_loop(max_iterations=1)
+
+    events = json.loads(Path("trace.json").read_text())["traceEvents"]
+    names = {event["name"] for event in events}
+    assert {"monitor.cycle", "monitor.check_bevakningar", "HTTP GET"} <= names
+
+
+@respx.mock
+def test_removed_bevakning_is_unscheduled(make_monitor: Callable[..., Any]) -> None:
+    mock_searches({"1": [listing("a")], "2": [listing("b")]})
+    monitor = make_monitor(adaptive=True)
+    now = 1000.0
+    monitor.scheduler.clock = lambda: now
+
+    assert monitor.run_cycle()
+    now += 400
+    mock_searches({"1": [listing("a")]})
+    assert monitor.run_cycle()
+
+    assert monitor.scheduler.get("2") is None
+    # The loop sleeps until bevakning 1 is due, not for a second.
+    assert monitor.scheduler.seconds_until_next() > 200
+
+
+@respx.mock
+def test_failed_fetch_is_retried(make_monitor: Callable[..., Any]) -> None:
+    mock_searches({"1": [listing("a")]})
+    content = respx.get(f"{BASE_URL}/saved/v2/searches_content/1?lim=99").mock(
+        side_effect=[
+            Response(status_code=500),
+            Response(status_code=200, json={"data": [listing("a")]}),
+        ]
+    )
+    monitor = make_monitor(adaptive=True)
+    now = 1000.0
+    monitor.scheduler.clock = lambda: now
+
+    assert monitor.run_cycle()
+    assert monitor.listings == {}
+    now += 400
+    # The counters are unchanged, but they were never fetched.
+    assert monitor.run_cycle()
+
+    assert content.call_count == 2
+    assert ad_ids(monitor.listings["1"]) == {"a"}
+
+
+def ad_ids(listings: list) -> set[str]:
+    return {listing_ad_id(listing) for listing in listings}
+
+
+@pytest.mark.parametrize("storage", ["json", "journal", "sqlite"])
+@respx.mock
+def test_cycles_with_shared_ad_and_removed_bevakning(
+    make_monitor: Callable[..., Any], storage: str
+) -> None:
+    mock_searches(
+        {"1": [listing("a"), listing("b")], "2": [listing("a"), listing("c")]}
+    )
+    monitor = make_monitor(storage=storage, workers=2)
+
+    assert monitor.run_cycle()
+    for bevakning_id in ("1", "2"):
+        ingested = monitor.metrics.get(
+            "bevakningar_listings_ingested_total", {"bevakning_id": bevakning_id}
+        )
+        assert ingested == 2
+    # The shared ad is stored once and referenced by both bevakningar.
+    if storage == "sqlite":
+        assert monitor.store.count() == 4
+        assert monitor.store.ad_count() == 3
+        assert monitor.store.ad_ids("2") == {"a", "c"}
+    else:
+        assert set(monitor.ads) == {"a", "b", "c"}
+        assert ad_ids(monitor.listings["2"]) == {"a", "c"}
+        entry = monitor.ad_index.get("a")
+        assert sorted(entry.bevakning_ids) == ["1", "2"]
+
+    removed = respx.get(f"{BASE_URL}/saved/v2/searches_content/2?lim=99")
+    fetched = removed.call_count
+    assert fetched == 1
+    mock_searches({"1": [listing("a"), listing("b"), listing("d")]})
+    assert monitor.run_cycle()
+    assert removed.call_count == fetched
+    monitor.save_listings()
+
+    restored = make_monitor(storage=storage)
+    if storage == "sqlite":
+        assert restored.store.ad_ids("1") == {"a", "b", "d"}
+        assert restored.store.ad_ids("2") == {"a", "c"}
+    else:
+        assert ad_ids(restored.listings["1"]) == {"a", "b", "d"}
+        assert ad_ids(restored.listings["2"]) == {"a", "c"}
+        shared = [
+            listing
+            for bevakning_id in ("1", "2")
+            for listing in restored.listings[bevakning_id]
+            if listing_ad_id(listing) == "a"
+        ]
+        assert shared[0] is shared[1]
+
+
+def stored_price(listing: dict | Ad) -> int | None:
+    ad = listing if isinstance(listing, Ad) else Ad.from_listing(listing)
+    return ad.price.value if ad.price else None
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("storage", ["json", "journal", "sqlite"])
+def test_changed_ad_is_stored_at_its_new_price(
+    make_monitor: Callable[..., Any], storage: str, compact: bool
+) -> None:
+    monitor = make_monitor(storage=storage, compact=compact, detect_changes=True)
+    monitor.update_listings_database("1", [listing("a"), listing("b")])
+    monitor.update_listings_database("2", [listing("a")])
+    monitor.update_listings_database("2", [listing("a", price=800)])
+    monitor.save_listings()
+
+    restored = make_monitor(storage=storage, compact=compact)
+    if storage == "sqlite":
+        stored = list(restored.store.listings())
+    else:
+        shared = monitor.ads["a"]
+        assert stored_price(shared) == 800
+        # Changed in place, so bevakning 1 sees the new price too.
+        assert any(item is shared for item in monitor.listings["1"])
+        discovered_at = (
+            shared.discovered_at if isinstance(shared, Ad) else shared["discovered_at"]
+        )
+        assert discovered_at is not None
+        stored = [item for items in restored.listings.values() for item in items]
+    prices = {(listing_ad_id(item), stored_price(item)) for item in stored}
+    assert prices == {("a", 800), ("b", 1000)}
+
+
+@respx.mock
+def test_listings_are_fetched_in_pool_and_merged_on_caller(
+    make_monitor: Callable[..., Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    mock_searches({"1": [listing("a")], "2": [listing("b")]})
+    monitor = make_monitor(workers=2)
+    assert monitor.run_cycle()
+    mock_searches(
+        {"1": [listing("a"), listing("c")], "2": [listing("b"), listing("d")]}
+    )
+    fetch_threads: list[str] = []
+    merge_threads: list[str] = []
+    details: dict[str, list] = {}
+    get_changed_listings = monitor.get_changed_listings
+    update_listings_database = monitor.update_listings_database
+
+    def fetch(bevakning_id: str, limit: int = 99) -> Any:
+        fetch_threads.append(threading.current_thread().name)
+        return get_changed_listings(bevakning_id, limit)
+
+    def merge(bevakning_id: str, new_listings: list) -> None:
+        merge_threads.append(threading.current_thread().name)
+        update_listings_database(bevakning_id, new_listings)
+
+    monkeypatch.setattr(monitor, "get_changed_listings", fetch)
+    monkeypatch.setattr(monitor, "update_listings_database", merge)
+    monkeypatch.setattr(
+        monitor,
+        "log_listing_details",
+        lambda state, listings: details.setdefault(state.id, listings),
+    )
+
+    assert monitor.run_cycle()
+
+    assert len(fetch_threads) == 2
+    assert all(name.startswith("bevakning") for name in fetch_threads)
+    assert merge_threads == [threading.current_thread().name] * 2
+    # The details come from the response already fetched, not a second request.
+    assert ad_ids(details["1"]) == {"a", "c"}
+    assert ad_ids(details["2"]) == {"b", "d"}
+    for search_id in ("1", "2"):
+        route = respx.get(f"{BASE_URL}/saved/v2/searches_content/{search_id}?lim=99")
+        assert route.call_count == 2
+
+
+@pytest.mark.parametrize("workers", [0, -1])
+def test_workers_must_be_positive(
+    make_monitor: Callable[..., Any], workers: int
+) -> None:
+    with pytest.raises(ValueError, match="Workers must be at least 1"):
+        make_monitor(workers=workers)
+
+
+@respx.mock
+def test_underpriced_ad_is_reported_as_deal(make_monitor: Callable[..., Any]) -> None:
+    # 1.8 standard deviations below these, only 1.3 if it counted itself.
+    ordinary = [listing(str(i), 600 + i * 200) for i in range(5)]
+    mock_searches({"1": ordinary})
+    monitor = make_monitor(find_deals=True)
+    assert monitor.run_cycle()
+    assert monitor.metrics.get("bevakningar_deals_total", {"bevakning_id": "1"}) is None
+
+    mock_searches({"1": [*ordinary, listing("cheap", 500)]})
+    assert monitor.run_cycle()
+
+    assert monitor.metrics.get("bevakningar_deals_total", {"bevakning_id": "1"}) == 1
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_update_accepts_ads_and_bare_ad_dicts(
+    make_monitor: Callable[..., Any], compact: bool
+) -> None:
+    monitor = make_monitor(compact=compact)
+
+    monitor.update_listings_database(
+        "1", [Ad.from_listing(listing("a")), listing("b")["ad"], {"ad": {}}]
+    )
+    monitor.update_listings_database("1", [listing("a"), {"ad_id": "b"}])
+
+    assert ad_ids(monitor.listings["1"]) == {"a", "b"}
+    assert set(monitor.ads) == {"a", "b"}
+    assert monitor.ad_index.get("b") is not None
+    assert all(isinstance(stored, Ad) == compact for stored in monitor.listings["1"])
+
+
+@respx.mock
+def test_change_and_deal_tracking_are_opt_in(make_monitor: Callable[..., Any]) -> None:
+    mock_searches({"1": [listing("a")]})
+    monitor = make_monitor()
+    assert monitor.run_cycle()
+
+    assert monitor.changes is None and monitor.prices is None
+    assert not Path("bevakningar_fingerprints.json").exists()
+    assert not Path("bevakningar_prices.bin").exists()
+    assert Path("bevakningar_ad_index.jsonl").read_bytes().count(b"\n") == 1
+
+    tracking = make_monitor(detect_changes=True, find_deals=True)
+    tracking.update_listings_database("1", [listing("a")])
+    tracking.update_listings_database("1", [listing("a", price=800)])
+    tracking.save_state()
+
+    changes = tracking.metrics.get(
+        "bevakningar_ad_changes_total", {"bevakning_id": "1", "kind": "price"}
+    )
+    assert changes == 1
+    assert Path("bevakningar_fingerprints.json").exists()
+    assert Path("bevakningar_prices.bin").exists()
+
+
+@respx.mock
+def test_metrics_server_stops_with_the_monitor(
+    make_monitor: Callable[..., Any],
+) -> None:
+    mock_searches({"1": [listing("a")]})
+    monitor = make_monitor(metrics_port=0)
+    server = monitor.metrics_server
+    port = server.server_address[1]
+    with socket.create_connection(("127.0.0.1", port)):
+        pass
+
+    monitor.run_monitoring_loop(max_iterations=1)
+
+    assert monitor.metrics_server is None
+    assert server.socket.fileno() == -1
+    with pytest.raises(ConnectionRefusedError):
+        socket.create_connection(("127.0.0.1", port))
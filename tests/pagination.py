@@ -0,0 +1,66 @@
+import asyncio
+
+import respx
+from httpx import Response
+
+from blocket_api.async_blocket import AsyncBlocketAPI
+from blocket_api.blocket import BASE_URL, BlocketAPI
+
+api = BlocketAPI("token")
+
+STORE_URL = (
+    f"{BASE_URL}/search_bff/v2/content?lim=60&page={{page}}&sort=rel"
+    "&store_id=1234&status=active&gl=3&include=extend_with_shipping"
+)
+
+
+def _mock_store_pages() -> list[respx.Route]:
+    return [
+        respx.get(STORE_URL.format(page=page)).mock(
+            return_value=Response(
+                status_code=200,
+                json={
+                    "data": [{"ad_id": f"{page}-{i}"} for i in range(2)],
+                    "total_page_count": 3,
+                },
+            ),
+        )
+        for page in range(3)
+    ]
+
+
+@respx.mock
+def test_iter_store_listings() -> None:
+    routes = _mock_store_pages()
+
+    ad_ids = [ad["ad_id"] for ad in api.iter_store_listings(1234)]
+
+    assert ad_ids == ["0-0", "0-1", "1-0", "1-1", "2-0", "2-1"]
+    assert all(route.call_count == 1 for route in routes)
+
+
+@respx.mock
+def test_iter_store_listings_async() -> None:
+    _mock_store_pages()
+
+    async def run() -> list[str]:
+        async with AsyncBlocketAPI("token") as async_api:
+            return [ad["ad_id"] async for ad in async_api.iter_store_listings(1234)]
+
+    assert asyncio.run(run()) == ["0-0", "0-1", "1-0", "1-1", "2-0", "2-1"]
+
+
+@respx.mock
+def test_iter_motor_search_stops_on_empty_page() -> None:
+    url = (
+        f"{BASE_URL}/motor-search-service/v4/search/car"
+        '?filter={"key": "make", "values": ["Saab"]}&page='
+    )
+    respx.get(f"{url}1").mock(
+        return_value=Response(status_code=200, json={"cards": [{"id": 1}]}),
+    )
+    respx.get(f"{url}2").mock(
+        return_value=Response(status_code=200, json={"cards": []}),
+    )
+
+    assert list(api.iter_motor_search(make=["Saab"])) == [{"id": 1}]
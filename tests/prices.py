@@ -0,0 +1,135 @@
+import statistics
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from blocket_api import prices
+from blocket_api.models import Ad
+from blocket_api.prices import PriceHistory, price_fields
+
+
+def listing(
+    ad_id: str, price: int, category: str = "6060", region: str = "Stockholm"
+) -> dict:
+    return {
+        "ad": {
+            "ad_id": ad_id,
+            "price": {"value": price, "suffix": "kr"},
+            "category": [{"id": "6000"}, {"id": category}],
+            "location": [{"name": region}, {"name": "Solna"}],
+        }
+    }
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request: pytest.FixtureRequest) -> Iterator[None]:
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        yield
+        return
+    numpy = prices.np
+    prices.np = None  # type: ignore[assignment]
+    try:
+        yield
+    finally:
+        prices.np = numpy
+
+
+def test_price_fields() -> None:
+    assert price_fields(listing("a", 100)) == (100, "6060", "Stockholm")
+    assert price_fields(Ad.from_listing(listing("a", 100))) == (
+        100,
+        "6060",
+        "Stockholm",
+    )
+    assert price_fields({"ad": {"ad_id": "a"}}) == (None, None, None)
+
+
+def test_record_only_changes() -> None:
+    history = PriceHistory()
+
+    assert history.record(listing("a", 100), "1")
+    assert not history.record(listing("a", 100), "1")
+    assert history.record(listing("a", 100), "2")
+    assert history.record(listing("a", 90), "1")
+    assert not history.record({"ad": {"ad_id": "b"}}, "1")
+    assert history.record_many("1", [listing("b", 5), listing("b", 5)]) == 1
+    assert len(history) == 4
+
+
+@pytest.mark.usefixtures("backend")
+def test_statistics() -> None:
+    history = PriceHistory()
+    for i, price in enumerate([100, 200, 300, 400]):
+        history.record(listing(str(i), price), "1", seen_at=1000 + i)
+    # Only the latest price of an ad counts.
+    history.record(listing("0", 500), "1", seen_at=2000)
+    history.record(listing("x", 1, category="1020"), "2", seen_at=2000)
+
+    assert sorted(history.prices(category="6060")) == [200, 300, 400, 500]
+    stats = history.stats(bevakning_id="1")
+    assert stats is not None
+    assert (stats.count, stats.mean, stats.median) == (4, 350, 350)
+    assert stats.std == pytest.approx(111.803, abs=1e-3)
+    assert history.percentile(25, category="6060") == 275
+    assert history.percentile(100, region="Stockholm") == 500
+    assert history.prices(since=1500) == [500, 1]
+    assert history.stats(category="unknown") is None
+    assert history.percentile(50, bevakning_id="3") is None
+    with pytest.raises(ValueError):
+        history.percentile(101)
+
+
+@pytest.mark.usefixtures("backend")
+def test_zscores() -> None:
+    history = PriceHistory()
+    history.record_many("1", [listing(str(i), 1000 + i * 10) for i in range(10)])
+    history.record_many("1", [listing("cheap", 100), listing("other", 5, "1020")])
+
+    cheap, ordinary, alone, unpriced = history.zscores(
+        [
+            listing("cheap", 100),
+            listing("1", 1010),
+            listing("other", 5, "1020"),
+            {"ad": {"ad_id": "y"}},
+        ]
+    )
+    # Each ad is compared to the others, not to itself.
+    peers = [1000 + i * 10 for i in range(10)]
+    assert cheap == pytest.approx(
+        (100 - statistics.fmean(peers)) / statistics.pstdev(peers)
+    )
+    peers = [price for price in peers if price != 1010] + [100]
+    assert ordinary == pytest.approx(
+        (1010 - statistics.fmean(peers)) / statistics.pstdev(peers)
+    )
+    assert alone is None
+    assert unpriced is None
+
+
+@pytest.mark.usefixtures("backend")
+def test_zscores_without_spread_among_others() -> None:
+    history = PriceHistory()
+    history.record_many("1", [listing(str(i), 1000) for i in range(5)])
+    history.record(listing("cheap", 500), "1")
+
+    assert history.zscores([listing("cheap", 500)]) == [None]
+    assert history.zscores([listing("new", 500)])[0] == pytest.approx(-2.236, abs=1e-3)
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    path = tmp_path / "prices.bin"
+    history = PriceHistory(path)
+    history.record(listing("a", 100), "1", seen_at=1.5)
+    history.record(listing("b", 200, region="Göteborg"), None, seen_at=2.5)
+    history.save()
+
+    loaded = PriceHistory(path)
+    assert len(loaded) == 2
+    assert list(loaded.columns["time"]) == [1.5, 2.5]
+    assert loaded.prices(region="Göteborg") == [200]
+    assert not loaded.record(listing("a", 100), "1")
+
+    path.write_bytes(path.read_bytes()[:-4])
+    assert len(PriceHistory(path)) == 0
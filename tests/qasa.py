@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import pytest
+import respx
+from httpx import Request, Response
+
+from blocket_api.async_blocket import AsyncBlocketAPI
+from blocket_api.blocket import BlocketAPI
+from blocket_api.qasa import QASA_URL, HomeType, OrderBy, Qasa
+
+api = BlocketAPI("token")
+
+
+def _page(request: Request) -> Response:
+    """
+    150 homes over three pages, the last page repeats a home from the second.
+    """
+    offset = json.loads(request.content)["variables"]["offset"]
+    ids = list(range(offset, min(offset + 60, 150)))
+    if offset == 120:
+        ids.append(119)
+    return Response(
+        status_code=200,
+        json={
+            "data": {
+                "homeIndexSearch": {
+                    "documents": {
+                        "nodes": [{"id": str(i)} for i in ids],
+                        "hasNextPage": offset + 60 < 150,
+                        "pagesCount": 3,
+                        "totalCount": 150,
+                    }
+                }
+            }
+        },
+    )
+
+
+def test_payload_offset() -> None:
+    payload = Qasa(
+        city="Stockholm",
+        home_type=HomeType.apartment,
+        order_by=OrderBy.price,
+        ordering="ascending",
+        offset=120,
+    )._construct_payload()
+    assert payload["variables"]["offset"] == 120
+
+
+@respx.mock
+def test_home_search_all() -> None:
+    route = respx.post(QASA_URL).mock(side_effect=_page)
+
+    homes = api.home_search_all("Stockholm", HomeType.apartment, concurrency=2)
+
+    assert [home["id"] for home in homes] == [str(i) for i in range(150)]
+    assert route.call_count == 3
+
+
+def test_home_search_all_concurrency() -> None:
+    with pytest.raises(ValueError, match="Concurrency must be at least 1"):
+        api.home_search_all("Stockholm", HomeType.apartment, concurrency=0)
+
+
+@respx.mock
+def test_home_search_all_async() -> None:
+    respx.post(QASA_URL).mock(side_effect=_page)
+
+    async def run() -> list[dict]:
+        async with AsyncBlocketAPI() as async_api:
+            return await async_api.home_search_all("Stockholm", HomeType.apartment)
+
+    assert len(asyncio.run(run())) == 150
+
+
+@respx.mock
+def test_iter_home_search() -> None:
+    respx.post(QASA_URL).mock(side_effect=_page)
+
+    homes = list(api.iter_home_search("Stockholm", HomeType.apartment))
+
+    assert len(homes) == 151
+
+
+def test_projection() -> None:
+    qasa = Qasa(
+        city="Stockholm",
+        home_type=HomeType.apartment,
+        order_by=OrderBy.price,
+        ordering="ascending",
+        offset=0,
+        fields="minimal",
+    )
+    query = qasa._construct_payload()["query"]
+    assert "squareMeters" in query
+    assert "description" not in query
+    assert "uploads" not in query
+
+    qasa.fields = ["id", "uploads"]
+    assert (
+        "uploads { id order type url __typename }"
+        in (qasa._construct_payload()["query"])
+    )
+
+    qasa.fields = ["id", "not_a_field"]
+    with pytest.raises(ValueError):
+        qasa._construct_payload()
+
+
+@respx.mock
+def test_persisted_query() -> None:
+    """
+    The query text is only sent when the server does not know its hash.
+    """
+    sent_queries = []
+
+    def persisted(request: Request) -> Response:
+        payload = json.loads(request.content)
+        sent_queries.append("query" in payload)
+        if "query" not in payload and len(sent_queries) == 1:
+            return Response(
+                status_code=200,
+                json={"errors": [{"message": "PersistedQueryNotFound"}]},
+            )
+        return _page(request)
+
+    respx.post(QASA_URL).mock(side_effect=persisted)
+    persisted_api = BlocketAPI("token", qasa_persisted_queries=True)
+
+    persisted_api.home_search("Stockholm", HomeType.apartment, fields="card")
+    persisted_api.home_search("Stockholm", HomeType.apartment, offset=60, fields="card")
+
+    assert sent_queries == [False, True, False]
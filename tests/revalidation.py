@@ -0,0 +1,54 @@
+import respx
+from httpx import Request, Response
+
+from blocket_api.blocket import BASE_URL, BlocketAPI
+
+LISTINGS_URL = f"{BASE_URL}/saved/v2/searches_content/123?lim=99"
+
+
+@respx.mock
+def test_etag_not_modified() -> None:
+    def etag(request: Request) -> Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return Response(status_code=304)
+        return Response(status_code=200, json={"data": [1]}, headers={"ETag": '"v1"'})
+
+    route = respx.get(LISTINGS_URL).mock(side_effect=etag)
+    api = BlocketAPI("token")
+
+    assert api.get_listings_if_changed(123) == {"data": [1]}
+    assert api.get_listings_if_changed(123) is None
+    assert route.calls.last.request.headers["If-None-Match"] == '"v1"'
+
+
+@respx.mock
+def test_content_hash_fallback() -> None:
+    route = respx.get(LISTINGS_URL)
+    route.side_effect = [
+        Response(status_code=200, json={"data": [1]}),
+        Response(status_code=200, json={"data": [1]}),
+        Response(status_code=200, json={"data": [1, 2]}),
+    ]
+    api = BlocketAPI("token")
+
+    assert api.get_listings_if_changed(123) == {"data": [1]}
+    assert api.get_listings_if_changed(123) is None
+    assert api.get_listings_if_changed(123) == {"data": [1, 2]}
+
+
+@respx.mock
+def test_saved_searches_if_changed() -> None:
+    respx.get(f"{BASE_URL}/saved/v2/searches").mock(
+        return_value=Response(status_code=200, json={"data": [{"id": "1"}]}),
+    )
+    mobility = respx.get(f"{BASE_URL}/mobility-saved-searches/v1/searches")
+    mobility.side_effect = [
+        Response(status_code=200, json={"data": []}),
+        Response(status_code=200, json={"data": []}),
+        Response(status_code=200, json={"data": [{"id": "2"}]}),
+    ]
+    api = BlocketAPI("token")
+
+    assert api.saved_searches_if_changed() == [{"id": "1"}]
+    assert api.saved_searches_if_changed() is None
+    assert api.saved_searches_if_changed() == [{"id": "1"}, {"id": "2"}]
@@ -0,0 +1,119 @@
+from pathlib import Path
+from typing import Any
+
+from blocket_api.scheduler import PollScheduler
+
+
+def search(total: int, new: int = 0, id: str = "1") -> dict:
+    return {"id": id, "total_count": total, "new_count": new}
+
+
+def scheduler(**kwargs: Any) -> PollScheduler:
+    return PollScheduler(
+        initial_interval=300, min_interval=60, max_interval=3600, jitter=0, **kwargs
+    )
+
+
+def poll(polls: PollScheduler, search: dict, now: float) -> bool:
+    """
+    A poll whose listings, when needed, were fetched.
+    """
+    changed = polls.observe(search, now=now)
+    if changed:
+        polls.commit(search, now=now)
+    return changed
+
+
+def test_unknown_searches_are_due() -> None:
+    polls = scheduler()
+    assert polls.due([search(1)], now=0) == [search(1)]
+    assert polls.seconds_until_next(now=0) == 0
+
+
+def test_counters_changed() -> None:
+    polls = scheduler()
+
+    assert poll(polls, search(10), now=0)
+    assert not poll(polls, search(10), now=300)
+    assert poll(polls, search(10, new=1), now=600)
+
+
+def test_failed_fetch_is_retried() -> None:
+    polls = scheduler()
+    poll(polls, search(10), now=0)
+
+    # The listings fetch after this poll fails, so nothing is committed.
+    assert polls.observe(search(12), now=300)
+    schedule = polls.get("1")
+    assert schedule is not None
+    assert (schedule.total_count, schedule.next_due) == (10, 600)
+
+    assert polls.observe(search(12), now=600)
+    polls.commit(search(12), now=600)
+    assert not polls.observe(search(12), now=900)
+
+
+def test_next_due() -> None:
+    polls = scheduler()
+    poll(polls, search(10), now=0)
+
+    assert polls.due([search(10)], now=299) == []
+    assert polls.due([search(10)], now=300) == [search(10)]
+    assert polls.seconds_until_next(now=100) == 200
+
+
+def test_prune_deleted_search() -> None:
+    polls = scheduler()
+    poll(polls, search(10), now=0)
+    poll(polls, search(10, id="2"), now=200)
+
+    # Search 1 was deleted and stays overdue until it is pruned.
+    assert polls.seconds_until_next(now=400) == 0
+    assert polls.prune([search(10, id="2")]) == ["1"]
+    assert polls.get("1") is None
+    assert polls.seconds_until_next(now=400) == 100
+
+
+def test_busy_search_polled_faster() -> None:
+    polls = scheduler(smoothing=1.0)
+    poll(polls, search(10), now=0)
+    poll(polls, search(20), now=300)
+
+    schedule = polls.get("1")
+    assert schedule is not None
+    assert schedule.interval == 60
+    assert schedule.next_due == 360
+
+
+def test_quiet_search_backs_off() -> None:
+    polls = scheduler()
+    poll(polls, search(10), now=0)
+    now = 0.0
+    for _ in range(6):
+        schedule = polls.get("1")
+        assert schedule is not None
+        now = schedule.next_due
+        poll(polls, search(10), now=now)
+
+    schedule = polls.get("1")
+    assert schedule is not None
+    assert schedule.interval == 3600
+
+
+def test_jitter_bounds() -> None:
+    polls = PollScheduler(initial_interval=300, jitter=0.1)
+    for i in range(20):
+        poll(polls, search(1, id=str(i)), now=0)
+        schedule = polls.get(str(i))
+        assert schedule is not None
+        assert 270 <= schedule.next_due <= 330
+
+
+def test_persisted(tmp_path: Path) -> None:
+    polls = scheduler(path=tmp_path / "schedule.json")
+    poll(polls, search(10), now=0)
+    polls.save()
+
+    restored = scheduler(path=tmp_path / "schedule.json")
+    assert restored.get("1") == polls.get("1")
+    assert not poll(restored, search(10), now=300)
@@ -1,7 +1,18 @@
+from pathlib import Path
+
+import pytest
 import respx
 from httpx import Response
-from blocket_api.blocket import BASE_URL, BlocketAPI, Category, Region, BYTBIL_URL
+from blocket_api.blocket import (
+    BASE_URL,
+    APIError,
+    BlocketAPI,
+    Category,
+    Region,
+    BYTBIL_URL,
+)
 from blocket_api.qasa import QASA_URL, HomeType, OrderBy
+from blocket_api.routing import SearchBackend, SearchRoutes
 
 api = BlocketAPI("token")
 
@@ -54,6 +65,63 @@ def test_for_search_id_mobility() -> None:
     assert api.get_listings(search_id=123) == {"data": "mobility-data"}
 
 
+@respx.mock
+def test_for_search_id_routed(tmp_path: Path) -> None:
+    """
+    Searches known to live on the mobility backend skip the 404 round trip.
+    """
+    respx.get(f"{BASE_URL}/saved/v2/searches").mock(
+        return_value=Response(status_code=200, json={"data": [{"id": "1"}]}),
+    )
+    respx.get(f"{BASE_URL}/mobility-saved-searches/v1/searches").mock(
+        return_value=Response(status_code=200, json={"data": [{"id": "3"}]}),
+    )
+    content = respx.get(f"{BASE_URL}/saved/v2/searches_content/3?lim=99")
+    respx.get(f"{BASE_URL}/mobility-saved-searches/v1/searches/3/ads?lim=99").mock(
+        return_value=Response(status_code=200, json={"data": "mobility-data"}),
+    )
+    routes_file = tmp_path / "routes.json"
+    routed_api = BlocketAPI("token", search_routes=SearchRoutes(routes_file))
+    routed_api.saved_searches()
+
+    assert routed_api.get_listings(search_id=3) == {"data": "mobility-data"}
+    assert SearchRoutes(routes_file).get(3) is SearchBackend.mobility
+    assert not content.called
+
+
+@respx.mock
+def test_get_listings_many() -> None:
+    """
+    Searches are routed as in get_listings() and a failing one is returned
+    as its error instead of failing the batch.
+    """
+    respx.get(f"{BASE_URL}/saved/v2/searches_content/1?lim=99").mock(
+        return_value=Response(status_code=200, json={"data": "listings-data"}),
+    )
+    respx.get(f"{BASE_URL}/saved/v2/searches_content/2?lim=99").mock(
+        return_value=Response(status_code=404),
+    )
+    respx.get(f"{BASE_URL}/mobility-saved-searches/v1/searches/2/ads?lim=99").mock(
+        return_value=Response(status_code=200, json={"data": "mobility-data"}),
+    )
+    respx.get(f"{BASE_URL}/saved/v2/searches_content/3?lim=99").mock(
+        return_value=Response(status_code=400),
+    )
+
+    results = api.get_listings_many([1, 2, 3, 1])
+
+    assert list(results) == [1, 2, 3]
+    assert results[1] == {"data": "listings-data"}
+    assert results[2] == {"data": "mobility-data"}
+    assert isinstance(results[3], APIError)
+
+
+def test_get_listings_many_concurrency() -> None:
+    for concurrency in (0, -1):
+        with pytest.raises(ValueError, match="Concurrency must be at least 1"):
+            api.get_listings_many([1], concurrency=concurrency)
+
+
 class Test_CustomSearch:
     @respx.mock
     def test_custom_search(self) -> None:
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import respx
+from httpx import Request, Response
+
+from blocket_api.async_blocket import AsyncBlocketAPI
+from blocket_api.blocket import BASE_URL, BlocketAPI
+from blocket_api.singleflight import SingleFlight
+
+LISTINGS_URL = f"{BASE_URL}/saved/v2/searches_content/1?lim=99"
+
+
+def slow_listings(request: Request) -> Response:
+    time.sleep(0.2)
+    return Response(status_code=200, json={"data": [1]})
+
+
+@respx.mock
+def test_concurrent_calls_coalesced() -> None:
+    route = respx.get(LISTINGS_URL).mock(side_effect=slow_listings)
+    api = BlocketAPI("token", rate_limiter=None)
+
+    with ThreadPoolExecutor(5) as executor:
+        results = list(executor.map(lambda _: api.get_listings(search_id=1), range(5)))
+
+    assert route.call_count == 1
+    assert all(result is results[0] for result in results)
+    assert api.single_flight is not None
+    assert api.single_flight.stats.coalesced == 4
+
+    api.get_listings(search_id=1)
+    assert route.call_count == 2
+
+
+@respx.mock
+def test_auth_scope_not_shared() -> None:
+    route = respx.get(LISTINGS_URL).mock(side_effect=slow_listings)
+    api = BlocketAPI("token", rate_limiter=None)
+    other = BlocketAPI("other", rate_limiter=None, single_flight=api.single_flight)
+
+    with ThreadPoolExecutor(2) as executor:
+        list(
+            executor.map(lambda client: client.get_listings(search_id=1), [api, other])
+        )
+
+    assert route.call_count == 2
+
+
+def test_error_reaches_every_caller() -> None:
+    flight = SingleFlight()
+
+    def fail() -> None:
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(3) as executor:
+        futures = [executor.submit(flight.do, "key", fail) for _ in range(3)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    assert flight.stats.calls == 1
+    assert flight.stats.coalesced == 2
+
+
+@respx.mock
+def test_async_coalesced() -> None:
+    route = respx.get(LISTINGS_URL).mock(
+        return_value=Response(status_code=200, json={"data": [1]})
+    )
+
+    async def main() -> list[dict]:
+        async with AsyncBlocketAPI("token", rate_limiter=None) as api:
+            return await asyncio.gather(
+                *(api.get_listings(search_id=1) for _ in range(5))
+            )
+
+    results = asyncio.run(main())
+    assert route.call_count == 1
+    assert all(result is results[0] for result in results)
@@ -0,0 +1,93 @@
+from datetime import datetime
+from pathlib import Path
+
+from blocket_api.models import Ad
+from blocket_api.store import SQLiteListingStore
+
+
+def listing(ad_id: str, price: int = 1000) -> dict:
+    return {
+        "ad": {
+            "ad_id": ad_id,
+            "subject": "Cykel",
+            "price": {"value": price, "suffix": "kr"},
+            "advertiser": {"type": "private"},
+            "location": [{"name": "Stockholm"}],
+        }
+    }
+
+
+def test_add_listings_returns_new(tmp_path: Path) -> None:
+    with SQLiteListingStore(tmp_path / "db.sqlite3") as store:
+        added = store.add_listings("1", [listing("a"), listing("b")])
+        assert [item["ad"]["ad_id"] for item in added] == ["a", "b"]
+        assert all("discovered_at" in item for item in added)
+
+        added = store.add_listings("1", [listing("a", 900), listing("c")])
+        assert [item["ad"]["ad_id"] for item in added] == ["c"]
+        assert store.ad_ids("1") == {"a", "b", "c"}
+        assert store.count() == 3
+        assert store.count("2") == 0
+
+
+def test_shared_ad_stored_once(tmp_path: Path) -> None:
+    with SQLiteListingStore(tmp_path / "db.sqlite3") as store:
+        first = listing("a")
+        first["discovered_at"] = "2025-01-01T00:00:00"
+        store.add_listings("1", [first, listing("b")])
+        (added,) = store.add_listings("2", [listing("a", 900)])
+
+        assert added["ad"]["ad_id"] == "a"
+        assert store.ad_ids("2") == {"a"}
+        assert (store.count(), store.count("2"), store.ad_count()) == (3, 1, 2)
+        shared = {
+            bevakning_id: listing
+            for bevakning_id, listing in store.bevakning_listings()
+            if listing["ad"]["ad_id"] == "a"
+        }
+        # One copy with the latest price, discovered by each bevakning on its own.
+        assert shared["1"]["ad"]["price"]["value"] == 900
+        assert shared["1"]["discovered_at"] == "2025-01-01T00:00:00"
+        assert shared["2"]["discovered_at"] == added["discovered_at"]
+
+
+def test_upsert_keeps_discovered_at(tmp_path: Path) -> None:
+    path = tmp_path / "db.sqlite3"
+    with SQLiteListingStore(path) as store:
+        first = listing("a")
+        first["discovered_at"] = "2025-01-01T00:00:00"
+        store.add_listings("1", [first])
+        store.add_listings("1", [Ad.from_listing(listing("a", 900))])
+
+    with SQLiteListingStore(path) as store:
+        (stored,) = store.listings("1")
+    assert stored["ad"]["price"]["value"] == 900
+    assert stored["discovered_at"] == "2025-01-01T00:00:00"
+
+
+def test_listings_since(tmp_path: Path) -> None:
+    with SQLiteListingStore(tmp_path / "db.sqlite3") as store:
+        for ad_id, day, search in [
+            ("a", 1, "1"),
+            ("b", 2, "1"),
+            ("c", 3, "1"),
+            ("d", 3, "2"),
+        ]:
+            item = listing(ad_id)
+            item["discovered_at"] = f"2025-01-0{day}T12:00:00"
+            store.add_listings(search, [item])
+
+        since = store.listings_since(datetime(2025, 1, 1, 13), bevakning_id="1")
+        assert [item["ad"]["ad_id"] for item in since] == ["b", "c"]
+        assert len(store.listings_since("2025-01-01", limit=1)) == 1
+        assert len(store.listings_since("2025-01-01")) == 4
+
+
+def test_upsert_bevakningar(tmp_path: Path) -> None:
+    with SQLiteListingStore(tmp_path / "db.sqlite3") as store:
+        store.upsert_bevakningar([{"id": 1, "name": "Cyklar"}, {"name": "no id"}])
+        store.upsert_bevakningar([{"id": 1, "name": "Cyklar i Jämtland"}])
+        rows = store._db.execute(
+            "SELECT bevakning_id, name FROM bevakningar"
+        ).fetchall()
+    assert rows == [("1", "Cyklar i Jämtland")]
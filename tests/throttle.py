@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+from blocket_api.async_blocket import AsyncBlocketAPI
+from blocket_api.blocket import BASE_URL, APIError, BlocketAPI
+from blocket_api.throttle import RateLimiter, RetryPolicy, TokenBucket, retry_after
+
+LISTINGS_URL = f"{BASE_URL}/saved/v2/searches_content?lim=99"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket() -> None:
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+    clock.now = 10
+    assert bucket.reserve() == 0
+
+
+def test_token_bucket_pause() -> None:
+    clock = Clock()
+    bucket = TokenBucket(rate=10, burst=10, clock=clock)
+    bucket.pause(3)
+
+    assert bucket.reserve() == 3
+    clock.now = 3
+    assert bucket.reserve() == 0
+
+
+def test_rate_limiter_per_host() -> None:
+    clock = Clock()
+    limiter = RateLimiter({"api.blocket.se": (1, 1)}, clock=clock)
+
+    assert limiter._reserve(LISTINGS_URL) == 0
+    assert limiter._reserve(LISTINGS_URL) == 1
+    assert limiter._reserve("https://example.com/") == 0
+    assert limiter.stats.requests == 3
+    assert limiter.stats.throttled == 1
+
+
+def test_retry_after() -> None:
+    assert retry_after(Response(429, headers={"Retry-After": "2"})) == 2
+    assert retry_after(Response(429)) is None
+    date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), True)
+    delay = retry_after(Response(429, headers={"Retry-After": date}))
+    assert delay is not None and 28 < delay <= 30
+
+
+def test_retry_after_date_without_timezone() -> None:
+    naive = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=30)
+    date = format_datetime(naive)
+    assert date.endswith("-0000")
+    delay = retry_after(Response(429, headers={"Retry-After": date}))
+    assert delay is not None and 28 < delay <= 30
+
+
+def test_backoff_is_bounded() -> None:
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    assert all(0 <= policy.backoff(attempt) <= 5 for attempt in range(10))
+
+
+@respx.mock
+def test_retries_server_errors() -> None:
+    route = respx.get(LISTINGS_URL)
+    route.side_effect = [
+        Response(status_code=503),
+        httpx.ConnectError("reset"),
+        Response(status_code=200, json={"data": [1]}),
+    ]
+    retry = RetryPolicy(base_delay=0)
+    api = BlocketAPI("token", retry=retry, rate_limiter=None)
+
+    assert api.get_listings() == {"data": [1]}
+    assert route.call_count == 3
+    assert retry.stats.retries == 2
+
+
+@respx.mock
+def test_retry_after_pauses_host() -> None:
+    route = respx.get(LISTINGS_URL)
+    route.side_effect = [
+        Response(status_code=429, headers={"Retry-After": "0"}),
+        Response(status_code=200, json={"data": []}),
+    ]
+    retry = RetryPolicy()
+    limiter = RateLimiter()
+    api = BlocketAPI("token", retry=retry, rate_limiter=limiter)
+
+    assert api.get_listings() == {"data": []}
+    assert retry.stats.retry_after == 1
+    assert limiter.stats.pauses == 1
+
+
+@respx.mock
+def test_gives_up() -> None:
+    route = respx.get(LISTINGS_URL).mock(return_value=Response(status_code=500))
+    retry = RetryPolicy(max_retries=2, base_delay=0)
+    api = BlocketAPI("token", retry=retry, rate_limiter=None)
+
+    with pytest.raises(APIError):
+        api.get_listings()
+    assert route.call_count == 3
+    assert retry.stats.exhausted == 1
+
+
+@respx.mock
+def test_long_retry_after_and_client_errors_not_retried() -> None:
+    throttled = respx.get(LISTINGS_URL).mock(
+        return_value=Response(status_code=429, headers={"Retry-After": "3600"})
+    )
+    missing = respx.get(f"{BASE_URL}/search_bff/v1/stores?q=bil&page=0").mock(
+        return_value=Response(status_code=400)
+    )
+    api = BlocketAPI("token", rate_limiter=None)
+
+    with pytest.raises(APIError):
+        api.get_listings()
+    with pytest.raises(APIError):
+        api.search_store("bil")
+    assert throttled.call_count == 1
+    assert missing.call_count == 1
+
+
+@respx.mock
+def test_async_retries() -> None:
+    route = respx.get(LISTINGS_URL)
+    route.side_effect = [
+        Response(status_code=502),
+        Response(status_code=200, json={"data": [1]}),
+    ]
+    retry = RetryPolicy(base_delay=0)
+
+    async def main() -> dict:
+        async with AsyncBlocketAPI("token", retry=retry) as api:
+            return await api.get_listings()
+
+    assert asyncio.run(main()) == {"data": [1]}
+    assert retry.stats.retries == 1
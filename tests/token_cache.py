@@ -0,0 +1,80 @@
+import base64
+import json
+import time
+from pathlib import Path
+
+import respx
+from httpx import Response
+
+from blocket_api.blocket import BASE_URL, BlocketAPI
+from blocket_api.token_cache import PUBLIC_TOKEN_URL, PublicTokenProvider
+
+STORES_URL = f"{BASE_URL}/search_bff/v1/stores?q=bilar&page=0"
+
+
+def _jwt(exp: float) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode())
+    return f"header.{payload.decode().rstrip('=')}.signature"
+
+
+@respx.mock
+def test_token_shared_between_instances() -> None:
+    token_route = respx.get(PUBLIC_TOKEN_URL).mock(
+        return_value=Response(status_code=200, json={"bearerToken": "public"}),
+    )
+    respx.get(STORES_URL).mock(return_value=Response(status_code=200, json={}))
+    provider = PublicTokenProvider()
+
+    BlocketAPI(token_provider=provider).search_store("bilar")
+    BlocketAPI(token_provider=provider).search_store("bilar")
+
+    assert token_route.call_count == 1
+
+
+@respx.mock
+def test_expired_token_is_refreshed() -> None:
+    expired, fresh = _jwt(time.time() + 5), _jwt(time.time() + 3600)
+    token_route = respx.get(PUBLIC_TOKEN_URL)
+    token_route.side_effect = [
+        Response(status_code=200, json={"bearerToken": expired}),
+        Response(status_code=200, json={"bearerToken": fresh}),
+    ]
+    respx.get(STORES_URL).mock(return_value=Response(status_code=200, json={}))
+    api = BlocketAPI(token_provider=PublicTokenProvider(refresh_margin=60))
+
+    api.search_store("bilar")
+    api.search_store("bilar")
+
+    assert token_route.call_count == 2
+    assert api.token == fresh
+
+
+@respx.mock
+def test_unauthorized_refreshes_once() -> None:
+    token_route = respx.get(PUBLIC_TOKEN_URL)
+    token_route.side_effect = [
+        Response(status_code=200, json={"bearerToken": "revoked"}),
+        Response(status_code=200, json={"bearerToken": "valid"}),
+    ]
+    stores = respx.get(STORES_URL)
+    stores.side_effect = [
+        Response(status_code=401),
+        Response(status_code=200, json={"data": "ok"}),
+    ]
+    api = BlocketAPI(token_provider=PublicTokenProvider())
+
+    assert api.search_store("bilar") == {"data": "ok"}
+    assert stores.calls.last.request.headers["Authorization"] == "Bearer valid"
+
+
+@respx.mock
+def test_token_persisted_to_disk(tmp_path: Path) -> None:
+    token = _jwt(time.time() + 3600)
+    token_route = respx.get(PUBLIC_TOKEN_URL).mock(
+        return_value=Response(status_code=200, json={"bearerToken": token}),
+    )
+    path = tmp_path / "token.json"
+
+    assert PublicTokenProvider(path=path).get(BlocketAPI().client) == token
+    assert PublicTokenProvider(path=path).get(BlocketAPI().client) == token
+    assert token_route.call_count == 1
@@ -0,0 +1,142 @@
+import asyncio
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+from blocket_api import tracing
+from blocket_api.async_blocket import AsyncBlocketAPI
+from blocket_api.blocket import BASE_URL, APIError, BlocketAPI
+from blocket_api.token_cache import PUBLIC_TOKEN_URL, PublicTokenProvider
+from blocket_api.tracing import NOOP_SPAN, ChromeTracer, NoopTracer, span, traced
+
+LISTINGS_URL = f"{BASE_URL}/saved/v2/searches_content/1?lim=99"
+
+
+@pytest.fixture
+def tracer() -> Iterator[ChromeTracer]:
+    previous = tracing.get_tracer()
+    tracer = ChromeTracer()
+    tracing.set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        tracing.set_tracer(previous)
+
+
+def test_noop() -> None:
+    previous = tracing.get_tracer()
+    tracing.set_tracer(NoopTracer())
+    try:
+        assert span("anything", key="value") is NOOP_SPAN
+        with span("anything") as current:
+            current.set_attribute("key", "value")
+    finally:
+        tracing.set_tracer(previous)
+
+
+def test_chrome_trace(tracer: ChromeTracer, tmp_path: Path) -> None:
+    class Monitor:
+        @traced("check", lambda self, bevakning_id: {"bevakning_id": bevakning_id})
+        def check(self, bevakning_id: str) -> str:
+            return bevakning_id
+
+    with span("cycle", bevakningar=2):
+        assert Monitor().check("1") == "1"
+        with pytest.raises(ValueError), span("failing"):
+            raise ValueError("broken")
+
+    path = tmp_path / "trace.json"
+    tracer.write(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    assert events[0]["ph"] == "M"
+    check, failing, cycle = events[1:]
+    assert (check["name"], check["args"]) == ("check", {"bevakning_id": "1"})
+    assert failing["args"] == {"error": "ValueError('broken')"}
+    assert cycle["args"] == {"bevakningar": 2}
+    # Children lie within their parent.
+    for child in (check, failing):
+        assert cycle["ts"] <= child["ts"]
+        assert child["ts"] + child["dur"] <= cycle["ts"] + cycle["dur"]
+
+
+def test_max_events() -> None:
+    tracer = ChromeTracer(max_events=2)
+    for name in "abc":
+        tracer.start(name).end()
+    assert [event["name"] for event in tracer.to_dict()["traceEvents"][1:]] == [
+        "b",
+        "c",
+    ]
+
+
+@respx.mock
+def test_client_spans(tracer: ChromeTracer) -> None:
+    respx.get(LISTINGS_URL).mock(
+        side_effect=[
+            Response(status_code=200, json={"data": []}),
+            httpx.ConnectError("down"),
+        ]
+    )
+    respx.get(PUBLIC_TOKEN_URL).mock(
+        return_value=Response(status_code=200, json={"bearerToken": "public"})
+    )
+    api = BlocketAPI("token", rate_limiter=None, retry=None, single_flight=None)
+
+    api.get_listings(search_id=1)
+    with pytest.raises(APIError):
+        api.get_listings(1)
+    PublicTokenProvider().get(api.client)
+
+    ok, call, failed, failed_call, token = tracer.to_dict()["traceEvents"][1:]
+    assert ok["name"] == "HTTP GET"
+    assert ok["args"]["endpoint"] == "api.blocket.se/saved/v2/searches_content/{id}"
+    assert ok["args"]["http.status_code"] == 200
+    assert (call["name"], call["args"]) == (
+        "blocket.get_listings",
+        {"search_id": 1, "limit": 99},
+    )
+    assert call["ts"] <= ok["ts"]
+    assert ok["ts"] + ok["dur"] <= call["ts"] + call["dur"]
+    assert "http.status_code" not in failed["args"]
+    assert failed["args"]["error"].startswith("ConnectError")
+    assert failed_call["args"]["search_id"] == 1
+    assert failed_call["args"]["error"].startswith("APIError")
+    assert token["name"] == "token.refresh"
+
+
+@respx.mock
+def test_async_client_spans(tracer: ChromeTracer) -> None:
+    respx.get(f"{BASE_URL}/saved/v2/searches").mock(
+        return_value=Response(status_code=200, json={"data": [{"id": "1"}]})
+    )
+    respx.get(f"{BASE_URL}/mobility-saved-searches/v1/searches").mock(
+        return_value=Response(status_code=200, json={"data": []})
+    )
+
+    async def run() -> list[dict]:
+        async with AsyncBlocketAPI("token", rate_limiter=None, retry=None) as api:
+            return await api.saved_searches()
+
+    assert asyncio.run(run()) == [{"id": "1"}]
+
+    *requests, call = tracer.to_dict()["traceEvents"][1:]
+    assert [event["name"] for event in requests] == ["HTTP GET", "HTTP GET"]
+    assert call["name"] == "blocket.saved_searches"
+    for request in requests:
+        assert call["ts"] <= request["ts"]
+        assert request["ts"] + request["dur"] <= call["ts"] + call["dur"]
+
+
+def test_traced_arguments(tracer: ChromeTracer) -> None:
+    @traced("search", arguments=("city", "offset"))
+    async def search(city: str, kind: str, offset: int = 0) -> str:
+        return city
+
+    assert asyncio.run(search("Stockholm", "apartment")) == "Stockholm"
+    (event,) = tracer.to_dict()["traceEvents"][1:]
+    assert event["args"] == {"city": "Stockholm", "offset": 0}